@@ -19,18 +19,69 @@ export interface TournamentResult {
 export interface ComprehensiveTournamentData {
   tournaments: Record<string, number>
   teams: TournamentResult[]
+  // Rankings list indexes into `teams`, best first (rankings_format "team_index")
+  division_rankings?: Record<string, number[]>
+  regional_rankings?: Record<string, number[]>
+  rankings_format?: "team_index"
   total_teams: number
   total_tournaments: number
 }
 
+// Sharded output of scripts/process_all_tournaments.py --shards (public/tournament_results/)
+const SHARD_BASE = "/tournament_results"
+
+export interface ShardEntry {
+  file: string
+  sha256: string
+  bytes: number
+  gzip_bytes?: number
+  br_bytes?: number
+  teams?: number
+}
+
+export interface ShardManifest {
+  version: number
+  summary: ShardEntry
+  divisions: Record<string, ShardEntry>
+  regions: Record<string, ShardEntry>
+}
+
+export interface RankingSummary {
+  tournaments: Record<string, number>
+  total_teams: number
+  total_tournaments: number
+  top_teams: TournamentResult[]
+  division_leaders: Record<string, TournamentResult>
+  regional_leaders: Record<string, TournamentResult>
+}
+
 export class ComprehensiveVolleyballDataManager {
   private data: ComprehensiveTournamentData | null = null
+  private manifest: ShardManifest | null = null
+  private summary: RankingSummary | null = null
+  private shards = new Map<string, Promise<TournamentResult[]>>()
+  private loadedShards = new Map<string, TournamentResult[]>()
+  private ready: Promise<void>
 
   constructor() {
-    this.loadData()
+    this.ready = this.loadData()
   }
 
   private async loadData() {
+    try {
+      // With shards, only the manifest and the top-N summary load up front; divisions and regions on demand
+      const manifestResponse = await fetch(`${SHARD_BASE}/manifest.json`)
+      if (manifestResponse.ok) {
+        const manifest: ShardManifest = await manifestResponse.json()
+        this.summary = await this.fetchShard<RankingSummary>(manifest.summary)
+        this.manifest = manifest
+        console.log("[v0] Loaded tournament summary:", this.summary.total_teams, "teams")
+        return
+      }
+    } catch (error) {
+      console.log("[v0] No sharded results, loading the full results file:", error)
+    }
+
     try {
       const response = await fetch("/tournament_results.json")
       if (response.ok) {
@@ -46,6 +97,60 @@ export class ComprehensiveVolleyballDataManager {
     }
   }
 
+  private async fetchShard<T>(entry: ShardEntry): Promise<T> {
+    // Shard names are content hashes, so the browser and CDN can cache them indefinitely
+    const response = await fetch(`${SHARD_BASE}/${entry.file}`)
+    if (!response.ok) {
+      throw new Error(`Failed to load ${entry.file}: ${response.status}`)
+    }
+    return response.json()
+  }
+
+  private loadShard(key: string, entry: ShardEntry | undefined): Promise<TournamentResult[]> {
+    if (!entry) {
+      return Promise.resolve([])
+    }
+    let shard = this.shards.get(key)
+    if (!shard) {
+      shard = this.fetchShard<{ teams: TournamentResult[] }>(entry).then((data) => {
+        this.loadedShards.set(key, data.teams)
+        return data.teams
+      })
+      // A failed fetch is retried on the next call
+      shard.catch(() => this.shards.delete(key))
+      this.shards.set(key, shard)
+    }
+    return shard
+  }
+
+  private rankedTeams(rankings: number[] | undefined, fallback: TournamentResult[]): TournamentResult[] {
+    const teams = this.data?.teams || []
+    if (this.data?.rankings_format === "team_index" && rankings) {
+      return rankings.map((index) => teams[index])
+    }
+    return fallback.sort((a, b) => b.total_points - a.total_points)
+  }
+
+  /** One division's teams, best first; with shards only that division's file is downloaded */
+  async loadDivision(division: string): Promise<TournamentResult[]> {
+    await this.ready
+    if (this.manifest) {
+      return this.loadShard(`division:${division}`, this.manifest.divisions[division])
+    }
+    const teams = this.getAllTeams().filter((team) => team.division === division)
+    return this.rankedTeams(this.data?.division_rankings?.[division], teams)
+  }
+
+  /** One region's teams, best first; with shards only that region's file is downloaded */
+  async loadRegion(region: string): Promise<TournamentResult[]> {
+    await this.ready
+    if (this.manifest) {
+      return this.loadShard(`region:${region}`, this.manifest.regions[region])
+    }
+    const teams = this.getAllTeams().filter((team) => team.region === region)
+    return this.rankedTeams(this.data?.regional_rankings?.[region], teams)
+  }
+
   private getFallbackData(): ComprehensiveTournamentData {
     return {
       tournaments: {},
@@ -56,7 +161,20 @@ export class ComprehensiveVolleyballDataManager {
   }
 
   getAllTeams(): TournamentResult[] {
-    return this.data?.teams || []
+    if (this.data) {
+      return this.data.teams
+    }
+    // Sharded: the summary's top teams plus every shard loaded so far, best first
+    const teams = new Map<string, TournamentResult>()
+    for (const team of this.summary?.top_teams || []) {
+      teams.set(team.team_name, team)
+    }
+    this.loadedShards.forEach((shard) => shard.forEach((team) => teams.set(team.team_name, team)))
+    return Array.from(teams.values()).sort((a, b) => b.total_points - a.total_points)
+  }
+
+  getTopTeams(limit = 10): TournamentResult[] {
+    return this.summary ? this.summary.top_teams.slice(0, limit) : this.getAllTeams().slice(0, limit)
   }
 
   getTeamsByDivision(division: string): TournamentResult[] {
@@ -109,14 +227,19 @@ export class ComprehensiveVolleyballDataManager {
   }
 
   getTournamentSummary(): Record<string, number> {
-    return this.data?.tournaments || {}
+    return this.data?.tournaments || this.summary?.tournaments || {}
   }
 
   getTotalStats() {
+    const totals = this.data || this.summary
+    // Every placing is one team's entry in one tournament, so the per-tournament team counts add up to it
+    const placings = Object.values(this.getTournamentSummary()).reduce((sum, teams) => sum + teams, 0)
     return {
-      total_teams: this.data?.total_teams || 0,
-      total_tournaments: this.data?.total_tournaments || 0,
-      total_matches: this.getAllTeams().reduce((sum, team) => sum + team.total_tournaments, 0),
+      total_teams: totals?.total_teams || 0,
+      total_tournaments: totals?.total_tournaments || 0,
+      total_matches: this.data
+        ? this.getAllTeams().reduce((sum, team) => sum + team.total_tournaments, 0)
+        : placings,
     }
   }
 }
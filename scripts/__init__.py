@@ -0,0 +1,106 @@
+"""Data-processing scripts for the volleyball rankings.
+
+Each module still runs on its own (``python scripts/process_all_tournaments.py``)
+and imports its siblings by bare name, so importing this package puts the
+scripts directory on sys.path. Nothing fetches, prints or writes at import
+time, and requests/numpy are only imported when first needed, so helpers load
+in milliseconds:
+
+    from scripts import calculate_points, determine_region, process_google_sheets_data
+
+The modules' own names are the bare ones (``process_all_tournaments``).
+``import scripts.process_all_tournaments`` and attribute access both hand back
+that same module object rather than loading the file a second time, so module
+state such as PARSE_WORKERS or the fetch cache is shared however it is reached.
+"""
+import importlib
+import importlib.abc
+import importlib.util
+import os
+import sys
+
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, _SCRIPTS_DIR)
+
+MODULES = (
+    'atomic_output', 'columnar_aggregation', 'enhanced_data_processor', 'fetch_complete_results',
+    'google_sheets_processor', 'grouping_index', 'http_fetch', 'local_ingest', 'parallel_parse', 'pipeline_metrics',
+    'placings_log', 'process_all_tournaments', 'process_volleyball_data', 'ranking_index', 'rankings_service',
+    'refresh_daemon', 'region_resolver', 'sharded_output', 'sqlite_store', 'team_identity', 'text_decoding',
+    'tournament_aggregation'
+)
+
+# Helpers re-exported at package level -> the module that defines them
+EXPORTS = {
+    'calculate_points': 'process_all_tournaments',
+    'determine_region': 'process_all_tournaments',
+    'iter_tournament_data': 'process_all_tournaments',
+    'process_tournament_data': 'process_all_tournaments',
+    'process_google_sheets_data': 'google_sheets_processor',
+    'resolve_region': 'region_resolver',
+    'finalize_rankings': 'tournament_aggregation',
+    'TournamentState': 'tournament_aggregation',
+    'RankingIndex': 'ranking_index',
+    'GroupingIndex': 'grouping_index',
+    'PlacingsLog': 'placings_log',
+    'TeamIdentity': 'team_identity',
+    'RankingStore': 'sqlite_store',
+    'cached_get': 'http_fetch',
+}
+
+# CLI commands (python -m scripts <command>) -> module whose main() runs it
+COMMANDS = {
+    'tournaments': 'process_all_tournaments',
+    'google-sheets': 'google_sheets_processor',
+    'volleyball-data': 'process_volleyball_data',
+    'enhanced-data': 'enhanced_data_processor',
+    'complete-results': 'fetch_complete_results',
+    'serve': 'rankings_service',
+    'watch': 'refresh_daemon',
+    'archive': 'local_ingest',
+    'history': 'placings_log',
+}
+
+__all__ = sorted(EXPORTS) + list(MODULES)
+
+
+class _AliasLoader(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Resolves scripts.<module> to the already importable bare-named module"""
+
+    def find_spec(self, fullname, path=None, target=None):
+        package, _, name = fullname.rpartition('.')
+        if package == __name__ and name in MODULES:
+            return importlib.util.spec_from_loader(fullname, self, origin=os.path.join(_SCRIPTS_DIR, f"{name}.py"))
+        return None
+
+    def create_module(self, spec):
+        module = importlib.import_module(spec.name.rpartition('.')[2])
+        spec.loader_state = module.__spec__
+        return module
+
+    def exec_module(self, module):
+        # The import system points __spec__ at the alias; the module keeps its bare name and spec
+        module.__spec__ = module.__spec__.loader_state
+
+    def get_code(self, fullname):
+        # python -m scripts.<module> runs the file itself, as python scripts/<module>.py would
+        name = fullname.rpartition('.')[2]
+        return importlib.util.find_spec(name).loader.get_code(name)
+
+
+if not any(isinstance(finder, _AliasLoader) for finder in sys.meta_path):
+    sys.meta_path.insert(0, _AliasLoader())
+
+
+def __getattr__(name):
+    if name in EXPORTS:
+        return getattr(importlib.import_module(EXPORTS[name]), name)
+    if name in MODULES:
+        return importlib.import_module(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def run(command):
+    """Run one CLI command's main()"""
+    return importlib.import_module(COMMANDS[command]).main()
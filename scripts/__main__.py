@@ -0,0 +1,29 @@
+"""Run a processing script by command name: python -m scripts <command>"""
+import argparse
+import os
+import sys
+
+from scripts import COMMANDS, run
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m scripts', description=__doc__)
+    parser.add_argument('command', choices=sorted(COMMANDS),
+                        help=', '.join(f"{command}: {module}.py" for command, module in COMMANDS.items()))
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='write a per-stage timing report (JSON) to PATH; same as PIPELINE_METRICS=PATH')
+    parser.add_argument('--profile', choices=('cprofile', 'tracemalloc'),
+                        help='also profile the run (report in <module>_metrics.json unless --metrics is given); '
+                             'same as PIPELINE_PROFILE')
+    # Anything else is passed on to the command's own options (e.g. serve --port 8080)
+    args, rest = parser.parse_known_args()
+    sys.argv = [f"{parser.prog} {args.command}"] + rest
+    if args.metrics:
+        os.environ['PIPELINE_METRICS'] = args.metrics
+    if args.profile:
+        os.environ['PIPELINE_PROFILE'] = args.profile
+    run(args.command)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Crash-safe JSON outputs with a bounded history of previous versions.
+
+Outputs are written to a uniquely named temp file in the same directory and
+swapped in with os.replace, so readers see either the old or the new file,
+never a partial one, and concurrent writers never share a temp file. With
+history > 0 (the refresh daemon keeps HISTORY_VERSIONS), the version being
+replaced is kept under .history/<file name>/ (as a hard link, so keeping it
+costs no copy); only the newest history versions are kept, and rollback()
+swaps one of them back in the same way.
+"""
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
+
+from json_writer import write_json
+
+HISTORY_DIR = '.history'
+HISTORY_VERSIONS = 5
+
+
+def history_dir(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, HISTORY_DIR, name)
+
+
+def list_versions(path):
+    """Saved previous versions of path, newest first"""
+    directory = history_dir(path)
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory), reverse=True)
+            if not name.endswith('.tmp')]
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _keep_version(path, history):
+    """Move the current file into the history (by hard link) and trim it to the newest history versions"""
+    if history <= 0 or not os.path.exists(path):
+        return
+    directory = history_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    saved = os.path.join(directory, f"{time.time_ns():020d}{os.path.splitext(path)[1]}")
+    try:
+        os.link(path, saved)
+    except OSError:
+        shutil.copy2(path, saved)
+    for old in list_versions(path)[history:]:
+        os.remove(old)
+
+
+def temp_file(path, mode='w', encoding='utf-8'):
+    """Open a new, uniquely named temp file next to path, with path's permissions (0o644 for a new file)"""
+    f = tempfile.NamedTemporaryFile(mode, encoding=encoding, dir=os.path.dirname(path) or '.',
+                                    prefix=f"{os.path.basename(path)}.", suffix='.tmp', delete=False)
+    # NamedTemporaryFile creates the file 0o600, which os.replace would carry over to the output
+    os.chmod(f.name, stat.S_IMODE(os.stat(path).st_mode) if os.path.exists(path) else 0o644)
+    return f
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8', fsync=False):
+    """Write path through a temp_file: swapped in with os.replace on success, removed if the block raises"""
+    with temp_file(path, mode, encoding) as f:
+        try:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def replace_file(path, tmp_path, history=0):
+    """Swap a fully written tmp_path in for path; returns False (and drops tmp_path) if nothing changed"""
+    if os.path.exists(path) and _file_digest(path) == _file_digest(tmp_path):
+        os.remove(tmp_path)
+        return False
+    _keep_version(path, history)
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_json_atomic(path, data, indent=2, history=0):
+    """Stream data as JSON to path via a temp file and an atomic rename; returns False if the content was unchanged"""
+    with temp_file(path) as f:
+        try:
+            write_json(f, data, indent)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    return replace_file(path, f.name, history)
+
+
+def rollback(path, steps=1, history=HISTORY_VERSIONS):
+    """Restore the version saved steps writes ago; the current file is kept in the history as well"""
+    versions = list_versions(path)
+    if not 1 <= steps <= len(versions):
+        raise ValueError(f"{path} has {len(versions)} saved versions, cannot go back {steps}")
+    source = versions[steps - 1]
+    with temp_file(path, 'wb', None) as f, open(source, 'rb') as saved:
+        shutil.copyfileobj(saved, f)
+    tmp_path = f.name
+    # Keep the current file first; the restored version leaves the history so it is not listed twice
+    _keep_version(path, history + 1)
+    os.remove(source)
+    os.replace(tmp_path, path)
+    return source
@@ -0,0 +1,307 @@
+"""Benchmark the ingestion scripts on synthetic data served by a local HTTP stand-in.
+
+Every script runs unmodified: the shared requests session is swapped for one
+whose traffic goes to StubServer, and each run gets a fresh working directory
+and fetch cache. Per-stage timings (fetch, parse, region resolution,
+aggregation with each engine, serialization) are measured on the functions
+each script defines, alongside an end-to-end run of the script itself.
+
+    python scripts/benchmarks/run_benchmarks.py                      # compare against baseline.json
+    python scripts/benchmarks/run_benchmarks.py --sizes 1000 1000000
+    python scripts/benchmarks/run_benchmarks.py --save-baseline      # record new baseline numbers
+"""
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import platform
+import re
+import runpy
+import sys
+import tempfile
+import time
+import zlib
+from urllib.parse import urlsplit
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+
+import http_fetch
+import synthetic_data
+from columnar_aggregation import aggregate_columnar, numpy_available
+from json_writer import team_references, write_json
+from region_resolver import resolve_region
+from sharded_output import write_sharded_output
+from stub_server import StubServer, stand_in_session
+from tournament_aggregation import apply_contribution, finalize_rankings, to_placings
+
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+# A stage is flagged when it is this much slower than baseline (and at least MIN_DELTA seconds slower)
+REGRESSION_THRESHOLD = 1.25
+MIN_DELTA = 0.005
+SHEET_TABS = 4
+
+
+def script_path(name):
+    return os.path.join(SCRIPTS_DIR, name)
+
+
+@contextlib.contextmanager
+def sandbox(stub):
+    """Fresh cwd, fetch cache and region memo, with all HTTP going to the stub and stdout muted"""
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        http_fetch._session = stand_in_session(stub.base_url)
+        http_fetch._cache = http_fetch.FetchCache(directory=os.path.join(tmp, '.fetch_cache'))
+        resolve_region.cache_clear()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield tmp
+        finally:
+            os.chdir(previous_cwd)
+            http_fetch._cache = None
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run_script(name):
+    """Run a script as __main__ with its default options, not the benchmark's"""
+    argv = sys.argv
+    sys.argv = [script_path(name)]
+    try:
+        return runpy.run_path(script_path(name), run_name='__main__')
+    finally:
+        sys.argv = argv
+
+
+def tournament_paths():
+    """Request paths of the tournament URLs, so their bodies can be generated before timing"""
+    with open(script_path('process_all_tournaments.py'), encoding='utf-8') as f:
+        return [urlsplit(url).path for url in re.findall(r"'url': '([^']+)'", f.read())]
+
+
+def bench_process_all_tournaments(stub, rows):
+    paths = tournament_paths()
+    per_file = max(1, rows // len(paths))
+    stub.set_body_for(lambda path: synthetic_data.tournament_csv(per_file, seed=zlib.crc32(path.encode())))
+    for path in paths:
+        stub.body(path)
+
+    results = {}
+    with sandbox(stub):
+        results['end_to_end'], script = timed(run_script, 'process_all_tournaments.py')
+    tournaments = script['tournaments']
+
+    with sandbox(stub):
+        results['fetch'], fetched = timed(lambda: list(script['fetch_tournaments'](tournaments)))
+        results['fetch_revalidate'], _ = timed(lambda: list(script['fetch_tournaments'](tournaments)))
+
+        def parse():
+            return [(tournament['name'], list(script['iter_csv_rows'](response.iter_lines())))
+                    for tournament, response in fetched]
+        results['parse'], parsed = timed(parse)
+
+    names = [row.get('팀명', '') for _, tournament_rows in parsed for row in tournament_rows]
+    resolve_region.cache_clear()
+    results['region'], _ = timed(lambda: [script['determine_region'](name) for name in names if name])
+
+    contributions = [to_placings(script['iter_tournament_data'](tournament_rows, name))
+                     for name, tournament_rows in parsed]
+
+    def aggregate():
+        team_stats = {}
+        for placings in contributions:
+            apply_contribution(team_stats, placings)
+        return finalize_rankings(team_stats, [tournament['name'] for tournament in tournaments])
+    results['aggregation'], final_rankings = timed(aggregate)
+    if numpy_available():
+        by_tournament = {name: placings for (name, _), placings in zip(parsed, contributions)}
+        results['aggregation_numpy'], _ = timed(aggregate_columnar, by_tournament,
+                                                [tournament['name'] for tournament in tournaments],
+                                                script['calculate_points'])
+
+    def serialize():
+        output_data = {
+            'tournaments': {name: len(teams) for (name, _), teams in zip(parsed, contributions)},
+            'teams': final_rankings,
+            'division_rankings': script['generate_division_rankings'](final_rankings),
+            'regional_rankings': script['generate_regional_rankings'](final_rankings),
+            'total_teams': len(final_rankings),
+            'total_tournaments': len(tournaments)
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'tournament_results.json'), 'w', encoding='utf-8') as f:
+                write_json(f, team_references(output_data), script['RESULTS_INDENT'])
+            write_sharded_output(output_data, os.path.join(tmp, 'shards'))
+    results['serialization'], _ = timed(serialize)
+    return results
+
+
+def bench_enhanced_data_processor(stub, rows):
+    body = synthetic_data.ranking_sheet_csv(rows)
+    stub.set_body_for(lambda path: body)
+
+    results = {}
+    with sandbox(stub):
+        results['end_to_end'], script = timed(run_script, 'enhanced_data_processor.py')
+
+    with sandbox(stub):
+        results['fetch'], response = timed(http_fetch.cached_get, f"{stub.base_url}/ranking.csv")
+        response.encoding = 'utf-8-sig'
+
+        def parse():
+            reader = csv.reader(response.iter_lines(errors='ignore'))
+            header = next(reader, [])
+            sample_rows = list(itertools.islice(reader, script['SCHEMA_SAMPLE_ROWS']))
+            extract = script['compile_row_extractor'](script['infer_column_schema'](header, sample_rows))
+            return [extract(row) for row in itertools.chain(sample_rows, reader) if row]
+        results['parse'], extracted = timed(parse)
+
+    names = [fields[0] for fields in extracted if fields]
+    resolve_region.cache_clear()
+    results['region'], _ = timed(lambda: [script['extract_region_from_team_name'](name) for name in names])
+    return results
+
+
+def bench_google_sheets_processor(stub, rows):
+    # A workbook of SHEET_TABS tabs (rows split between them) whose first tab is the default export
+    tabs = {str(gid): synthetic_data.google_sheet_csv(max(1, rows // SHEET_TABS), seed=gid)
+            for gid in range(SHEET_TABS)}
+    htmlview = synthetic_data.google_sheet_htmlview(list(tabs))
+
+    def body_for(path):
+        if path.endswith('/htmlview'):
+            return htmlview
+        return tabs.get(re.search(r'gid=(\d+)', path).group(1) if 'gid=' in path else '0', b'')
+
+    stub.set_body_for(body_for)
+
+    results = {}
+    with sandbox(stub):
+        results['end_to_end'], script = timed(run_script, 'google_sheets_processor.py')
+        results['fetch'], csv_content = timed(script['fetch_google_sheets_csv'], 'benchmark-sheet')
+        results['fetch_tabs'], fetched = timed(script['fetch_google_sheets_tabs'], 'benchmark-sheet')
+    resolve_region.cache_clear()
+    results['parse_region_rank'], _ = timed(script['process_google_sheets_data'], csv_content)
+    resolve_region.cache_clear()
+    results['parse_tabs'], _ = timed(script['process_google_sheets_data'], [content for _, content in fetched])
+    return results
+
+
+def bench_fetch_complete_results(stub, rows):
+    body = synthetic_data.complete_results_csv(rows)
+    stub.set_body_for(lambda path: body)
+    with sandbox(stub):
+        elapsed, _ = timed(run_script, 'fetch_complete_results.py')
+    return {'end_to_end': elapsed}
+
+
+def bench_process_volleyball_data(stub, rows):
+    body = synthetic_data.ranking_sheet_csv(rows)
+    stub.set_body_for(lambda path: body)
+    with sandbox(stub):
+        elapsed, _ = timed(run_script, 'process_volleyball_data.py')
+    return {'end_to_end': elapsed}
+
+
+BENCHMARKS = {
+    'process_all_tournaments': bench_process_all_tournaments,
+    'enhanced_data_processor': bench_enhanced_data_processor,
+    'google_sheets_processor': bench_google_sheets_processor,
+    'fetch_complete_results': bench_fetch_complete_results,
+    'process_volleyball_data': bench_process_volleyball_data,
+}
+
+
+def run_benchmarks(sizes, scripts):
+    """Return {script: {stage: {rows: seconds}}}"""
+    results = {}
+    stub = StubServer().start()
+    try:
+        for rows in sizes:
+            for name in scripts:
+                print(f"[v0] Benchmarking {name} at {rows} rows...", file=sys.stderr)
+                for stage, seconds in BENCHMARKS[name](stub, rows).items():
+                    results.setdefault(name, {}).setdefault(stage, {})[str(rows)] = round(seconds, 6)
+    finally:
+        stub.stop()
+    return results
+
+
+def load_baseline(path=BASELINE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    """Merge results into the stored baseline so partial runs only replace what they measured"""
+    baseline = load_baseline(path)
+    merged = baseline.get('results', {})
+    for name, stages in results.items():
+        for stage, by_size in stages.items():
+            merged.setdefault(name, {}).setdefault(stage, {}).update(by_size)
+    baseline = {
+        'machine': {'python': platform.python_version(), 'platform': platform.platform()},
+        'results': merged
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def report(results, baseline):
+    """Print a timing table and return the stages that regressed against baseline"""
+    stored = baseline.get('results', {})
+    regressions = []
+    print(f"{'script':<26} {'stage':<18} {'rows':>8} {'seconds':>10} {'baseline':>10} {'ratio':>7}")
+    for name, stages in results.items():
+        for stage, by_size in stages.items():
+            for rows, seconds in by_size.items():
+                reference = stored.get(name, {}).get(stage, {}).get(rows)
+                ratio = seconds / reference if reference else None
+                flag = ''
+                if reference and ratio > REGRESSION_THRESHOLD and seconds - reference > MIN_DELTA:
+                    flag = '  REGRESSION'
+                    regressions.append((name, stage, rows))
+                print(f"{name:<26} {stage:<18} {rows:>8} {seconds:>10.4f} "
+                      f"{(f'{reference:.4f}' if reference else '-'):>10} {(f'{ratio:.2f}' if ratio else '-'):>7}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--scripts', nargs='+', choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--save-baseline', action='store_true', help='store these numbers in baseline.json')
+    parser.add_argument('--json', help='also write the raw results to this file')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.scripts)
+    regressions = report(results, load_baseline())
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        save_baseline(results)
+        print(f"\n[v0] Baseline saved to {BASELINE_FILE}")
+    elif regressions:
+        print(f"\n[v0] {len(regressions)} stage(s) slower than baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Local HTTP stand-in for the blob store and Google Sheets, with ETag/Last-Modified support."""
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class StubServer:
+    """Serves generated CSV bodies for any path; body_for(path) is called once per path"""
+
+    def __init__(self, body_for=None):
+        self.body_for = body_for or (lambda path: b'')
+        self.requests = 0
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._last_modified = formatdate(usegmt=True)
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def set_body_for(self, body_for):
+        with self._lock:
+            self.body_for = body_for
+            self._bodies.clear()
+            self._last_modified = formatdate(usegmt=True)
+
+    def body(self, path):
+        with self._lock:
+            entry = self._bodies.get(path)
+            if entry is None:
+                body = self.body_for(path)
+                entry = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+                self._bodies[path] = entry
+            return entry
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.requests += 1
+                body, etag = stub.body(self.path)
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/csv; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', stub._last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StandInAdapter(HTTPAdapter):
+    """Transport adapter that sends every request to the stub server, keeping path and query"""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = f"{self.base_url}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+        return super().send(request, **kwargs)
+
+
+def stand_in_session(base_url, pool_size=16):
+    """A requests session whose http(s) traffic all lands on the stub server"""
+    session = requests.Session()
+    adapter = StandInAdapter(base_url, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -0,0 +1,97 @@
+"""Synthetic tournament CSVs shaped like the real sources, for benchmarking the scripts."""
+import csv
+import io
+import random
+
+from region_resolver import REGION_KEYWORDS
+
+DIVISIONS = [
+    '남자클럽3부', '여자클럽3부', '남자클럽2부', '남자장년부', '여자장년부', '남자시니어부',
+    '남자실버부', '남자대학부', '여자대학부', '남자국제부', '여자국제부'
+]
+
+# Weighted so most placings are not medals, as in real brackets
+RANKINGS = ['우승', '준우승', '3위', '공동3위', '8강', '8강', '16강', '16강', '16강', '예선']
+
+NICKNAMES = [
+    '스파이커스', '썬더', '이글스', '블루윙즈', '레이디스', '드림', '퀸즈', '타이거즈', '배구클럽',
+    '클럽', '어머니회', '시니어', '파이터즈', '한마음', '하이킥', '슈퍼스타', '불사조', '위너스'
+]
+
+OTHER_PREFIXES = ['연세', '한빛', '새봄', '푸른', '우리']
+CITIES = [keyword for keywords in REGION_KEYWORDS.values() for keyword in keywords] + OTHER_PREFIXES
+
+
+def team_pool(size, rng):
+    """Build a pool of Korean team names with city prefixes and a few spacing variants"""
+    names = []
+    for index in range(size):
+        city = rng.choice(CITIES)
+        nickname = rng.choice(NICKNAMES)
+        suffix = '' if index < len(NICKNAMES) * 4 else chr(ord('A') + index % 26)
+        separator = ' ' if rng.random() < 0.85 else ''
+        names.append(f"{city}{separator}{suffix}{nickname}")
+    return names
+
+
+def _to_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _pool_for(rows, rng):
+    return team_pool(max(20, min(rows // 4, 50000)), rng)
+
+
+def tournament_csv(rows, seed=0):
+    """One tournament's results in the process_all_tournaments layout"""
+    rng = random.Random(seed)
+    teams = _pool_for(rows, rng)
+    return _to_csv(['참가부별', '순위', '팀명', '최우수선수', '감독명'], [
+        [rng.choice(DIVISIONS), rng.choice(RANKINGS), rng.choice(teams),
+         f"선수{rng.randint(1, 500)}", f"감독{rng.randint(1, 200)}"]
+        for _ in range(rows)
+    ])
+
+
+def ranking_sheet_csv(rows, seed=0):
+    """Per-team medal counts in the enhanced_data_processor / process_volleyball_data layout"""
+    rng = random.Random(seed)
+    teams = _pool_for(rows, rng)
+    return _to_csv(['부별구분', '팀명', '우승횟수', '준우승횟수', '3위횟수'], [
+        [rng.choice(DIVISIONS), rng.choice(teams), rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 5)]
+        for _ in range(rows)
+    ])
+
+
+def complete_results_csv(rows, seed=0):
+    """Team list with regions in the fetch_complete_results layout"""
+    rng = random.Random(seed)
+    teams = _pool_for(rows, rng)
+    regions = list(REGION_KEYWORDS)
+    result = []
+    for _ in range(rows):
+        region = rng.choice(regions)
+        result.append([rng.choice(DIVISIONS), rng.choice(teams), region, rng.choice(REGION_KEYWORDS[region])])
+    return _to_csv(['대회부별', '팀명', '주요지역별', '세부지역'], result)
+
+
+def google_sheet_csv(rows, seed=0):
+    """A results tab in the google_sheets_processor layout"""
+    rng = random.Random(seed)
+    teams = _pool_for(rows, rng)
+    return _to_csv(['팀명', '부별', '지역', '우승', '준우승', '3위', '감독', '최우수선수', '참가대회수'], [
+        [rng.choice(teams), rng.choice(DIVISIONS), '', rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 5),
+         f"감독{rng.randint(1, 200)}", f"선수{rng.randint(1, 500)}", rng.randint(1, 12)]
+        for _ in range(rows)
+    ])
+
+
+def google_sheet_htmlview(gids):
+    """A published spreadsheet's htmlview page listing one tab button per gid"""
+    buttons = ''.join(f'<li id="sheet-button-{gid}"><a href="#">부별{index + 1}</a></li>'
+                      for index, gid in enumerate(gids))
+    return f'<html><body><ul id="sheet-menu">{buttons}</ul></body></html>'.encode('utf-8')
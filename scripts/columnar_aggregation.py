@@ -0,0 +1,146 @@
+from operator import itemgetter
+
+from tournament_aggregation import Placing, medal_type, preferred_spelling
+
+MEDAL_CODES = {None: 0, 'wins': 1, 'second_places': 2, 'third_places': 3}
+
+_numpy = None
+
+
+def _load_numpy():
+    """Import numpy on first use; the columnar engine is optional and the dict-based path needs nothing extra"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        _numpy = numpy
+    return _numpy
+
+
+def numpy_available():
+    return _load_numpy() is not None
+
+
+def _encode(np, values):
+    """Dense integer codes for values in first-appearance order, and the distinct values in that order.
+
+    One hash pass and a single pre-sized np.fromiter; unlike np.unique there is
+    no string sort, and first-appearance codes keep ties in the row order of
+    the dict-based path.
+    """
+    distinct = list(dict.fromkeys(values))
+    index = {value: code for code, value in enumerate(distinct)}
+    return np.fromiter(map(index.__getitem__, values), dtype=np.int64, count=len(values)), distinct
+
+
+def _distinct_by_team(np, team_codes, team_count, values):
+    """Each team's distinct non-empty values in first-appearance order, as a flat list and per-team bounds"""
+    present = np.flatnonzero(np.fromiter(map(bool, values), dtype=bool, count=len(values)))
+    if not len(present):
+        return [], [0] * (team_count + 1)
+    codes, distinct = _encode(np, [values[row] for row in present.tolist()])
+    teams = team_codes[present]
+    # First row of every (team, value) pair, in row order, then grouped by team
+    _, first = np.unique(teams * len(distinct) + codes, return_index=True)
+    first.sort()
+    first = first[np.argsort(teams[first], kind='stable')]
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(teams[first], minlength=team_count)))).tolist()
+    return [distinct[code] for code in codes[first].tolist()], bounds
+
+
+def aggregate_columnar(contributions, tournament_names, calculate_points=None, team_key=None):
+    """Aggregate per-tournament rows into final_rankings with vectorized group-by reductions.
+
+    contributions maps tournament name -> its placings (Placing records, as
+    stored by TournamentState). Team names and ranking strings are integer-coded
+    (see _encode); points and medals come from lookup tables indexed by
+    ranking code. team_key works as in apply_contribution.
+    The result matches finalize_rankings on the same rows.
+    """
+    np = _load_numpy()
+    if np is None:
+        raise RuntimeError("The columnar aggregation engine requires numpy")
+
+    configured = set(tournament_names)
+    ordered = [name for name in tournament_names if name in contributions]
+    ordered += [name for name in contributions if name not in configured]
+    placings = [placing for tournament_name in ordered for placing in contributions[tournament_name]]
+    if not placings:
+        return []
+
+    column = {field: list(map(itemgetter(Placing._fields.index(field)), placings))
+              for field in ('name', 'ranking', 'points', 'division', 'region', 'team_name', 'mvp', 'coach')}
+    spelling_codes, spelling_values = _encode(np, column['team_name'])
+    if team_key is not None:
+        # team_key runs once per distinct spelling, not once per row
+        key_codes, _ = _encode(np, [team_key(team_name) for team_name in spelling_values])
+        team_codes = key_codes[spelling_codes]
+        team_count = int(key_codes.max()) + 1
+        spelling_counts = np.bincount(key_codes, minlength=team_count).tolist()
+    else:
+        team_codes, team_count = spelling_codes, len(spelling_values)
+        spelling_counts = [1] * team_count
+    ranking_codes, ranking_values = _encode(np, column['ranking'])
+
+    # Lookup tables over the distinct ranking strings
+    medal_lut = np.array([MEDAL_CODES[medal_type(ranking)] for ranking in ranking_values], dtype=np.int8)
+    if calculate_points is not None:
+        points_lut = np.array([calculate_points(ranking) for ranking in ranking_values], dtype=np.int64)
+        points = points_lut[ranking_codes]
+    else:
+        points = np.fromiter(column['points'], dtype=np.int64, count=len(placings))
+    medals = medal_lut[ranking_codes]
+
+    totals = np.bincount(team_codes, weights=points, minlength=team_count).astype(np.int64)
+    participation = np.bincount(team_codes, minlength=team_count)
+    wins = np.bincount(team_codes[medals == 1], minlength=team_count)
+    second_places = np.bincount(team_codes[medals == 2], minlength=team_count)
+    third_places = np.bincount(team_codes[medals == 3], minlength=team_count)
+    mvp_awards, mvp_bounds = _distinct_by_team(np, team_codes, team_count, column['mvp'])
+    coaches, coach_bounds = _distinct_by_team(np, team_codes, team_count, column['coach'])
+
+    # Last placing per team decides its division and region
+    last_row = np.zeros(team_count, dtype=np.int64)
+    np.maximum.at(last_row, team_codes, np.arange(len(placings)))
+
+    # Highest total first; ties keep first-appearance order, which is the team code order
+    order = np.lexsort((np.arange(team_count), -totals)).tolist()
+
+    # Group row indexes by team, keeping row order within each team
+    by_team = np.argsort(team_codes, kind='stable').tolist()
+    bounds = np.concatenate(([0], np.cumsum(participation))).tolist()
+
+    # Back to Python scalars for building the output records
+    entries = [{'name': name, 'ranking': ranking, 'points': row_points}
+               for name, ranking, row_points in zip(column['name'], column['ranking'], points.tolist())]
+    totals, participation = totals.tolist(), participation.tolist()
+    wins, second_places, third_places = wins.tolist(), second_places.tolist(), third_places.tolist()
+    spellings = column['team_name']
+    last_row = last_row.tolist()
+
+    divisions, regions = column['division'], column['region']
+
+    final_rankings = []
+    for code in order:
+        rows = by_team[bounds[code]:bounds[code + 1]]
+        last = last_row[code]
+        if spelling_counts[code] == 1:
+            team_name = spellings[last]
+        else:
+            team_name = preferred_spelling(map(spellings.__getitem__, rows))
+        final_rankings.append({
+            'team_name': team_name,
+            'total_points': totals[code],
+            'wins': wins[code],
+            'second_places': second_places[code],
+            'third_places': third_places[code],
+            'total_tournaments': participation[code],
+            'division': divisions[last],
+            'region': regions[last],
+            'tournaments': list(map(entries.__getitem__, rows)),
+            'mvp_awards': mvp_awards[mvp_bounds[code]:mvp_bounds[code + 1]],
+            'coaches': coaches[coach_bounds[code]:coach_bounds[code + 1]]
+        })
+    return final_rankings
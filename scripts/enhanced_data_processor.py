@@ -1,65 +1,146 @@
-import requests
 import csv
-from io import StringIO
-import json
-import re
+import itertools
 from urllib.parse import unquote
 
+from atomic_output import write_json_atomic
+from http_fetch import cached_get, get_cache
+from pipeline_metrics import get_metrics, instrumented
+from region_resolver import resolve_region
+
+# Rows sampled (after the header) to infer the column schema of a file
+SCHEMA_SAMPLE_ROWS = 20
+MEDAL_FIELDS = ('wins', 'runner_ups', 'third_places')
+
 def clean_team_name(name):
     """Clean team name by removing extra spaces and normalizing"""
     if not name:
         return ""
-    return re.sub(r'\s+', ' ', name.strip())
+    return ' '.join(name.split())
 
 def extract_region_from_team_name(team_name):
     """Extract region from team name based on city/province prefixes"""
     if not team_name:
         return "기타"
     
-    # Region mapping based on Korean administrative divisions
-    region_mapping = {
-        # 수도권 (Capital Region)
-        '서울': '수도권', '인천': '수도권', '경기': '수도권',
-        '성남': '수도권', '수원': '수도권', '안양': '수도권', '부천': '수도권',
-        '고양': '수도권', '용인': '수도권', '성남': '수도권', '화성': '수도권',
-        
-        # 경상권 (Gyeongsang Region)
-        '부산': '경상권', '대구': '경상권', '울산': '경상권', 
-        '경남': '경상권', '경북': '경상권', '창원': '경상권', '김해': '경상권',
-        '포항': '경상권', '구미': '경상권', '진주': '경상권', '마산': '경상권',
-        '안동': '경상권', '경주': '경상권', '거제': '경상권', '통영': '경상권',
-        
-        # 전라권 (Jeolla Region)
-        '광주': '전라권', '전남': '전라권', '전북': '전라권',
-        '전주': '전라권', '목포': '전라권', '여수': '전라권', '순천': '전라권',
-        '군산': '전라권', '익산': '전라권', '정읍': '전라권', '남원': '전라권',
-        
-        # 충청권 (Chungcheong Region)
-        '대전': '충청권', '세종': '충청권', '충남': '충청권', '충북': '충청권',
-        '천안': '충청권', '청주': '충청권', '충주': '충청권', '제천': '충청권',
-        '아산': '충청권', '서산': '충청권', '당진': '충청권', '보령': '충청권',
+    # Match the city/province prefix (usually the first word) against the shared gazetteer
+    first_word = team_name.split()[0] if team_name.split() else ""
+    return resolve_region(first_word)
+
+def medal_field_for_column(key):
+    """Map a column header to the medal count it holds, or None"""
+    if not key:
+        return None
+    # 준우승 contains 우승, so it has to be checked first
+    if "준우승" in key or "2" in key:
+        return 'runner_ups'
+    if "우승" in key or "1" in key:
+        return 'wins'
+    if "3" in key or "삼" in key:
+        return 'third_places'
+    return None
+
+def extract_fields_heuristically(row):
+    """Guess team, division and medal counts cell by cell from a header->value dict"""
+    team_name = ""
+    division = ""
+    counts = {field: 0 for field in MEDAL_FIELDS}
+    
+    for key, value in row.items():
+        if not value or value.strip() == "":
+            continue
+            
+        # Identify team name (usually longest text field)
+        if len(str(value).strip()) > len(team_name) and not str(value).isdigit():
+            if "부" not in str(value) or len(str(value)) > 10:  # Avoid division names
+                team_name = clean_team_name(str(value))
         
-        # 강원권 (Gangwon Region)
-        '강원': '강원권', '춘천': '강원권', '원주': '강원권', '강릉': '강원권',
-        '동해': '강원권', '태백': '강원권', '속초': '강원권', '삼척': '강원권',
+        # Identify division (contains "부")
+        if "부" in str(value) and len(str(value)) < 20:
+            division = str(value).strip()
         
-        # 제주권 (Jeju Region)
-        '제주': '제주권'
-    }
+        # Identify numeric fields
+        if str(value).isdigit():
+            field = medal_field_for_column(key)
+            if field:
+                counts[field] = int(value)
     
-    # Extract first word (usually city/province name)
-    first_word = team_name.split()[0] if team_name.split() else ""
+    return team_name, division, counts['wins'], counts['runner_ups'], counts['third_places']
+
+def infer_column_schema(header, sample_rows):
+    """Infer the team, division and medal columns once per file from the header and a sample.
+
+    Returns a dict of column indexes (medal columns may be None), or None when
+    the team or division column cannot be identified.
+    """
+    width = len(header)
+    columns = [[row[i].strip() for row in sample_rows if i < len(row) and row[i].strip()] for i in range(width)]
+    
+    def mostly(values, predicate):
+        return bool(values) and sum(1 for value in values if predicate(value)) * 2 > len(values)
     
-    # Try exact match first
-    if first_word in region_mapping:
-        return region_mapping[first_word]
+    schema = {'team': None, 'division': None}
+    schema.update({field: None for field in MEDAL_FIELDS})
     
-    # Try partial matches for compound names
-    for key, region in region_mapping.items():
-        if first_word.startswith(key) or key in first_word:
-            return region
+    # Header names first
+    for index, key in enumerate(header):
+        key = (key or '').strip()
+        if schema['team'] is None and key in ('팀명', '클럽명', '팀', '클럽'):
+            schema['team'] = index
+        elif schema['division'] is None and ('부별' in key or key == '부문'):
+            schema['division'] = index
+        else:
+            field = medal_field_for_column(key)
+            if field and schema[field] is None and mostly(columns[index] or ['0'], str.isdigit):
+                schema[field] = index
     
-    return "기타"
+    # Then the sampled values: divisions contain "부", team names are the longest text column
+    used = {index for index in schema.values() if index is not None}
+    if schema['division'] is None:
+        for index in range(width):
+            if index not in used and mostly(columns[index], lambda value: "부" in value and len(value) < 20):
+                schema['division'] = index
+                used.add(index)
+                break
+    if schema['team'] is None:
+        candidates = [
+            (sum(len(value) for value in columns[index]) / len(columns[index]), -index)
+            for index in range(width)
+            if index not in used and mostly(columns[index], lambda value: not value.isdigit())
+        ]
+        if candidates:
+            schema['team'] = -max(candidates)[1]
+    
+    if schema['team'] is None or schema['division'] is None:
+        return None
+    return schema
+
+def compile_row_extractor(schema):
+    """Build an index-based row extractor for a schema; it returns None for rows that fail validation"""
+    team_index = schema['team']
+    division_index = schema['division']
+    medal_indexes = [schema[field] for field in MEDAL_FIELDS]
+    width = max(index for index in schema.values() if index is not None) + 1
+    
+    def extract(row):
+        if len(row) < width:
+            return None
+        team_name = clean_team_name(row[team_index])
+        division = row[division_index].strip()
+        if not team_name or not division or team_name.isdigit():
+            return None
+        
+        counts = []
+        for index in medal_indexes:
+            value = row[index].strip() if index is not None else ''
+            if not value:
+                counts.append(0)
+            elif value.isdigit():
+                counts.append(int(value))
+            else:
+                return None
+        return team_name, division, counts[0], counts[1], counts[2]
+    
+    return extract
 
 def calculate_ranking_score(wins, runner_ups, third_places):
     """Calculate ranking score: wins * 3 + runner_ups * 2 + third_places * 1"""
@@ -72,60 +153,47 @@ def process_volleyball_data():
     
     try:
         print("Fetching CSV data...")
-        response = requests.get(csv_url, timeout=30)
+        response = cached_get(csv_url, timeout=30)
         response.raise_for_status()
         
-        # Handle encoding issues
-        content = response.content.decode('utf-8-sig', errors='ignore')
-        
+        # The encoding (UTF-8, UTF-8 with BOM or CP949) is sniffed from the head of the body;
+        # rows are decoded incrementally as they are read
         print("Parsing CSV data...")
-        csv_reader = csv.DictReader(StringIO(content))
+        metrics = get_metrics()
+        csv_reader = metrics.iter('csv_parse', csv.reader(response.iter_lines()))
+        header = next(csv_reader, [])
+        sample_rows = [row for row in itertools.islice(csv_reader, SCHEMA_SAMPLE_ROWS) if row]
+        
+        # Infer the column layout once; rows that don't fit it fall back to per-cell guessing
+        schema = infer_column_schema(header, sample_rows)
+        extract_fields = compile_row_extractor(schema) if schema else None
+        if schema:
+            columns = {field: header[index] for field, index in schema.items() if index is not None}
+            print(f"Column schema: {columns}")
+        else:
+            print("Could not infer column schema, guessing columns per row")
+        fallback_rows = 0
         
         teams_data = []
         divisions = set()
         regions = set()
         team_details = {}
         
-        for row_num, row in enumerate(csv_reader, 1):
+        for row_num, row in enumerate(itertools.chain(sample_rows, csv_reader), 1):
+            if not row:
+                continue
             try:
-                # Get field names dynamically (handle Korean column names)
-                fieldnames = list(row.keys())
-                
-                # Try to identify columns by content pattern
-                team_name = ""
-                division = ""
-                wins = 0
-                runner_ups = 0
-                third_places = 0
-                
-                for key, value in row.items():
-                    if not value or value.strip() == "":
-                        continue
-                        
-                    # Identify team name (usually longest text field)
-                    if len(str(value).strip()) > len(team_name) and not str(value).isdigit():
-                        if "부" not in str(value) or len(str(value)) > 10:  # Avoid division names
-                            team_name = clean_team_name(str(value))
-                    
-                    # Identify division (contains "부")
-                    if "부" in str(value) and len(str(value)) < 20:
-                        division = str(value).strip()
-                    
-                    # Identify numeric fields
-                    if str(value).isdigit():
-                        num_val = int(value)
-                        if "우승" in key or "1" in key:
-                            wins = num_val
-                        elif "준우승" in key or "2" in key:
-                            runner_ups = num_val
-                        elif "3" in key or "삼" in key:
-                            third_places = num_val
+                fields = extract_fields(row) if extract_fields else None
+                if fields is None:
+                    fallback_rows += 1
+                    fields = extract_fields_heuristically(dict(zip(header, row)))
+                team_name, division, wins, runner_ups, third_places = fields
                 
                 if not team_name or not division:
                     continue
                 
-                region = extract_region_from_team_name(team_name)
-                ranking_score = calculate_ranking_score(wins, runner_ups, third_places)
+                region = metrics.call('region', extract_region_from_team_name, team_name)
+                ranking_score = metrics.call('scoring', calculate_ranking_score, wins, runner_ups, third_places)
                 
                 team_data = {
                     'id': f"{team_name}_{division}".replace(" ", "_"),
@@ -157,7 +225,7 @@ def process_volleyball_data():
                 print(f"Error processing row {row_num}: {e}")
                 continue
         
-        print(f"Successfully processed {len(teams_data)} teams")
+        print(f"Successfully processed {len(teams_data)} teams ({fallback_rows} rows needed per-cell guessing)")
         print(f"Divisions found: {sorted(divisions)}")
         print(f"Regions found: {sorted(regions)}")
         
@@ -195,11 +263,12 @@ def process_volleyball_data():
         }
         
         # Save to JSON file
-        with open('volleyball_database.json', 'w', encoding='utf-8') as f:
-            json.dump(database, f, ensure_ascii=False, indent=2)
+        with metrics.stage('serialization', rows=len(teams_data)):
+            write_json_atomic('volleyball_database.json', database)
         
         print(f"\nDatabase saved to volleyball_database.json")
         print(f"Total teams: {len(teams_data)}")
+        get_cache().report()
         
         return database
         
@@ -209,8 +278,7 @@ def process_volleyball_data():
         # Create comprehensive sample data for development
         sample_database = create_sample_database()
         
-        with open('volleyball_database.json', 'w', encoding='utf-8') as f:
-            json.dump(sample_database, f, ensure_ascii=False, indent=2)
+        write_json_atomic('volleyball_database.json', sample_database)
         
         print("Created sample database for development")
         return sample_database
@@ -280,6 +348,10 @@ def create_sample_database():
         }
     }
 
-if __name__ == "__main__":
-    database = process_volleyball_data()
+@instrumented('enhanced_data_processor')
+def main():
+    process_volleyball_data()
     print("Data processing completed!")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
-import requests
 import csv
-import json
-from io import StringIO
+
+from atomic_output import write_json_atomic
+from grouping_index import GroupingIndex
+from http_fetch import cached_get, get_cache
+from pipeline_metrics import get_metrics, instrumented
+from ranking_index import RankingIndex
 
 def fetch_and_process_complete_results():
     """Fetch and process the complete tournament results CSV"""
@@ -11,17 +14,16 @@ def fetch_and_process_complete_results():
     
     try:
         # Fetch the CSV data
-        response = requests.get(csv_url)
-        response.encoding = 'utf-8'
+        response = cached_get(csv_url)
         
         if response.status_code == 200:
-            # Parse CSV content
-            csv_content = StringIO(response.text)
-            reader = csv.DictReader(csv_content)
+            # Stream CSV rows straight from the response body
+            metrics = get_metrics()
+            reader = metrics.iter('csv_parse', csv.DictReader(response.iter_lines()))
             
             all_teams = []
-            divisions = set()
-            regions = set()
+            # Team counts per division, region and detailed region (and every combination) in the same pass
+            groups = GroupingIndex(dimensions=('division', 'main_region', 'detailed_region'))
             
             # Process each row to extract all team data
             for row in reader:
@@ -32,9 +34,6 @@ def fetch_and_process_complete_results():
                 detailed_region = row.get('세부지역', '').strip()
                 
                 if team_name and division:
-                    divisions.add(division)
-                    regions.add(main_region)
-                    
                     # Create comprehensive team record
                     team_data = {
                         'name': team_name,
@@ -50,36 +49,43 @@ def fetch_and_process_complete_results():
                     }
                     
                     all_teams.append(team_data)
+                    groups.add(team_data, team=team_name)
             
-            # Group teams by division and calculate rankings
-            division_rankings = {}
-            for division in divisions:
-                division_teams = [team for team in all_teams if team['division'] == division]
-                
-                # Sort by total score (you can adjust ranking logic)
-                division_teams.sort(key=lambda x: (x['gold_medals'], x['silver_medals'], x['bronze_medals']), reverse=True)
-                
-                # Assign rankings
-                for i, team in enumerate(division_teams):
-                    team['division_rank'] = i + 1
-                
-                division_rankings[division] = division_teams
+            divisions = groups.values('division')
+            regions = groups.values('main_region')
+            
+            # Rank teams within each division by medals from one index instead of a filter-and-sort per division
+            with metrics.stage('ranking', rows=len(all_teams)):
+                ranking = RankingIndex(lambda team: (-team['gold_medals'], -team['silver_medals'], -team['bronze_medals']),
+                                       group_by=('division',), items=enumerate(all_teams))
+                division_rankings = {}
+                for division in divisions:
+                    division_teams = list(ranking.items('division', division))
+                    
+                    # Assign rankings
+                    for i, team in enumerate(division_teams):
+                        team['division_rank'] = i + 1
+                    
+                    division_rankings[division] = division_teams
             
             # Generate comprehensive results
             results = {
                 'total_teams': len(all_teams),
-                'divisions': list(divisions),
-                'regions': list(regions),
+                'divisions': divisions,
+                'regions': regions,
                 'division_rankings': division_rankings,
                 'summary': {
                     'divisions_count': len(divisions),
                     'regions_count': len(regions),
-                    'teams_per_division': {div: len(division_rankings[div]) for div in divisions}
+                    'teams_per_division': {div: bucket.placings for div, bucket in groups.breakdown('division').items()},
+                    'teams_per_region': {region: bucket.placings for region, bucket in groups.breakdown('main_region').items()},
+                    'teams_by_region_and_division': groups.crosstab('main_region', 'division')
                 }
             }
             
             print(f"✅ Successfully processed {len(all_teams)} teams across {len(divisions)} divisions")
             print(f"📊 Teams per division: {results['summary']['teams_per_division']}")
+            get_cache().report()
             
             return results
             
@@ -91,11 +97,16 @@ def fetch_and_process_complete_results():
         print(f"❌ Error processing CSV: {str(e)}")
         return None
 
-# Execute the processing
-if __name__ == "__main__":
+@instrumented('fetch_complete_results')
+def main():
+    """Process the complete results and save them for use in the app"""
     results = fetch_and_process_complete_results()
     if results:
         # Save results to JSON for use in the app
-        with open('complete_volleyball_data.json', 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        with get_metrics().stage('serialization', rows=results['total_teams']):
+            write_json_atomic('complete_volleyball_data.json', results)
         print("💾 Data saved to complete_volleyball_data.json")
+
+# Execute the processing
+if __name__ == "__main__":
+    main()
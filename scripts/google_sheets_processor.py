@@ -1,17 +1,45 @@
-import requests
 import csv
+import html
 import io
+import itertools
 import json
-from typing import List, Dict, Any
+import re
+import time
+from typing import List, Dict, Any, Optional, Tuple, Union
 
-def process_google_sheets_data(csv_content: str) -> List[Dict[str, Any]]:
+from atomic_output import write_json_atomic
+from http_fetch import fetch_response, get_cache, hedged_get
+from pipeline_metrics import get_metrics, instrumented
+from ranking_index import medal_sort_key
+from region_resolver import resolve_region
+
+# Seconds to wait on an export endpoint before also trying the next one (0 races all of them)
+HEDGE_DELAY = 1.0
+
+# Tabs of one workbook fetched at the same time
+TAB_WORKERS = 4
+
+SHEETS_URL = "https://docs.google.com/spreadsheets/d/{sheet_id}"
+
+# Per-team counts that add up when a team appears on several tabs
+SUMMED_FIELDS = ('wins', 'runnerUp', 'third', 'tournaments', 'totalMedals', 'score')
+
+def process_google_sheets_data(csv_content: Union[str, List[str]]) -> List[Dict[str, Any]]:
     """
     Process Google Sheets CSV content into volleyball tournament data
+    
+    csv_content may also be a list of CSV texts, one per tab; the tabs are
+    ranked as one dataset, with a team (name and division) found on several
+    tabs counted once with its medals and tournaments summed.
     """
     teams = []
+    metrics = get_metrics()
+    tabs = [csv_content] if isinstance(csv_content, str) else list(csv_content)
+    merged = {} if len(tabs) > 1 else None
     
-    # Parse CSV content
-    csv_reader = csv.DictReader(io.StringIO(csv_content))
+    # Parse CSV content; each tab has its own header row
+    rows = itertools.chain.from_iterable(csv.DictReader(io.StringIO(tab)) for tab in tabs)
+    csv_reader = metrics.iter('csv_parse', rows)
     
     for row in csv_reader:
         # Skip empty rows
@@ -35,39 +63,27 @@ def process_google_sheets_data(csv_content: str) -> List[Dict[str, Any]]:
         team_data['totalMedals'] = team_data['wins'] + team_data['runnerUp'] + team_data['third']
         team_data['score'] = team_data['wins'] * 3 + team_data['runnerUp'] * 2 + team_data['third'] * 1
         
-        # Map region if needed
-        region_mapping = {
-            '서울': '수도권',
-            '경기': '수도권',
-            '인천': '수도권',
-            '부산': '경상권',
-            '대구': '경상권',
-            '울산': '경상권',
-            '경남': '경상권',
-            '경북': '경상권',
-            '광주': '전라권',
-            '전남': '전라권',
-            '전북': '전라권',
-            '대전': '충청권',
-            '충남': '충청권',
-            '충북': '충청권',
-            '강원': '강원권',
-            '제주': '제주권'
-        }
+        # With several tabs, a team seen on an earlier tab adds this row to that one
+        if merged is not None:
+            key = (team_data['name'], team_data['division'])
+            existing = merged.get(key)
+            if existing is not None:
+                for field in SUMMED_FIELDS:
+                    existing[field] += team_data[field]
+                for field in ('coach', 'mvp'):
+                    existing[field] = existing[field] or team_data[field]
+                continue
+            merged[key] = team_data
         
         # Auto-detect region from team name if not provided
         if not team_data['region']:
-            for city, region in region_mapping.items():
-                if city in team_data['name']:
-                    team_data['region'] = region
-                    break
-            else:
-                team_data['region'] = '기타'
+            team_data['region'] = metrics.call('region', resolve_region, team_data['name'])
         
         teams.append(team_data)
     
-    # Sort teams by score (descending)
-    teams.sort(key=lambda x: (-x['score'], -x['wins'], -x['runnerUp'], -x['third']))
+    # Sort teams by score, then wins, runner-ups and thirds (a one-off ranking needs no index)
+    with metrics.stage('ranking', rows=len(teams)):
+        teams.sort(key=medal_sort_key)
     
     # Add rankings
     for i, team in enumerate(teams):
@@ -75,43 +91,128 @@ def process_google_sheets_data(csv_content: str) -> List[Dict[str, Any]]:
     
     return teams
 
+def _has_rows(response):
+    return response.status_code == 200 and bool(response.text.strip())
+
 def fetch_google_sheets_csv(sheet_id: str) -> str:
     """
-    Try multiple methods to fetch Google Sheets data
+    Fetch Google Sheets data from whichever export endpoint answers first
     """
+    base_url = SHEETS_URL.format(sheet_id=sheet_id)
     urls_to_try = [
-        f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv",
-        f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid=0",
-        f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv"
+        f"{base_url}/export?format=csv",
+        f"{base_url}/export?format=csv&gid=0",
+        f"{base_url}/gviz/tq?tqx=out:csv"
     ]
     
-    for url in urls_to_try:
-        try:
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200 and response.text.strip():
-                print(f"[v0] Successfully fetched data from: {url}")
-                return response.text
-        except Exception as e:
-            print(f"[v0] Failed to fetch from {url}: {e}")
-            continue
+    # Start with the endpoint that won last time
+    cache = get_cache()
+    preference_key = f"google-sheets:{sheet_id}"
+    preferred = cache.preferred(preference_key)
+    if preferred in urls_to_try:
+        urls_to_try.remove(preferred)
+        urls_to_try.insert(0, preferred)
+    
+    url, response = hedged_get(urls_to_try, hedge_delay=HEDGE_DELAY, timeout=10, accept=_has_rows)
+    if url is None:
+        return ""
     
-    return ""
+    print(f"[v0] Successfully fetched data from: {url}")
+    cache.remember(preference_key, url)
+    return response.text
+
+# Tab buttons of the htmlview page, and the tab list its script builds
+_TAB_BUTTON = re.compile(r'id="sheet-button-(\d+)"[^>]*>(?:\s*<[^>]*>)*\s*([^<]*)')
+_TAB_ITEM = re.compile(r'name:\s*"((?:[^"\\]|\\.)*)"[^}]*?gid:\s*"(\d+)"')
+
+def parse_sheet_tabs(page: str) -> List[Dict[str, str]]:
+    """
+    Extract [{'gid', 'title'}] from a spreadsheet's htmlview page, in tab order
+    """
+    tabs = {}
+    for gid, title in _TAB_BUTTON.findall(page):
+        tabs.setdefault(gid, html.unescape(title).strip())
+    for title, gid in _TAB_ITEM.findall(page):
+        if gid not in tabs:
+            try:
+                title = json.loads(f'"{title}"')
+            except ValueError:
+                pass
+            tabs[gid] = title
+    return [{'gid': gid, 'title': title} for gid, title in tabs.items()]
+
+def discover_sheet_tabs(sheet_id: str) -> List[Dict[str, str]]:
+    """
+    List the tabs of a published spreadsheet, or [] if they cannot be read
+    """
+    response = fetch_response(f"{SHEETS_URL.format(sheet_id=sheet_id)}/htmlview", timeout=10)
+    return parse_sheet_tabs(response.text) if response is not None else []
 
-# Try to fetch the data
-sheet_id = "1uZ6kvG5L6T_wzLfj0KHDpU-7bK6pMbHHHWJe8IutIFs"
-csv_content = fetch_google_sheets_csv(sheet_id)
+def fetch_sheet_tab(sheet_id: str, gid: str) -> Tuple[str, float]:
+    """
+    Fetch one tab as CSV from whichever export endpoint answers first; returns (csv text, seconds)
+    """
+    base_url = SHEETS_URL.format(sheet_id=sheet_id)
+    started = time.perf_counter()
+    urls = [f"{base_url}/export?format=csv&gid={gid}", f"{base_url}/gviz/tq?tqx=out:csv&gid={gid}"]
+    url, response = hedged_get(urls, hedge_delay=HEDGE_DELAY, timeout=10, accept=_has_rows)
+    return (response.text if url else ""), time.perf_counter() - started
 
-if csv_content:
-    teams = process_google_sheets_data(csv_content)
-    print(f"[v0] Processed {len(teams)} teams from Google Sheets")
+def fetch_google_sheets_tabs(sheet_id: str, max_workers: int = TAB_WORKERS,
+                             tabs: Optional[List[Dict[str, str]]] = None) -> List[Tuple[Dict[str, str], str]]:
+    """
+    Fetch every tab of the workbook concurrently; returns [(tab, csv text)] in tab order
+    
+    A tab that could not be fetched comes back with "". If the tabs cannot be
+    listed, or there is only one, this is fetch_google_sheets_csv on the default tab.
+    """
+    if tabs is None:
+        tabs = discover_sheet_tabs(sheet_id)
+    if len(tabs) < 2:
+        return [(tabs[0] if tabs else {'gid': '0', 'title': ''}, fetch_google_sheets_csv(sheet_id))]
     
-    # Save processed data
-    with open('processed_teams.json', 'w', encoding='utf-8') as f:
-        json.dump(teams, f, ensure_ascii=False, indent=2)
+    from concurrent.futures import ThreadPoolExecutor
     
-    print("[v0] Teams data saved to processed_teams.json")
-else:
-    print("[v0] Could not fetch Google Sheets data. Please try:")
-    print("1. Make sure the sheet is publicly accessible")
-    print("2. Copy and paste the data directly")
-    print("3. Download as CSV and upload the file")
+    print(f"[v0] Fetching {len(tabs)} tabs with {min(max_workers, len(tabs))} workers")
+    started = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tabs)))) as pool:
+        futures = [pool.submit(fetch_sheet_tab, sheet_id, tab['gid']) for tab in tabs]
+        for tab, future in zip(tabs, futures):
+            csv_content, seconds = future.result()
+            status = f"{len(csv_content.encode('utf-8'))} bytes" if csv_content else "failed"
+            print(f"[v0]   {tab['title'] or 'gid ' + tab['gid']}: {status} in {seconds:.2f}s")
+            results.append((tab, csv_content))
+    print(f"[v0] Fetched {sum(1 for _, content in results if content)}/{len(tabs)} tabs "
+          f"in {time.perf_counter() - started:.2f}s")
+    return results
+
+SHEET_ID = "1uZ6kvG5L6T_wzLfj0KHDpU-7bK6pMbHHHWJe8IutIFs"
+PROCESSED_TEAMS_FILE = 'processed_teams.json'
+
+@instrumented('google_sheets_processor')
+def main(sheet_id: str = SHEET_ID) -> None:
+    """
+    Fetch the sheet, rank its teams and save them to processed_teams.json
+    """
+    # Try to fetch the data from every tab of the workbook
+    csv_contents = [csv_content for _, csv_content in fetch_google_sheets_tabs(sheet_id) if csv_content]
+    
+    if csv_contents:
+        teams = process_google_sheets_data(csv_contents)
+        print(f"[v0] Processed {len(teams)} teams from Google Sheets")
+        
+        # Save processed data
+        with get_metrics().stage('serialization', rows=len(teams)):
+            write_json_atomic(PROCESSED_TEAMS_FILE, teams)
+        
+        print(f"[v0] Teams data saved to {PROCESSED_TEAMS_FILE}")
+        get_cache().report()
+    else:
+        print("[v0] Could not fetch Google Sheets data. Please try:")
+        print("1. Make sure the sheet is publicly accessible")
+        print("2. Copy and paste the data directly")
+        print("3. Download as CSV and upload the file")
+
+if __name__ == "__main__":
+    main()
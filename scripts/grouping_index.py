@@ -0,0 +1,150 @@
+"""Rollups of placings over every combination of grouping fields, built in one pass.
+
+    groups = GroupingIndex(placing_facts(output_data['teams']))
+    groups.summary(region='경상권')                      # one slice
+    groups.breakdown('division', region='경상권')        # {division: bucket} within it
+    groups.crosstab('region', 'division', 'gold')        # region x division medal table
+
+Each placing is added to one bucket per subset of DIMENSIONS (the empty
+subset is the grand total), so any slice, drill-down or cross-tab is a dict
+lookup on a precomputed bucket instead of a scan over the teams. Placings with
+an empty value for a field are left out of the buckets grouped by that field
+but still count in the coarser rollups.
+"""
+from itertools import combinations
+
+DIMENSIONS = ('division', 'region', 'detailed_region', 'tournament')
+MEASURES = ('placings', 'teams', 'points', 'gold', 'silver', 'bronze')
+
+# calculate_points() gives 100/80/60 for first, second and third place
+MEDAL_POINTS = {100: 'gold', 80: 'silver', 60: 'bronze'}
+
+
+class Bucket:
+    """Totals for one combination of field values; teams maps each team to its points there"""
+
+    __slots__ = ('placings', 'points', 'gold', 'silver', 'bronze', 'team_points')
+
+    def __init__(self):
+        self.placings = 0
+        self.points = 0
+        self.gold = 0
+        self.silver = 0
+        self.bronze = 0
+        self.team_points = {}
+
+    @property
+    def teams(self):
+        return len(self.team_points)
+
+    def add(self, team, points):
+        self.placings += 1
+        self.points += points
+        medal = MEDAL_POINTS.get(points)
+        if medal:
+            setattr(self, medal, getattr(self, medal) + 1)
+        self.team_points[team] = self.team_points.get(team, 0) + points
+
+    def as_dict(self):
+        return {measure: getattr(self, measure) for measure in MEASURES}
+
+
+_EMPTY = Bucket()
+
+
+class GroupingIndex:
+    """Buckets for every subset of dimensions, with drill-down links from each bucket to its children"""
+
+    def __init__(self, facts=(), dimensions=DIMENSIONS):
+        self.dimensions = tuple(dimensions)
+        self._cuboids = [
+            (fields, tuple(self.dimensions.index(field) for field in fields))
+            for size in range(len(self.dimensions) + 1)
+            for fields in combinations(self.dimensions, size)
+        ]
+        self._buckets = {fields: {} for fields, _ in self._cuboids}
+        # (parent fields, field) -> {parent values: {value: bucket}}
+        self._children = {}
+        for fact in facts:
+            self.add(fact)
+
+    def add(self, fact, team=None, points=None):
+        """Count one placing; team and points default to the fact's team_name and points"""
+        team = fact['team_name'] if team is None else team
+        points = fact.get('points', 0) if points is None else points
+        values = tuple(fact.get(field) or '' for field in self.dimensions)
+        for fields, positions in self._cuboids:
+            key = tuple(values[position] for position in positions)
+            if '' in key:
+                continue
+            buckets = self._buckets[fields]
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = Bucket()
+                self._link(fields, key, bucket)
+            bucket.add(team, points)
+
+    def _link(self, fields, key, bucket):
+        for i, field in enumerate(fields):
+            parent = self._children.setdefault((fields[:i] + fields[i + 1:], field), {})
+            parent.setdefault(key[:i] + key[i + 1:], {})[key[i]] = bucket
+
+    def _slice(self, filters):
+        unknown = set(filters) - set(self.dimensions)
+        if unknown:
+            raise KeyError(f"Unknown grouping field: {', '.join(sorted(unknown))}")
+        fields = tuple(field for field in self.dimensions if field in filters)
+        return fields, tuple(filters[field] for field in fields)
+
+    def bucket(self, **filters):
+        """The bucket for a slice such as region='경상권', division='남자클럽부' (empty if nothing matches)"""
+        fields, key = self._slice(filters)
+        return self._buckets[fields].get(key, _EMPTY)
+
+    def summary(self, **filters):
+        return self.bucket(**filters).as_dict()
+
+    def breakdown(self, field, **filters):
+        """{value of field: bucket} within a slice, in order of first appearance"""
+        if field in filters:
+            raise ValueError(f"{field} is already fixed by the filters")
+        fields, key = self._slice(filters)
+        if field not in self.dimensions:
+            raise KeyError(f"Unknown grouping field: {field}")
+        return dict(self._children.get((fields, field), {}).get(key, {}))
+
+    def values(self, field, **filters):
+        return list(self.breakdown(field, **filters))
+
+    def crosstab(self, rows, columns, measure='placings', **filters):
+        """{row value: {column value: measure}} within a slice; missing cells are left out"""
+        if measure not in MEASURES:
+            raise KeyError(f"Unknown measure: {measure}")
+        table = {}
+        for row in self.breakdown(rows, **filters):
+            cells = self.breakdown(columns, **dict(filters, **{rows: row}))
+            table[row] = {column: getattr(bucket, measure) for column, bucket in cells.items()}
+        return table
+
+    def ranking(self, limit=None, **filters):
+        """(team, points) within a slice, most points first; ties keep the order teams first appeared in"""
+        ranked = sorted(self.bucket(**filters).team_points.items(), key=lambda item: -item[1])
+        return ranked if limit is None else ranked[:limit]
+
+
+def placing_facts(teams):
+    """One fact per placing of tournament_results.json teams, with the team's detailed region"""
+    from region_resolver import resolve_locality
+
+    for team in teams:
+        name = team['team_name']
+        division, region, locality = team['division'], team['region'], resolve_locality(name)
+        for placing in team['tournaments']:
+            yield {
+                'team_name': name,
+                'division': division,
+                'region': region,
+                'detailed_region': locality,
+                'tournament': placing['name'],
+                'points': placing['points'],
+            }
@@ -0,0 +1,577 @@
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from atomic_output import atomic_write, temp_file
+from pipeline_metrics import get_metrics
+
+# Defaults for the concurrent fetch stage
+DEFAULT_TIMEOUT = 30
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+CHUNK_SIZE = 64 * 1024
+
+# Defaults for the on-disk response cache
+DEFAULT_CACHE_DIR = os.environ.get('FETCH_CACHE_DIR', '.fetch_cache')
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+PREFERENCES_FILE = 'preferences.json'  # remembered winners of hedged fetches, kept next to the cache entries
+
+# Defaults for hedged fetches of interchangeable URLs
+DEFAULT_HEDGE_DELAY = 1.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class FetchCancelled(Exception):
+    """Raised inside a fetch whose cancel event was set, e.g. a hedged request that lost the race"""
+
+
+def get_session(pool_size=DEFAULT_WORKERS):
+    """Return the shared keep-alive session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # requests is imported on first use so importing this module stays cheap
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def get_cache():
+    """Return the shared fetch cache, creating it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FetchCache()
+        return _cache
+
+
+class HostLimiter:
+    """Caps the number of in-flight requests per host"""
+
+    def __init__(self, per_host=DEFAULT_PER_HOST):
+        self.per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host)
+                self._semaphores[host] = semaphore
+        return semaphore
+
+
+class CachedResponse:
+    """Minimal response object returned by cached_get, whether served from disk or network.
+
+    Successful bodies live in the cache directory and are read lazily, so
+    iter_content/iter_lines stream them without holding the whole body in memory.
+    """
+
+    def __init__(self, url, status_code, headers, content=None, body_path=None, content_hash=None,
+                 from_cache=False, encoding=None, cache=None):
+        from requests.structures import CaseInsensitiveDict
+
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.body_path = body_path
+        self.from_cache = from_cache
+        self._content = content
+        self._content_hash = content_hash
+        self._cache = cache
+        # encoding is one already sniffed from this body; it may still fall back like a fresh sniff
+        self._encoding = encoding
+        self._fallback = self._next_candidate(encoding) if encoding else None
+
+    @property
+    def encoding(self):
+        """The body's encoding, sniffed from its head on first use (see text_decoding)"""
+        if self._encoding is None:
+            self._sniff_encoding()
+        return self._encoding
+
+    @encoding.setter
+    def encoding(self, encoding):
+        # An explicit encoding is used as is, like requests.Response.encoding
+        self._encoding = encoding
+        self._fallback = None
+
+    def _encoding_key(self):
+        return f"encoding:{self.url}"
+
+    def _next_candidate(self, encoding):
+        from text_decoding import candidate_encodings
+
+        candidates = candidate_encodings(encoding)
+        return candidates[1] if len(candidates) > 1 else None
+
+    def _sniff_encoding(self):
+        from text_decoding import SNIFF_BYTES, charset_from_content_type, sniff_encoding
+
+        if self._content is not None:
+            head = self._content[:SNIFF_BYTES]
+        else:
+            with open(self.body_path, 'rb') as f:
+                head = f.read(SNIFF_BYTES)
+        declared = charset_from_content_type(self.headers.get('Content-Type'))
+        remembered = (self._cache or get_cache()).preferred(self._encoding_key()) if self.status_code == 200 else None
+        self._encoding = sniff_encoding(head, declared, remembered)
+        self._fallback = self._next_candidate(self._encoding)
+        self._remember_encoding(self._encoding)
+
+    def _remember_encoding(self, encoding):
+        if self.status_code == 200:
+            (self._cache or get_cache()).remember(self._encoding_key(), encoding)
+
+    def _decoder(self, errors):
+        from text_decoding import StreamDecoder
+
+        return StreamDecoder(self.encoding, errors, self._fallback)
+
+    def _decoded(self, decoder):
+        """Adopt the encoding a StreamDecoder settled on once it has seen the whole body"""
+        if decoder.encoding != self._encoding:
+            print(f"[v0] {self.url} is not {self._encoding}, decoded as {decoder.encoding}")
+            self._encoding = decoder.encoding
+            self._remember_encoding(decoder.encoding)
+        self._fallback = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            with open(self.body_path, 'rb') as f:
+                self._content = f.read()
+        return self._content
+
+    @property
+    def text(self):
+        content = self.content
+        with get_metrics().stage('decode', nbytes=len(content)):
+            decoder = self._decoder('replace')
+            text = decoder.decode(content, final=True)
+        self._decoded(decoder)
+        return text
+
+    @property
+    def content_hash(self):
+        """SHA-256 of the body bytes"""
+        if self._content_hash is None:
+            digest = hashlib.sha256()
+            for chunk in self.iter_content():
+                digest.update(chunk)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        with open(self.body_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def iter_lines(self, chunk_size=CHUNK_SIZE, errors='replace'):
+        """Yield decoded lines (with line endings) using an incremental decoder"""
+        from text_decoding import iter_lines
+
+        decoder = self._decoder(errors)
+        yield from iter_lines(self.iter_content(chunk_size), decoder, get_metrics())
+        self._decoded(decoder)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class FetchCache:
+    """On-disk HTTP response cache keyed by URL, revalidated with ETag/Last-Modified.
+
+    Entries that have not been validated for max_age seconds are dropped, and the
+    least recently used entries are evicted once the bodies exceed max_bytes.
+    Eviction runs when the cache is opened and from report() at the end of a
+    run, never while a response handed out during the run may still be read.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES,
+                 max_age=DEFAULT_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+        self._index = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        self.evict()
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, f"{key}.body")
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json') or filename == PREFERENCES_FILE:
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding='utf-8') as f:
+                    meta = json.load(f)
+                self._index[filename[:-5]] = meta
+            except (OSError, ValueError):
+                continue
+
+    def _write_atomic(self, path, data):
+        with atomic_write(path, 'wb', None) as f:
+            f.write(data)
+
+    def _save_meta(self, key, meta):
+        self._write_atomic(self._meta_path(key), json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def _remove(self, key):
+        self._index.pop(key, None)
+        for path in (self._body_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def lookup(self, url):
+        """Return (meta, body_path) for a cached URL, or None"""
+        key = self._key(url)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            body_path = self._body_path(key)
+            if not os.path.exists(body_path):
+                self._remove(key)
+                return None
+        return meta, body_path
+
+    def conditional_headers(self, meta):
+        """Build If-None-Match/If-Modified-Since headers for a cached entry"""
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, response, cancel=None):
+        """Stream a 200 response body to disk with its validators; returns (meta, body_path).
+
+        If cancel (a threading.Event) is set before the body is complete, the
+        download stops at the next chunk, nothing is stored and FetchCancelled
+        is raised.
+        """
+        key = self._key(url)
+        body_path = self._body_path(key)
+        digest = hashlib.sha256()
+        size = 0
+        # Unique per writer, so threads and processes filling the same entry never share a temp file
+        f = temp_file(body_path, 'wb', None)
+        try:
+            with f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if cancel is not None and cancel.is_set():
+                        raise FetchCancelled(url)
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(f.name)
+            raise
+        get_metrics().count('fetch_bytes_downloaded', size)
+
+        now = time.time()
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'sha256': digest.hexdigest(),
+            'size': size,
+            'validated_at': now,
+            'used_at': now,
+        }
+        with self._lock:
+            self.misses += 1
+            os.replace(f.name, body_path)
+            self._save_meta(key, meta)
+            self._index[key] = meta
+        return meta, body_path
+
+    def refresh(self, url, meta, response=None):
+        """Mark a cached entry as revalidated (304) and pick up any new validators"""
+        key = self._key(url)
+        now = time.time()
+        if response is not None:
+            meta['etag'] = response.headers.get('ETag') or meta.get('etag')
+            meta['last_modified'] = response.headers.get('Last-Modified') or meta.get('last_modified')
+            meta['validated_at'] = now
+        meta['used_at'] = now
+        with self._lock:
+            if response is not None:
+                self.hits += 1
+            else:
+                self.stale += 1
+            self._index[key] = meta
+            self._save_meta(key, meta)
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes.
+
+        The most recently used entry is always kept, so a body larger than
+        max_bytes on its own stays cached until something newer is stored.
+        """
+        now = time.time()
+        with self._lock:
+            for key, meta in list(self._index.items()):
+                if now - meta.get('validated_at', 0) > self.max_age:
+                    self._remove(key)
+
+            total = sum(meta.get('size', 0) for meta in self._index.values())
+            if total <= self.max_bytes:
+                return
+            for key, meta in sorted(self._index.items(), key=lambda item: item[1].get('used_at', 0))[:-1]:
+                if total <= self.max_bytes:
+                    break
+                total -= meta.get('size', 0)
+                self._remove(key)
+
+    def _load_preferences(self):
+        try:
+            with open(os.path.join(self.directory, PREFERENCES_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def preferred(self, key):
+        """Return the value remembered for key by remember(), or None"""
+        return self._load_preferences().get(key)
+
+    def remember(self, key, value):
+        with self._lock:
+            preferences = self._load_preferences()
+            if preferences.get(key) == value:
+                return
+            preferences[key] = value
+            self._write_atomic(os.path.join(self.directory, PREFERENCES_FILE),
+                               json.dumps(preferences, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'entries': len(self._index),
+            'bytes': sum(meta.get('size', 0) for meta in self._index.values()),
+        }
+
+    def report(self):
+        """Print the run's counts; the run is done with its bodies by now, so this is where the cache is trimmed"""
+        self.evict()
+        stats = self.stats()
+        print(f"[v0] Fetch cache: {stats['hits']} hits (304), {stats['misses']} misses, "
+              f"{stats['stale']} stale, {stats['entries']} entries, {stats['bytes']} bytes")
+
+
+def _from_cache(url, meta, body_path, cache=None):
+    return CachedResponse(url, 200, {'Content-Type': meta.get('content_type') or ''}, body_path=body_path,
+                          content_hash=meta.get('sha256'), from_cache=True, cache=cache)
+
+
+def cached_get(url, timeout=DEFAULT_TIMEOUT, session=None, cache=None, cancel=None):
+    """GET a URL through the fetch cache, revalidating any stored copy.
+
+    A 304 is served from disk; if the request fails outright, a stored copy is
+    returned as stale rather than failing the run. Successful bodies are
+    streamed to the cache directory rather than buffered in memory. Setting
+    cancel (a threading.Event) abandons the download: the connection is closed,
+    nothing is cached and FetchCancelled is raised.
+    """
+    with get_metrics().stage('fetch', rows=1):
+        return _cached_get(url, timeout, session, cache, cancel)
+
+
+def _cached_get(url, timeout, session, cache, cancel=None):
+    import requests
+
+    session = session or get_session()
+    cache = cache or get_cache()
+    cached = cache.lookup(url)
+    headers = cache.conditional_headers(cached[0]) if cached else {}
+
+    try:
+        response = session.get(url, timeout=timeout, headers=headers, stream=True)
+    except requests.RequestException:
+        if cached is None:
+            raise
+        meta, body_path = cached
+        cache.refresh(url, meta)
+        return _from_cache(url, meta, body_path, cache)
+
+    with response:
+        if cancel is not None and cancel.is_set():
+            raise FetchCancelled(url)
+
+        if response.status_code == 304 and cached is not None:
+            meta, body_path = cached
+            cache.refresh(url, meta, response)
+            return _from_cache(url, meta, body_path, cache)
+
+        if response.status_code == 200:
+            meta, body_path = cache.store(url, response, cancel)
+            return CachedResponse(url, 200, response.headers, body_path=body_path, content_hash=meta['sha256'],
+                                  cache=cache)
+
+        return CachedResponse(url, response.status_code, response.headers, content=response.content)
+
+
+def fetch_response(url, session=None, timeout=DEFAULT_TIMEOUT, limiter=None):
+    """Fetch a URL and return its disk-backed response, or None on failure"""
+    try:
+        if limiter is None:
+            response = cached_get(url, timeout=timeout, session=session)
+        else:
+            with limiter.slot(url):
+                response = cached_get(url, timeout=timeout, session=session)
+        response.raise_for_status()
+        return response
+    except Exception as e:
+        print(f"[v0] Error fetching {url}: {e}")
+        return None
+
+
+def fetch_text(url, session=None, timeout=DEFAULT_TIMEOUT, limiter=None):
+    """Fetch a URL and return the response text, or None on failure"""
+    response = fetch_response(url, session, timeout, limiter)
+    return response.text if response is not None else None
+
+
+def fetch_many(urls, max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT,
+               stream=False):
+    """Fetch URLs concurrently and yield (url, text) pairs in input order.
+
+    With stream=True the pairs carry disk-backed responses instead of text, so
+    bodies can be parsed with iter_lines without being loaded into memory.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    urls = list(urls)
+    if not urls:
+        return
+
+    session = get_session(pool_size=max(max_workers, per_host))
+    limiter = HostLimiter(per_host)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        fetch = fetch_response if stream else fetch_text
+        futures = [pool.submit(fetch, url, session, timeout, limiter) for url in urls]
+        for url, future in zip(urls, futures):
+            yield url, future.result()
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF):
+    """Exponential backoff with full jitter for retry number attempt (1-based)"""
+    return random.uniform(0, base * 2 ** attempt)
+
+
+def _is_usable(response):
+    return response.status_code == 200 and bool(response.content.strip())
+
+
+def hedged_get(urls, hedge_delay=DEFAULT_HEDGE_DELAY, timeout=DEFAULT_TIMEOUT, accept=_is_usable,
+               retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, session=None, cache=None):
+    """GET whichever of several interchangeable URLs answers first, hedging slow ones.
+
+    urls[0] is requested first. Each time hedge_delay seconds pass without an
+    accepted answer, or a candidate fails, the next URL is fired as well
+    (hedge_delay=0 races them all at once). The first response passing
+    accept(response) wins and the others are cancelled: they stop reading at
+    their next chunk, close their connection and leave the cache untouched
+    (they run in daemon threads, so a request still waiting for its first
+    bytes never holds up the caller or interpreter exit). If every
+    candidate fails, the round is retried up to retries times after a jittered
+    backoff. Returns (url, response), or (None, None).
+    """
+    urls = list(urls)
+    session = session or get_session(pool_size=max(len(urls), DEFAULT_WORKERS))
+    cache = cache or get_cache()
+
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff_delay(attempt, backoff)
+            print(f"[v0] All {len(urls)} endpoints failed, retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+        results = queue.Queue()
+        cancel = threading.Event()
+
+        def request(url):
+            try:
+                response = cached_get(url, timeout=timeout, session=session, cache=cache, cancel=cancel)
+                results.put((url, response, accept(response), None))
+            except FetchCancelled:
+                pass
+            except Exception as e:
+                results.put((url, None, False, e))
+
+        pending = list(urls)
+        in_flight = 0
+        next_launch = time.monotonic()
+        while pending or in_flight:
+            now = time.monotonic()
+            if pending and now >= next_launch:
+                threading.Thread(target=request, args=(pending.pop(0),), daemon=True).start()
+                in_flight += 1
+                next_launch = now + hedge_delay
+                continue
+
+            try:
+                url, response, accepted, error = results.get(timeout=max(0, next_launch - now) if pending else None)
+            except queue.Empty:
+                continue
+            in_flight -= 1
+            if accepted:
+                cancel.set()
+                return url, response
+            if error is not None:
+                print(f"[v0] Failed to fetch from {url}: {error}")
+            # A failed candidate hands over to the next one right away
+            next_launch = time.monotonic()
+
+    return None, None
@@ -0,0 +1,75 @@
+"""Streaming JSON serialization.
+
+json.dump goes through the pure-Python encoder and, with indent, builds the
+output a token at a time. write_json walks the outer containers itself and
+encodes each member with json.dumps (the C encoder when minified), writing as
+it goes, so peak memory is one member (e.g. one team) rather than the whole
+document. With indent the bytes are identical to json.dump(..., indent=indent).
+"""
+import json
+
+STREAM_DEPTH = 2  # top-level object and the lists/objects directly in it
+
+
+def _dumps(value, indent):
+    if indent is None:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(value, ensure_ascii=False, indent=indent)
+
+
+def _is_flat(value):
+    """Whether a container holds no containers, so streaming it member by member would gain nothing"""
+    members = value.values() if isinstance(value, dict) else value
+    return not any(isinstance(member, (dict, list)) for member in members)
+
+
+def iter_json(value, indent=None, depth=STREAM_DEPTH, level=0):
+    """Yield the JSON text of value in pieces; containers above depth holding containers are streamed member by member"""
+    if level >= depth or not isinstance(value, (dict, list)) or not value or _is_flat(value):
+        text = _dumps(value, indent)
+        if indent is not None and level:
+            text = text.replace('\n', '\n' + ' ' * (indent * level))
+        yield text
+        return
+
+    is_dict = isinstance(value, dict)
+    open_, close = ('{', '}') if is_dict else ('[', ']')
+    if indent is None:
+        separator, key_separator, closing = ',', ':', close
+        first = ''
+    else:
+        first = '\n' + ' ' * (indent * (level + 1))
+        separator, key_separator, closing = ',' + first, ': ', '\n' + ' ' * (indent * level) + close
+
+    yield open_ + first
+    members = value.items() if is_dict else ((None, item) for item in value)
+    for index, (key, item) in enumerate(members):
+        if index:
+            yield separator
+        if is_dict:
+            yield _dumps(str(key), None) + key_separator
+        yield from iter_json(item, indent, depth, level + 1)
+    yield closing
+
+
+def write_json(f, value, indent=None, depth=STREAM_DEPTH):
+    """Stream value to a text file; indent=None writes minified JSON"""
+    for chunk in iter_json(value, indent, depth):
+        f.write(chunk)
+
+
+def team_references(output_data):
+    """A copy of process_all_tournaments output whose division and regional rankings list team indexes.
+
+    Each ranking is a list of positions in output_data['teams'] (best first)
+    instead of repeated team objects, so every team is written once.
+    """
+    position = {id(team): index for index, team in enumerate(output_data['teams'])}
+    referenced = dict(output_data)
+    referenced['rankings_format'] = 'team_index'
+    for field in ('division_rankings', 'regional_rankings'):
+        referenced[field] = {
+            group: [position[id(team)] for team in teams]
+            for group, teams in output_data[field].items()
+        }
+    return referenced
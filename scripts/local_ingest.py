@@ -0,0 +1,223 @@
+"""Ingest large local CSV archives without reading them into one string.
+
+    python -m scripts archive results-2019-2024.csv [more.csv ...] [--workers 4] [--no-remote]
+
+An archive is a tournament CSV (참가부별, 순위, 팀명, ...) with a 대회명 column
+naming each row's tournament and, since an archive can span several years, a
+대회일자 column dating it (a tournament is dated by its earliest row). It is memory-mapped and split into byte ranges
+that each start at a CSV record: a split point moves on to the first newline
+outside a quoted field, found from the parity of the quote characters before
+it. Forked worker processes decode their range incrementally and run it
+through the same row parsing and aggregation as the fetched tournaments, so a
+worker holds one range's rows at a time and the file is never copied whole.
+
+Splitting on bytes is safe for UTF-8 and CP949, whose multibyte sequences
+never contain '\\n' or '"'; UTF-16 and UTF-32 archives are rejected.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import math
+import mmap
+import os
+
+from parallel_parse import pool_available
+from pipeline_metrics import get_metrics
+from text_decoding import SNIFF_BYTES, StreamDecoder, iter_lines, sniff_encoding
+from tournament_aggregation import apply_contribution, to_placings
+
+ARCHIVE_CHUNK_BYTES = 32 * 1024 * 1024  # target size of one worker job
+MIN_CHUNK_BYTES = 1024 * 1024  # smaller archives are not split further
+READ_BYTES = 1024 * 1024
+
+_parse = None
+
+
+def _open_map(f):
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _blocks(mm, start, end, size=READ_BYTES):
+    for pos in range(start, end, size):
+        yield mm[pos:min(pos + size, end)]
+
+
+def _count_quotes(mm, start, end):
+    return sum(block.count(b'"') for block in _blocks(mm, start, end))
+
+
+def next_record_start(mm, pos, end, in_quotes=False):
+    """The first offset after pos where a CSV record starts; in_quotes says whether pos is inside a quoted field"""
+    odd = in_quotes
+    while pos < end:
+        newline = mm.find(b'\n', pos, end)
+        if newline < 0:
+            return end
+        odd ^= _count_quotes(mm, pos, newline) & 1
+        pos = newline + 1
+        if not odd:
+            return pos
+    return end
+
+
+def record_boundaries(mm, start, end, parts):
+    """Offsets splitting [start, end) into at most parts ranges, each starting at a CSV record"""
+    bounds = [start]
+    for part in range(1, parts):
+        target = start + (end - start) * part // parts
+        if target <= bounds[-1]:
+            continue
+        # An odd number of quotes since the last record start means target is inside a quoted field
+        in_quotes = bool(_count_quotes(mm, bounds[-1], target) & 1)
+        boundary = next_record_start(mm, target, end, in_quotes)
+        if boundary >= end:
+            break
+        bounds.append(boundary)
+    bounds.append(end)
+    return bounds
+
+
+def archive_encoding(mm):
+    """(encoding of the records, offset after any BOM), sniffed from the head of the file"""
+    encoding = sniff_encoding(mm[:SNIFF_BYTES])
+    if encoding == 'utf-8-sig':
+        return 'utf-8', 3
+    if encoding in ('utf-16', 'utf-32'):
+        raise ValueError(f"{encoding} archives cannot be split on bytes; save the file as UTF-8 or CP949")
+    return encoding, 0
+
+
+def read_header(mm, start, encoding):
+    """(fieldnames, offset of the first data record) for a header record at start"""
+    end = next_record_start(mm, start, len(mm))
+    text = mm[start:end].decode(encoding, errors='replace')
+    return next(csv.reader(io.StringIO(text)), []), end
+
+
+def archive_digest(path):
+    """SHA-256 of an archive, hashed straight from the memory map"""
+    digest = hashlib.sha256()
+    if os.path.getsize(path):
+        with open(path, 'rb') as f, _open_map(f) as mm:
+            digest.update(mm)
+    return digest.hexdigest()
+
+
+def _init_worker(parse):
+    global _parse
+    _parse = parse
+    get_metrics().reset_after_fork()
+
+
+def _earliest(dates):
+    dates = [date for date in dates if date]
+    return min(dates) if dates else None
+
+
+def _parse_range(path, start, end, fieldnames, encoding, archive_name, in_worker=True):
+    """Parse one byte range into [(tournament name, placings, partial team_stats, date)] in order of appearance"""
+    metrics = get_metrics()
+    with open(path, 'rb') as f, _open_map(f) as mm:
+        with metrics.stage('parse') as span:
+            lines = iter_lines(_blocks(mm, start, end), StreamDecoder(encoding), metrics)
+            teams_data = _parse(lines, fieldnames, archive_name)
+            span.add(rows=len(teams_data))
+
+    pieces = {}
+    for team_data in teams_data:
+        pieces.setdefault(team_data['tournament'], []).append(team_data)
+    results = []
+    with metrics.stage('aggregation'):
+        for tournament_name, rows in pieces.items():
+            placings = to_placings(rows)
+            partial = {}
+            apply_contribution(partial, placings)
+            results.append((tournament_name, placings, partial, _earliest(row.get('date') for row in rows)))
+    return results, metrics.drain() if in_worker and metrics.enabled else None
+
+
+def read_archive(path, parse, workers=1, archive_name=None):
+    """Parse a local CSV archive in parallel byte ranges.
+
+    parse(lines, fieldnames, archive_name) turns the CSV lines of one range
+    into per-team rows (process_all_tournaments.parse_archive_lines), each
+    with its 'date' (ISO string or None); rows without a tournament name get
+    archive_name, by default the file name. Returns [(tournament name,
+    placings, partial team_stats, date)] in order of first appearance, date
+    being the tournament's earliest row date or None. A tournament found in several ranges comes back with its
+    placings joined (and renumbered) and partial=None, so the caller
+    aggregates them itself.
+    """
+    archive_name = archive_name or os.path.splitext(os.path.basename(path))[0]
+    if not os.path.getsize(path):
+        return []
+    with open(path, 'rb') as f, _open_map(f) as mm:
+        encoding, start = archive_encoding(mm)
+        fieldnames, start = read_header(mm, start, encoding)
+        size = len(mm) - start
+        parts = max(workers, math.ceil(size / ARCHIVE_CHUNK_BYTES))
+        bounds = record_boundaries(mm, start, len(mm), max(1, min(parts, size // MIN_CHUNK_BYTES)))
+    jobs = [(path, range_start, range_end, fieldnames, encoding, archive_name)
+            for range_start, range_end in zip(bounds, bounds[1:])]
+
+    global _parse
+    metrics = get_metrics()
+    if workers > 1 and len(jobs) > 1 and pool_available():
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                       mp_context=multiprocessing.get_context('fork'),
+                                       initializer=_init_worker, initargs=(parse,))
+        with executor:
+            futures = [executor.submit(_parse_range, *job) for job in jobs]
+            results = (future.result() for future in futures)
+            merged = _merge_ranges(results, metrics)
+    else:
+        _parse = parse
+        merged = _merge_ranges((_parse_range(*job, in_worker=False) for job in jobs), metrics)
+    print(f"[v0] Parsed {len(merged)} tournaments from {path} ({size} bytes, {len(jobs)} ranges, {encoding})")
+    return merged
+
+
+def _merge_ranges(results, metrics):
+    """Join the per-range pieces in range order"""
+    merged = {}
+    for pieces, worker_metrics in results:
+        if worker_metrics:
+            metrics.merge(worker_metrics)
+        for tournament_name, placings, partial, date in pieces:
+            entry = merged.get(tournament_name)
+            if entry is None:
+                merged[tournament_name] = [placings, partial, date]
+            else:
+                # Each range numbers its rows from 0; continue from the rows already joined
+                offset = len(entry[0])
+                entry[0].extend(placing._replace(row=placing.row + offset) for placing in placings)
+                entry[1] = None
+                entry[2] = _earliest((entry[2], date))
+    return [(tournament_name, *entry) for tournament_name, entry in merged.items()]
+
+
+def main(argv=None):
+    import process_all_tournaments
+
+    parser = argparse.ArgumentParser(description='Ingest local CSV archives along with the configured tournaments')
+    parser.add_argument('archives', nargs='+',
+                        help='CSV files with a 대회명 column naming each row\'s tournament and a 대회일자 column dating it')
+    parser.add_argument('--workers', type=int, default=process_all_tournaments.ARCHIVE_WORKERS)
+    parser.add_argument('--no-remote', action='store_true', help='skip the configured tournament URLs')
+    process_all_tournaments.add_run_arguments(parser)
+    args = parser.parse_args(argv)
+    process_all_tournaments.apply_run_arguments(args)
+
+    process_all_tournaments.ARCHIVE_FILES = args.archives
+    process_all_tournaments.ARCHIVE_WORKERS = args.workers
+    if args.no_remote:
+        process_all_tournaments.tournaments = []
+    process_all_tournaments.main([])
+
+
+if __name__ == "__main__":
+    main()
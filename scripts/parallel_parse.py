@@ -0,0 +1,77 @@
+import os
+from contextlib import contextmanager
+
+from http_fetch import CachedResponse
+from pipeline_metrics import get_metrics
+from tournament_aggregation import apply_contribution, to_placings
+
+_parse = None
+
+
+def pool_available():
+    """Workers are forked so they inherit the caller's parse function without pickling it"""
+    import multiprocessing
+
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def _init_worker(parse):
+    global _parse
+    _parse = parse
+    get_metrics().reset_after_fork()
+
+
+def _parse_partial(tournament_name, url, headers, encoding, body_path, content_hash):
+    """Map step: parse one cached CSV body into placings and build the team_stats of those alone"""
+    metrics = get_metrics()
+    response = CachedResponse(url, 200, headers, body_path=body_path, content_hash=content_hash, encoding=encoding)
+    placings = to_placings(_parse(response, tournament_name))
+    partial = {}
+    with metrics.stage('aggregation'):
+        apply_contribution(partial, placings)
+    # Pickled together, so the partial's records come back as the very placings that are stored
+    return placings, partial, metrics.drain() if metrics.enabled else None
+
+
+def pool_size(jobs, workers, min_bytes):
+    """Worker processes worth starting for (tournament_name, response) jobs; 0 means parse in this process.
+
+    Forking and tearing down a pool costs about as much as parsing a few
+    hundred KB, so it is only used for at least two jobs whose cached bodies
+    add up to min_bytes, and never with more workers than jobs.
+    """
+    if workers < 2 or len(jobs) < 2 or not pool_available():
+        return 0
+    if sum(os.path.getsize(response.body_path) for _, response in jobs) < min_bytes:
+        return 0
+    return min(workers, len(jobs))
+
+
+@contextmanager
+def parse_in_pool(jobs, parse, workers):
+    """Parse (tournament_name, response) jobs in forked worker processes.
+
+    parse(response, tournament_name) runs in the workers on responses whose
+    body is in the fetch cache. Yields {tournament_name: future} right away, so
+    results can be merged in order while later tournaments parse; each future
+    resolves to (placings, partial team_stats, worker metrics or None); the
+    first two go to TournamentState.replace. Leaving the block waits for the
+    workers to exit, after cancelling jobs that have not started if it is left
+    by an exception.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                                   initializer=_init_worker, initargs=(parse,))
+    try:
+        futures = {}
+        for tournament_name, response in jobs:
+            futures[tournament_name] = executor.submit(
+                _parse_partial, tournament_name, response.url, dict(response.headers), response.encoding,
+                response.body_path, response.content_hash)
+        yield futures
+    except BaseException:
+        executor.shutdown(cancel_futures=True)
+        raise
+    executor.shutdown()
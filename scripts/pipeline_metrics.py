@@ -0,0 +1,304 @@
+"""Per-stage timing and counters for the processing scripts.
+
+Stages (fetch, decode, csv_parse, region, scoring, aggregation, ranking,
+serialization) record calls, wall and CPU time, rows and bytes. Nested stages
+are accounted exclusively as well, so the self_* columns add up to the run
+time. Collection is off unless a script runs with
+
+    PIPELINE_METRICS=metrics.json    write a JSON report to this path
+    PIPELINE_PROFILE=cprofile        also profile the run (stats saved next to the report)
+    PIPELINE_PROFILE=tracemalloc     also record the top allocation sites in the report
+
+PIPELINE_PROFILE on its own turns collection on too, with the report written
+to <script>_metrics.json in the working directory.
+
+When off, instrumented calls cost one attribute check; when on, each
+instrumented row costs a few microseconds.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+METRICS_ENV = 'PIPELINE_METRICS'
+PROFILE_ENV = 'PIPELINE_PROFILE'
+PROFILE_TOP_N = 25
+DEFAULT_REPORT = '{script}_metrics.json'  # report path when only PIPELINE_PROFILE is set
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide metrics collector, creating it on first use"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
+
+
+class StageStats:
+    __slots__ = ('calls', 'wall', 'cpu', 'self_wall', 'self_cpu', 'rows', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.self_wall = 0.0
+        self.self_cpu = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'wall_seconds': round(self.wall, 6),
+            'cpu_seconds': round(self.cpu, 6),
+            'self_wall_seconds': round(self.self_wall, 6),
+            'self_cpu_seconds': round(self.self_cpu, 6),
+            'rows': self.rows,
+            'bytes': self.bytes
+        }
+
+
+class _Span:
+    """One running stage; rows and bytes can be added while it is open"""
+
+    __slots__ = ('metrics', 'name', 'rows', 'bytes', 'wall_start', 'cpu_start', 'child_wall', 'child_cpu')
+
+    def __init__(self, metrics, name, rows=0, nbytes=0):
+        self.metrics = metrics
+        self.name = name
+        self.rows = rows
+        self.bytes = nbytes
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+
+    def add(self, rows=0, nbytes=0):
+        self.rows += rows
+        self.bytes += nbytes
+
+    def __enter__(self):
+        self.metrics._stack().append(self)
+        self.cpu_start = time.thread_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.thread_time() - self.cpu_start
+        stack = self.metrics._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        self.metrics._record(self.name, wall, cpu, wall - self.child_wall, cpu - self.child_cpu, self.rows, self.bytes)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def add(self, rows=0, nbytes=0):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = None
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, wall, cpu, self_wall, self_cpu, rows, nbytes):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.calls += 1
+            stats.wall += wall
+            stats.cpu += cpu
+            stats.self_wall += self_wall
+            stats.self_cpu += self_cpu
+            stats.rows += rows
+            stats.bytes += nbytes
+
+    def enable(self):
+        self.enabled = True
+        self.stages = {}
+        self.counters = {}
+        self._started = (time.time(), time.perf_counter(), time.process_time())
+
+    def stage(self, name, rows=0, nbytes=0):
+        """Context manager timing one stage call; returns a span with add(rows=, nbytes=)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, rows, nbytes)
+
+    def call(self, name, fn, *args):
+        """fn(*args), timed as one row of stage name"""
+        if not self.enabled:
+            return fn(*args)
+        with _Span(self, name, 1):
+            return fn(*args)
+
+    def iter(self, name, iterable):
+        """Wrap an iterator so each next() is timed as one row of stage name"""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(name, iter(iterable))
+
+    def _timed_iter(self, name, iterator):
+        while True:
+            with _Span(self, name) as span:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                span.rows = 1
+            yield item
+
+    def reset_after_fork(self):
+        """Forget the parent's stats and open stages in a forked worker; the collector stays enabled"""
+        self._local = threading.local()
+        self.drain()
+
+    def drain(self):
+        """Return and reset the stage stats and counters collected so far (e.g. in a worker process)"""
+        with self._lock:
+            stages, counters = self.stages, self.counters
+            self.stages, self.counters = {}, {}
+        return stages, counters
+
+    def merge(self, collected):
+        """Add stats returned by drain() in another process"""
+        stages, counters = collected
+        with self._lock:
+            for name, other in stages.items():
+                stats = self.stages.get(name)
+                if stats is None:
+                    stats = self.stages[name] = StageStats()
+                for field in StageStats.__slots__:
+                    setattr(stats, field, getattr(stats, field) + getattr(other, field))
+            for name, n in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self, script=None):
+        """Everything collected so far as a JSON-serializable dict"""
+        started_at, wall_start, cpu_start = self._started or (time.time(), time.perf_counter(), time.process_time())
+        report = {
+            'script': script,
+            'started_at': started_at,
+            'wall_seconds': round(time.perf_counter() - wall_start, 6),
+            'cpu_seconds': round(time.process_time() - cpu_start, 6),
+            'stages': {name: stats.to_dict() for name, stats in self.stages.items()},
+            'counters': dict(self.counters)
+        }
+
+        # Cache statistics from the shared fetch cache and the region memo, if they were used
+        http_fetch = sys.modules.get('http_fetch')
+        if http_fetch is not None and http_fetch._cache is not None:
+            report['fetch_cache'] = http_fetch._cache.stats()
+        region_resolver = sys.modules.get('region_resolver')
+        if region_resolver is not None:
+            info = region_resolver.resolve_region.cache_info()
+            report['region_cache'] = {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+        return report
+
+    def print_summary(self):
+        print(f"[v0] {'stage':<14} {'calls':>9} {'rows':>10} {'bytes':>12} {'wall s':>9} {'self s':>9} {'cpu s':>9}")
+        for name, stats in sorted(self.stages.items(), key=lambda item: -item[1].self_wall):
+            print(f"[v0] {name:<14} {stats.calls:>9} {stats.rows:>10} {stats.bytes:>12} "
+                  f"{stats.wall:>9.3f} {stats.self_wall:>9.3f} {stats.cpu:>9.3f}")
+
+
+def _start_profile(mode):
+    if mode == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if mode == 'tracemalloc':
+        import tracemalloc
+        tracemalloc.start()
+        return tracemalloc
+    if mode:
+        print(f"[v0] Unknown {PROFILE_ENV}={mode!r}; expected cprofile or tracemalloc")
+    return None
+
+
+def _stop_profile(mode, profiler, report, report_path):
+    if mode == 'cprofile':
+        import pstats
+        profiler.disable()
+        stats_path = f"{os.path.splitext(report_path)[0]}.prof"
+        profiler.dump_stats(stats_path)
+        report['profile'] = stats_path
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+    elif mode == 'tracemalloc':
+        snapshot = profiler.take_snapshot()
+        current, peak = profiler.get_traced_memory()
+        profiler.stop()
+        report['memory'] = {
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top': [
+                {'location': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                for stat in snapshot.statistics('lineno')[:PROFILE_TOP_N]
+            ]
+        }
+
+
+def instrumented(script):
+    """Decorate a script's main() so PIPELINE_METRICS / PIPELINE_PROFILE collect a report for the run"""
+    def decorator(main):
+        @functools.wraps(main)
+        def wrapper(*args, **kwargs):
+            report_path = os.environ.get(METRICS_ENV)
+            mode = os.environ.get(PROFILE_ENV, '').lower()
+            if not report_path:
+                if not mode:
+                    return main(*args, **kwargs)
+                report_path = DEFAULT_REPORT.format(script=script)
+                print(f"[v0] {PROFILE_ENV} is set without {METRICS_ENV}; the report goes to {report_path}")
+
+            metrics = get_metrics()
+            metrics.enable()
+            profiler = _start_profile(mode)
+            try:
+                return main(*args, **kwargs)
+            finally:
+                report = metrics.report(script)
+                if profiler is not None:
+                    _stop_profile(mode, profiler, report, report_path)
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                metrics.print_summary()
+                print(f"[v0] Metrics report saved to {report_path}")
+        return wrapper
+    return decorator
@@ -0,0 +1,351 @@
+"""Append-only columnar log of every placing, with windowed and as-of-date rankings.
+
+    python -m scripts history [--top 20] [--team 서울 A클럽] [--resolve-identity]
+
+    log = PlacingsLog()
+    log.sync(state.tournaments, tournament_names, dates)   # append new or changed tournaments
+    index = log.index(team_key=identity.key)
+    index.ranking(since='2024-07-01')                      # the last 12 months
+    index.ranking(until='2025-06-30')                      # as of a date
+
+Each column (team id, tournament id, date, rank code, points) is a flat binary
+file in placings_log/ that only ever grows; meta.json names the ids and says
+how many rows are committed, so a run that dies mid-append leaves the log at
+its previous length. A tournament whose CSV changed is appended again under a
+new id and the old id is retired; retired rows are dropped once they make up
+more than COMPACT_RATIO of the log. Tournaments without a date are logged as
+UNDATED: they count towards all-time rankings but fall outside every date
+window. Only archive tournaments carry dates so far (the tournament list has
+none), so the history command ranks all time; windows are library calls.
+
+The index keeps each team's record offsets in date order with running totals
+of its points, so a window costs two binary searches per team instead of a
+pass over every placing.
+"""
+import argparse
+import array
+import datetime
+import json
+import os
+from bisect import bisect_left, bisect_right
+
+from atomic_output import atomic_write
+from tournament_aggregation import preferred_spelling
+
+LOG_DIR = 'placings_log'
+META_FILE = 'meta.json'
+LOG_VERSION = 2  # version 1 dated undated tournaments by the day they were logged
+COMPACT_RATIO = 0.5
+
+# Column name -> array typecode; dates are proleptic Gregorian ordinals (datetime.date.toordinal)
+COLUMNS = (('team', 'I'), ('tournament', 'I'), ('date', 'i'), ('rank', 'H'), ('points', 'i'))
+UNDATED = -1  # date column value of tournaments without a date; sorts before every real date
+
+
+def to_day(value):
+    """Day ordinal of a date, datetime or ISO date string"""
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+def from_day(day):
+    return datetime.date.fromordinal(day).isoformat() if day != UNDATED else None
+
+
+class PlacingsLog:
+    """The columns in memory as arrays, plus the id tables from meta.json"""
+
+    def __init__(self, directory=LOG_DIR):
+        self.directory = directory
+        self._reset()
+        self.load()
+
+    def _reset(self):
+        self.teams = []  # team id -> raw team name
+        self.tournaments = []  # tournament id -> {'name', 'hash', 'date', 'active'}
+        self.rankings = []  # rank code -> ranking string
+        self.columns = {name: array.array(code) for name, code in COLUMNS}
+        self.committed = 0
+        self._team_ids = {}
+        self._rank_codes = {}
+
+    def __len__(self):
+        return len(self.columns['team'])
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load(self):
+        try:
+            with open(self._path(META_FILE), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get('version') != LOG_VERSION:
+            return
+        self.teams = meta['teams']
+        self.tournaments = meta['tournaments']
+        self.rankings = meta['rankings']
+        self._team_ids = {name: team_id for team_id, name in enumerate(self.teams)}
+        self._rank_codes = {ranking: code for code, ranking in enumerate(self.rankings)}
+        self.committed = meta['records']
+        try:
+            for name, column in self.columns.items():
+                # Rows past the committed count are from an append that never finished
+                with open(self._path(f"{name}.bin"), 'rb') as f:
+                    column.fromfile(f, self.committed)
+        except (OSError, EOFError):
+            print(f"[v0] {self.directory}/ is missing committed rows, starting a new placings log")
+            self._reset()
+
+    def active_tournaments(self):
+        """{tournament name: id} of the current version of each tournament"""
+        return {entry['name']: tournament_id for tournament_id, entry in enumerate(self.tournaments)
+                if entry['active']}
+
+    def append(self, tournament_name, digest, day, placings):
+        """Append one tournament's placings (tournament_aggregation.Placing) under a new tournament id.
+
+        day is a day ordinal, or None for an undated tournament.
+        """
+        previous = self.active_tournaments().get(tournament_name)
+        if previous is not None:
+            self.tournaments[previous]['active'] = False
+        tournament_id = len(self.tournaments)
+        self.tournaments.append({'name': tournament_name, 'hash': digest, 'date': day, 'active': True})
+
+        columns = self.columns
+        for placing in placings:
+            team_id = self._team_ids.get(placing.team_name)
+            if team_id is None:
+                team_id = self._team_ids[placing.team_name] = len(self.teams)
+                self.teams.append(placing.team_name)
+            code = self._rank_codes.get(placing.ranking)
+            if code is None:
+                code = self._rank_codes[placing.ranking] = len(self.rankings)
+                self.rankings.append(placing.ranking)
+            columns['team'].append(team_id)
+            columns['tournament'].append(tournament_id)
+            columns['date'].append(UNDATED if day is None else day)
+            columns['rank'].append(code)
+            columns['points'].append(placing.points)
+
+    def retire(self, tournament_name):
+        tournament_id = self.active_tournaments().get(tournament_name)
+        if tournament_id is not None:
+            self.tournaments[tournament_id]['active'] = False
+
+    def sync(self, tournaments, tournament_names, dates=None):
+        """Bring the log up to date with TournamentState.tournaments and commit; returns (appended, retired).
+
+        Tournaments whose hash differs from their logged version are appended
+        again, as are those whose date changed; those not in tournament_names
+        are retired. A tournament is dated by dates[name] (a date or ISO
+        string); without one it is logged undated.
+        """
+        dates = dates or {}
+        active = self.active_tournaments()
+        appended = retired = 0
+        for name in tournament_names:
+            entry = tournaments.get(name)
+            if entry is None:
+                continue
+            logged = self.tournaments[active[name]] if name in active else None
+            day = to_day(dates[name]) if dates.get(name) else None
+            if logged is not None and logged['hash'] == entry['hash'] and logged['date'] == day:
+                continue
+            self.append(name, entry['hash'], day, entry['placings'])
+            appended += 1
+        keep = set(tournament_names)
+        for name in active:
+            if name not in keep:
+                self.retire(name)
+                retired += 1
+        if appended or retired:
+            self.commit()
+        return appended, retired
+
+    def retired_rows(self):
+        retired = {tournament_id for tournament_id, entry in enumerate(self.tournaments) if not entry['active']}
+        return sum(1 for tournament_id in self.columns['tournament'] if tournament_id in retired) if retired else 0
+
+    def commit(self):
+        """Append the new rows to the column files, then record the new length in meta.json"""
+        os.makedirs(self.directory, exist_ok=True)
+        if len(self) and self.retired_rows() > COMPACT_RATIO * len(self):
+            self.compact()
+            return
+        for name, column in self.columns.items():
+            with open(self._path(f"{name}.bin"), 'ab') as f:
+                # Drop the tail of an append that never committed before adding to the file
+                f.truncate(self.committed * column.itemsize)
+                column[self.committed:].tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+        self._write_meta()
+
+    def compact(self):
+        """Rewrite the log without the rows of retired tournaments, renumbering the tournament ids"""
+        remap, tournaments = {}, []
+        for tournament_id, entry in enumerate(self.tournaments):
+            if entry['active']:
+                remap[tournament_id] = len(tournaments)
+                tournaments.append(entry)
+        keep = [row for row, tournament_id in enumerate(self.columns['tournament']) if tournament_id in remap]
+        columns = {name: array.array(code, (self.columns[name][row] for row in keep)) for name, code in COLUMNS}
+        columns['tournament'] = array.array('I', (remap[tournament_id] for tournament_id in columns['tournament']))
+        self.columns, self.tournaments = columns, tournaments
+
+        os.makedirs(self.directory, exist_ok=True)
+        for name, column in self.columns.items():
+            path = self._path(f"{name}.bin")
+            with atomic_write(path, 'wb', None, fsync=True) as f:
+                column.tofile(f)
+        self._write_meta()
+
+    def _write_meta(self):
+        self.committed = len(self)
+        path = self._path(META_FILE)
+        with atomic_write(path, fsync=True) as f:
+            json.dump({
+                'version': LOG_VERSION,
+                'records': self.committed,
+                'teams': self.teams,
+                'tournaments': self.tournaments,
+                'rankings': self.rankings
+            }, f, ensure_ascii=False)
+
+    def index(self, team_key=None, display_name=None):
+        return PlacingsIndex(self, team_key, display_name)
+
+
+class PlacingsIndex:
+    """Per-team offsets into the log in date order, with prefix sums of points.
+
+    team_key groups raw team names (e.g. TeamIdentity.key) and display_name
+    turns a key back into the name shown; by default a key is shown as its
+    most frequent spelling (ties go to the earliest). Only the active version
+    of each tournament is indexed; undated placings sort first and are skipped
+    by any date bound.
+    """
+
+    def __init__(self, log, team_key=None, display_name=None):
+        self.log = log
+        self.display_name = display_name
+        active = {tournament_id for tournament_id, entry in enumerate(log.tournaments) if entry['active']}
+        columns = log.columns
+        keys = [team_key(name) if team_key else name for name in log.teams]
+
+        rows = {}  # key -> [(day, row)], keys in order of first appearance
+        for row, (team_id, tournament_id, day) in enumerate(zip(columns['team'], columns['tournament'],
+                                                                  columns['date'])):
+            if tournament_id in active:
+                rows.setdefault(keys[team_id], []).append((day, row))
+
+        self.offsets, self.days, self.points = {}, {}, {}
+        names = {}
+        for key, entries in rows.items():
+            entries.sort()
+            offsets = self.offsets[key] = array.array('I', (row for _, row in entries))
+            self.days[key] = array.array('i', (day for day, _ in entries))
+            cumulative = self.points[key] = array.array('q', [0])
+            total = 0
+            for row in offsets:
+                total += columns['points'][row]
+                cumulative.append(total)
+            names[key] = preferred_spelling(log.teams[columns['team'][row]] for row in offsets)
+        self._names = names
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def name(self, key):
+        return self.display_name(key) if self.display_name else self._names.get(key, key)
+
+    def _span(self, key, since=None, until=None):
+        days = self.days[key]
+        if since is not None:
+            start = bisect_left(days, to_day(since))
+        elif until is not None:
+            # Undated placings belong to no date range
+            start = bisect_right(days, UNDATED)
+        else:
+            start = 0
+        stop = len(days) if until is None else bisect_right(days, to_day(until))
+        return start, stop
+
+    def team_points(self, key, since=None, until=None):
+        """(points, placings) of one team between since and until, both inclusive"""
+        if key not in self.days:
+            return 0, 0
+        start, stop = self._span(key, since, until)
+        if stop <= start:
+            return 0, 0
+        return self.points[key][stop] - self.points[key][start], stop - start
+
+    def ranking(self, since=None, until=None, limit=None):
+        """Teams by points from placings dated since..until (either may be None); ties keep first-appearance order"""
+        ranked = []
+        for order, key in enumerate(self.days):
+            points, placings = self.team_points(key, since, until)
+            if placings:
+                ranked.append((-points, order, key, placings))
+        ranked.sort()
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [{'team_name': self.name(key), 'total_points': -negative_points, 'total_tournaments': placings}
+                for negative_points, _, key, placings in ranked]
+
+    def window(self, days, as_of=None, limit=None):
+        """Ranking over the days up to and including as_of (default today)"""
+        end = to_day(as_of) if as_of is not None else datetime.date.today().toordinal()
+        return self.ranking(from_day(end - days + 1), from_day(end), limit)
+
+    def history(self, key, since=None, until=None):
+        """One team's placings in date order, read through its offsets"""
+        if key not in self.offsets:
+            return []
+        start, stop = self._span(key, since, until)
+        columns, log = self.log.columns, self.log
+        return [{
+            'name': log.tournaments[columns['tournament'][row]]['name'],
+            'date': from_day(columns['date'][row]),
+            'ranking': log.rankings[columns['rank'][row]],
+            'points': columns['points'][row]
+        } for row in self.offsets[key][start:stop]]
+
+
+def main(argv=None):
+    import process_all_tournaments
+    from team_identity import TeamIdentity
+
+    parser = argparse.ArgumentParser(description='All-time rankings from the placings log')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--team', help='list one team\'s placings instead')
+    parser.add_argument('--log', default=LOG_DIR, help='placings log directory')
+    parser.add_argument('--resolve-identity', action='store_true',
+                        default=process_all_tournaments.RESOLVE_TEAM_IDENTITY,
+                        help='rank by canonical team identity, as the pipeline run that wrote the log')
+    args = parser.parse_args(argv)
+
+    log = PlacingsLog(args.log)
+    identity = TeamIdentity() if args.resolve_identity else None
+    index = log.index(identity.key if identity else None)
+    print(f"[v0] {len(log)} placings of {len(index)} teams in {args.log}/")
+
+    if args.team:
+        key = identity.key(args.team) if identity else args.team
+        for placing in index.history(key):
+            print(f"{placing['date'] or 'undated':10}  {placing['name']}: {placing['ranking']} "
+                  f"({placing['points']} points)")
+        return
+
+    for rank, team in enumerate(index.ranking(limit=args.top), 1):
+        print(f"{rank}. {team['team_name']} - {team['total_points']} points ({team['total_tournaments']} placings)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,114 @@
-import requests
+import argparse
 import csv
-import json
+import datetime
+import itertools
+import os
+import re
 from io import StringIO
-from collections import defaultdict
 
-def fetch_csv_data(url):
+from http_fetch import DEFAULT_TIMEOUT, fetch_many, fetch_text, get_cache
+from parallel_parse import parse_in_pool, pool_size
+from pipeline_metrics import get_metrics, instrumented
+from ranking_index import RankingIndex, points_sort_key
+from region_resolver import resolve_region
+from sharded_output import SHARD_DIR, write_sharded_output
+from sqlite_store import DB_FILE, write_sqlite_store
+from team_identity import ALIAS_FILE, TeamIdentity
+from atomic_output import write_json_atomic
+from columnar_aggregation import aggregate_columnar, numpy_available
+from json_writer import team_references
+from local_ingest import archive_digest, read_archive
+from placings_log import LOG_DIR, PlacingsLog
+from tournament_aggregation import TournamentState, apply_contribution, finalize_rankings, intern_row
+
+# Concurrent fetch settings (set FETCH_WORKERS = 1 to fetch one tournament at a time)
+FETCH_WORKERS = 8
+FETCH_PER_HOST = 4
+FETCH_TIMEOUT = DEFAULT_TIMEOUT
+
+# Parse changed tournaments in this many worker processes (set PARSE_WORKERS = 1 to parse in this process)
+PARSE_WORKERS = os.cpu_count() or 1
+# ... but only when at least two tournaments changed and their CSVs add up to this many bytes
+PARSE_POOL_MIN_BYTES = 1 << 20
+
+# Division and regional rankings in the results file list indexes into 'teams' rather than repeating each team;
+# RESULTS_INDENT = None writes it minified, an integer pretty-prints it
+RESULTS_FILE = 'tournament_results.json'
+RESULTS_INDENT = None
+
+# Keep this many previous versions of the results file under .history/ for rollback (--history N)
+RESULTS_HISTORY = 0
+
+# Also write compact per-division/per-region shards with a manifest next to the single JSON file (--shards)
+WRITE_SHARDED_OUTPUT = False
+
+# Also keep an indexed SQLite copy (teams, placings, tournaments, aliases) updated in place (--sqlite)
+WRITE_SQLITE_STORE = False
+
+# 'python' merges per-team dicts incrementally; 'numpy' re-aggregates every stored row with
+# vectorized group-bys, which is faster on long multi-season histories (falls back to python without numpy)
+AGGREGATION_ENGINE = 'python'
+
+# Local CSV archives ingested along with the tournaments above: tournament CSVs with a 대회명 column naming
+# each row's tournament, memory-mapped and parsed in ARCHIVE_WORKERS processes (see local_ingest)
+ARCHIVE_FILES = []
+ARCHIVE_WORKERS = os.cpu_count() or 1
+ARCHIVE_TOURNAMENT_COLUMN = '대회명'
+# ... and dated by this column (YYYY-MM-DD, YYYY.MM.DD or YYYY년 M월 D일; a tournament takes its earliest date)
+ARCHIVE_DATE_COLUMN = '대회일자'
+DATE_PATTERN = re.compile(r'(\d{4})\s*[-./년]\s*(\d{1,2})\s*[-./월]\s*(\d{1,2})')
+
+# Aggregate teams by canonical identity (spacing, case and punctuation ignored, plus accepted merges from
+# team_aliases.json) and propose likely duplicate names for review (--resolve-identity); False keys teams by the
+# raw name and leaves team_aliases.json alone
+RESOLVE_TEAM_IDENTITY = False
+
+# Rebuild the rankings from every stored tournament after the incremental update and stop, without writing
+# the outputs, if the two differ (--check-rebuild)
+CHECK_REBUILD = False
+
+# Also append each new or changed tournament's placings to the columnar log (--placings-log; python -m scripts
+# history); a tournament is dated by a 'date' entry below or its archive's ARCHIVE_DATE_COLUMN, and undated ones
+# are left out of any date window
+WRITE_PLACINGS_LOG = False
+
+def build_ranking_index(final_rankings):
+    """Index teams by total points, overall and per division and region"""
+    return RankingIndex(points_sort_key, group_by=('division', 'region'),
+                        items=((team['team_name'], team) for team in final_rankings))
+
+def fetch_csv_data(url, timeout=FETCH_TIMEOUT):
     """Fetch CSV data from URL"""
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.text
-    except Exception as e:
-        print(f"[v0] Error fetching {url}: {e}")
-        return None
+    return fetch_text(url, timeout=timeout)
+
+def fetch_tournaments(tournaments):
+    """Fetch every tournament CSV concurrently, yielding (tournament, response) in list order.
+
+    Bodies are streamed to the fetch cache on disk; each response is parsed
+    from there line by line.
+    """
+    urls = [tournament['url'] for tournament in tournaments]
+    fetched = fetch_many(urls, max_workers=FETCH_WORKERS, per_host=FETCH_PER_HOST, timeout=FETCH_TIMEOUT,
+                         stream=True)
+    for tournament, (_, response) in zip(tournaments, fetched):
+        yield tournament, response
+
+def iter_csv_rows(lines, fieldnames=None):
+    """Yield cleaned rows one at a time from an iterable of CSV lines (headed by fieldnames, if given)"""
+    csv_reader = get_metrics().iter('csv_parse', csv.DictReader(lines, fieldnames))
+    
+    for row in csv_reader:
+        # Clean up the row data
+        cleaned_row = {}
+        for key, value in row.items():
+            if key and value:
+                # Handle Korean encoding issues
+                cleaned_key = key.strip()
+                cleaned_value = value.strip()
+                cleaned_row[cleaned_key] = cleaned_value
+        
+        if cleaned_row:
+            yield cleaned_row
 
 def parse_csv_content(csv_content):
     """Parse CSV content and extract tournament data"""
@@ -20,32 +116,18 @@ def parse_csv_content(csv_content):
         return []
     
     try:
-        # Handle different encodings
-        csv_reader = csv.DictReader(StringIO(csv_content))
-        results = []
-        
-        for row in csv_reader:
-            # Clean up the row data
-            cleaned_row = {}
-            for key, value in row.items():
-                if key and value:
-                    # Handle Korean encoding issues
-                    cleaned_key = key.strip()
-                    cleaned_value = value.strip()
-                    cleaned_row[cleaned_key] = cleaned_value
-            
-            if cleaned_row:
-                results.append(cleaned_row)
-        
-        return results
+        return list(iter_csv_rows(StringIO(csv_content)))
     except Exception as e:
         print(f"[v0] Error parsing CSV: {e}")
         return []
 
 def process_tournament_data(tournament_results, tournament_name):
     """Process tournament results and extract team rankings"""
-    teams_data = []
-    
+    return list(iter_tournament_data(tournament_results, tournament_name))
+
+def iter_tournament_data(tournament_results, tournament_name):
+    """Yield team rankings one row at a time from tournament results"""
+    metrics = get_metrics()
     for result in tournament_results:
         # Extract key information from each row
         division = result.get('참가부별', result.get('부별', ''))
@@ -56,10 +138,10 @@ def process_tournament_data(tournament_results, tournament_name):
         
         if team_name and division:
             # Determine region from team name
-            region = determine_region(team_name)
+            region = metrics.call('region', determine_region, team_name)
             
             # Calculate points based on ranking
-            points = calculate_points(ranking)
+            points = metrics.call('scoring', calculate_points, ranking)
             
             team_data = {
                 'team_name': team_name,
@@ -71,27 +153,50 @@ def process_tournament_data(tournament_results, tournament_name):
                 'mvp': mvp,
                 'coach': coach
             }
-            teams_data.append(team_data)
+            yield intern_row(team_data)
+
+def parse_date(value):
+    """ISO date (YYYY-MM-DD) of the first date written in value, or None"""
+    match = DATE_PATTERN.search(value or '')
+    if not match:
+        return None
+    try:
+        return datetime.date(*map(int, match.groups())).isoformat()
+    except ValueError:
+        return None
+
+def iter_archive_data(rows, archive_name):
+    """Yield team rankings from archive rows, each tournament named by its 대회명 column (archive_name if empty).
+    
+    Each row also carries the date in its ARCHIVE_DATE_COLUMN as 'date' (None if missing).
+    """
+    def tournament_of(row):
+        return row.get(ARCHIVE_TOURNAMENT_COLUMN) or archive_name, parse_date(row.get(ARCHIVE_DATE_COLUMN))
     
-    return teams_data
+    for (tournament_name, date), group in itertools.groupby(rows, key=tournament_of):
+        for team_data in iter_tournament_data(group, tournament_name):
+            team_data['date'] = date
+            yield team_data
+
+def parse_archive_lines(lines, fieldnames, archive_name):
+    """Parse the CSV lines of one byte range of an archive into per-team rows"""
+    return list(iter_archive_data(iter_csv_rows(lines, fieldnames), archive_name))
+
+def parse_tournament(response, tournament_name):
+    """Stream one tournament CSV from its response into per-team rows"""
+    try:
+        with get_metrics().stage('parse') as span:
+            rows = iter_csv_rows(response.iter_lines())
+            teams_data = list(iter_tournament_data(rows, tournament_name))
+            span.add(rows=len(teams_data))
+        return teams_data
+    except Exception as e:
+        print(f"[v0] Error parsing CSV: {e}")
+        return []
 
 def determine_region(team_name):
     """Determine region based on team name"""
-    region_keywords = {
-        '수도권': ['서울', '인천', '경기', '고양', '성남', '수원', '안산', '부천', '의정부', '안양', '평택', '시흥', '파주', '김포', '광명', '광주', '하남', '오산', '구리', '남양주', '용인', '화성', '안성', '의왕', '군포', '양주', '포천', '여주', '연천', '가평', '양평'],
-        '강원권': ['춘천', '원주', '강릉', '동해', '태백', '속초', '삼척', '홍천', '횡성', '영월', '평창', '정선', '철원', '화천', '양구', '인제', '고성', '양양'],
-        '충청권': ['대전', '세종', '청주', '충주', '제천', '보은', '옥천', '영동', '진천', '괴산', '음성', '단양', '증평', '천안', '공주', '보령', '아산', '서산', '논산', '계룡', '당진', '금산', '부여', '서천', '청양', '홍성', '예산', '태안'],
-        '전라권': ['광주', '전주', '군산', '익산', '정읍', '남원', '김제', '완주', '진안', '무주', '장수', '임실', '순창', '고창', '부안', '목포', '여수', '순천', '나주', '광양', '담양', '곡성', '구례', '고흥', '보성', '화순', '장흥', '강진', '해남', '영암', '무안', '함평', '영광', '장성', '완도', '진도', '신안'],
-        '경상권': ['부산', '대구', '울산', '창원', '진주', '통영', '사천', '김해', '밀양', '거제', '양산', '의령', '함안', '창녕', '고성', '남해', '하동', '산청', '함양', '거창', '합천', '포항', '경주', '김천', '안동', '구미', '영주', '영천', '상주', '문경', '경산', '군위', '의성', '청송', '영양', '영덕', '청도', '고령', '성주', '칠곡', '예천', '봉화', '울진', '울릉'],
-        '제주권': ['제주', '서귀포']
-    }
-    
-    for region, keywords in region_keywords.items():
-        for keyword in keywords:
-            if keyword in team_name:
-                return region
-    
-    return '기타'
+    return resolve_region(team_name)
 
 def calculate_points(ranking):
     """Calculate points based on ranking"""
@@ -120,7 +225,8 @@ def calculate_points(ranking):
     except:
         return 5
 
-# Tournament URLs and names
+# Tournament URLs and names. Their dates are not known yet; an entry may add 'date' (its first day, YYYY-MM-DD) to
+# date its placings in the placings log, as ARCHIVE_DATE_COLUMN does for archives
 tournaments = [
     {
         'name': '제7회 남원춘향배 전국남녀 배구대회',
@@ -248,163 +354,289 @@ tournaments = [
     }
 ]
 
-# Process all tournaments
-all_teams_data = []
-tournament_summary = {}
+def generate_division_rankings(final_rankings, ranking_index=None):
+    """Generate rankings by division"""
+    if ranking_index is None:
+        ranking_index = build_ranking_index(final_rankings)
+    return ranking_index.groups('division')
 
-print("[v0] Starting to process tournaments...")
+def generate_regional_rankings(final_rankings, ranking_index=None):
+    """Generate rankings by region"""
+    if ranking_index is None:
+        ranking_index = build_ranking_index(final_rankings)
+    return ranking_index.groups('region')
 
-for tournament in tournaments:
-    print(f"[v0] Processing: {tournament['name']}")
-    
-    # Fetch CSV data
-    csv_content = fetch_csv_data(tournament['url'])
+def ingest_tournaments(state, tournaments):
+    """Fetch every tournament and fold changed ones into state; returns {tournament name: team rows}"""
+    fetched = list(fetch_tournaments(tournaments))
     
-    if csv_content:
-        # Parse CSV content
-        tournament_results = parse_csv_content(csv_content)
-        
-        # Process tournament data
-        teams_data = process_tournament_data(tournament_results, tournament['name'])
-        
-        all_teams_data.extend(teams_data)
-        tournament_summary[tournament['name']] = len(teams_data)
+    # Map: each changed tournament is parsed into rows and a partial team_stats by a worker process
+    jobs = [
+        (tournament['name'], response) for tournament, response in fetched
+        if response is not None and response.body_path
+        and not state.is_current(tournament['name'], response.content_hash)
+    ]
+    workers = pool_size(jobs, PARSE_WORKERS, PARSE_POOL_MIN_BYTES)
+    if workers:
+        with parse_in_pool(jobs, parse_tournament, workers) as pending:
+            return fold_tournaments(state, fetched, pending)
+    return fold_tournaments(state, fetched, {})
+
+def fold_tournaments(state, fetched, pending):
+    """Fold fetched (tournament, response) pairs into state in list order, taking pending parses from the pool"""
+    metrics = get_metrics()
+    tournament_summary = {}
+    for tournament, response in fetched:
+        print(f"[v0] Processing: {tournament['name']}")
         
-        print(f"[v0] Processed {len(teams_data)} teams from {tournament['name']}")
-    else:
-        print(f"[v0] Failed to fetch data for {tournament['name']}")
-
-# Aggregate team statistics
-team_stats = defaultdict(lambda: {
-    'total_points': 0,
-    'tournaments': [],
-    'wins': 0,
-    'second_places': 0,
-    'third_places': 0,
-    'total_tournaments': 0,
-    'division': '',
-    'region': '',
-    'mvp_awards': [],
-    'coaches': []
-})
-
-for team_data in all_teams_data:
-    team_name = team_data['team_name']
-    stats = team_stats[team_name]
+        if response is not None:
+            if tournament['name'] in pending:
+                # Reduce: partials are merged in list order, giving the same team_stats as the serial path
+                placings, partial, worker_metrics = pending.pop(tournament['name']).result()
+                if worker_metrics:
+                    metrics.merge(worker_metrics)
+                with metrics.stage('aggregation'):
+                    state.replace(tournament['name'], response.content_hash, placings, partial)
+                changed = True
+            else:
+                # Parsing is its own stage, so only merging counts as aggregation here
+                with metrics.stage('aggregation'):
+                    placings, changed = state.update(tournament['name'], response.content_hash, parse_tournament,
+                                                     response)
+            tournament_summary[tournament['name']] = len(placings)
+            
+            if changed:
+                print(f"[v0] Processed {len(placings)} teams from {tournament['name']}")
+            else:
+                print(f"[v0] Unchanged, reusing {len(placings)} teams from {tournament['name']}")
+        else:
+            previous_placings = state.previous_placings(tournament['name'])
+            if previous_placings is not None:
+                tournament_summary[tournament['name']] = len(previous_placings)
+                print(f"[v0] Failed to fetch data for {tournament['name']}, keeping previous results")
+            else:
+                print(f"[v0] Failed to fetch data for {tournament['name']}")
     
-    stats['total_points'] += team_data['points']
-    stats['tournaments'].append({
-        'name': team_data['tournament'],
-        'ranking': team_data['ranking'],
-        'points': team_data['points']
-    })
-    stats['total_tournaments'] += 1
-    stats['division'] = team_data['division']
-    stats['region'] = team_data['region']
+    return tournament_summary
+
+def ingest_archives(state, paths, tournament_summary):
+    """Fold the tournaments of local CSV archives into state; returns their names in archive order.
     
-    if team_data['mvp']:
-        stats['mvp_awards'].append(team_data['mvp'])
+    Tournaments are stored under the archive's content hash, so an unchanged
+    archive is not parsed again. Adds each tournament's row count to tournament_summary.
+    """
+    metrics = get_metrics()
+    tournament_names = []
+    for path in paths:
+        print(f"[v0] Processing archive: {path}")
+        digest = f"archive:{archive_digest(path)}"
+        current = [name for name, entry in state.tournaments.items() if entry['hash'] == digest]
+        if current:
+            print(f"[v0] Unchanged, reusing {len(current)} tournaments from {path}")
+        else:
+            for tournament_name, placings, partial, date in read_archive(path, parse_archive_lines, ARCHIVE_WORKERS):
+                with metrics.stage('aggregation'):
+                    state.replace(tournament_name, digest, placings, partial, date)
+                current.append(tournament_name)
+        for tournament_name in current:
+            tournament_summary[tournament_name] = len(state.tournaments[tournament_name]['placings'])
+        tournament_names.extend(current)
+    return tournament_names
+
+def ingest_all(state, tournaments):
+    """Fold the tournament list and then ARCHIVE_FILES into state; returns (tournament_summary, tournament_names).
     
-    if team_data['coach']:
-        stats['coaches'].append(team_data['coach'])
+    tournament_names lists every tournament the state should keep, the
+    archives' included, in list then archive order; prune to exactly these.
+    """
+    tournament_names = [tournament['name'] for tournament in tournaments]
+    tournament_summary = ingest_tournaments(state, tournaments)
+    if ARCHIVE_FILES:
+        archived = ingest_archives(state, ARCHIVE_FILES, tournament_summary)
+        tournament_names = list(dict.fromkeys(tournament_names + archived))
+    return tournament_summary, tournament_names
+
+def record_placings(state, tournament_names):
+    """Append the tournaments that changed since the last run to the placings log and retire removed ones"""
+    dates = {name: entry['date'] for name, entry in state.tournaments.items() if entry.get('date')}
+    dates.update((tournament['name'], tournament['date']) for tournament in tournaments if tournament.get('date'))
+    undated = [name for name in tournament_names if name in state.tournaments and name not in dates]
+    if undated:
+        print(f"[v0] {len(undated)} tournaments have no date ('date' in the tournament list, {ARCHIVE_DATE_COLUMN} "
+              f"in archives) and are left out of windowed rankings: {', '.join(undated[:5])}")
+    with get_metrics().stage('serialization'):
+        appended, retired = PlacingsLog().sync(state.tournaments, tournament_names, dates)
+    if appended or retired:
+        print(f"[v0] Placings log {LOG_DIR}/: {appended} tournaments appended, {retired} retired")
+
+def rank_teams(state, tournament_names, engine=None):
+    """Recompute final_rankings from the merged team statistics"""
+    engine = engine or AGGREGATION_ENGINE
+    if engine == 'numpy' and not numpy_available():
+        print("[v0] numpy is not installed, using the python aggregation engine")
+        engine = 'python'
     
-    # Count medal types
-    ranking = team_data['ranking']
-    if '우승' in ranking or '1' in ranking:
-        stats['wins'] += 1
-    elif '준우승' in ranking or '2' in ranking:
-        stats['second_places'] += 1
-    elif '3위' in ranking or '3' in ranking:
-        stats['third_places'] += 1
-
-# Convert to final format and sort by total points
-final_rankings = []
-for team_name, stats in team_stats.items():
-    final_rankings.append({
-        'team_name': team_name,
-        'total_points': stats['total_points'],
-        'wins': stats['wins'],
-        'second_places': stats['second_places'],
-        'third_places': stats['third_places'],
-        'total_tournaments': stats['total_tournaments'],
-        'division': stats['division'],
-        'region': stats['region'],
-        'tournaments': stats['tournaments'],
-        'mvp_awards': list(set(stats['mvp_awards'])),
-        'coaches': list(set(stats['coaches']))
-    })
-
-# Sort by total points (descending)
-final_rankings.sort(key=lambda x: x['total_points'], reverse=True)
-
-# Print summary
-print(f"\n[v0] Tournament Processing Complete!")
-print(f"[v0] Total teams processed: {len(final_rankings)}")
-print(f"[v0] Total tournaments: {len(tournaments)}")
-
-# Print top 10 teams
-print(f"\n[v0] Top 10 Teams:")
-for i, team in enumerate(final_rankings[:10], 1):
-    print(f"{i}. {team['team_name']} ({team['division']}) - {team['total_points']} points")
-
-def generate_division_rankings(final_rankings):
-    """Generate rankings by division"""
-    division_rankings = defaultdict(list)
+    with get_metrics().stage('aggregation') as span:
+        if engine == 'numpy':
+            contributions = {name: entry['placings'] for name, entry in state.tournaments.items()}
+            final_rankings = aggregate_columnar(contributions, tournament_names, calculate_points, state.team_key)
+        else:
+            final_rankings = finalize_rankings(state.team_stats, tournament_names)
+        span.add(rows=len(final_rankings))
+    return final_rankings
+
+def check_rebuild(state, tournament_names, final_rankings):
+    """Diff incrementally maintained rankings against a rebuild of every stored tournament; returns True if equal"""
+    team_stats = {}
+    for tournament_name in tournament_names:
+        entry = state.tournaments.get(tournament_name)
+        if entry is not None:
+            apply_contribution(team_stats, entry['placings'], 1, state.team_key)
+    rebuilt = finalize_rankings(team_stats, tournament_names)
+    if rebuilt == final_rankings:
+        print(f"[v0] Rankings match a full rebuild ({len(rebuilt)} teams)")
+        return True
     
-    for team in final_rankings:
-        division = team['division']
-        if division:
-            division_rankings[division].append(team)
+    expected = {team['team_name']: team for team in rebuilt}
+    actual = {team['team_name']: team for team in final_rankings}
+    differing = [name for name in expected.keys() | actual.keys() if expected.get(name) != actual.get(name)]
+    print(f"[v0] Rankings differ from a full rebuild for {len(differing)} teams: {', '.join(sorted(differing)[:10])}")
+    if not differing:
+        print("[v0] The same teams are ranked in a different order")
+    return False
+
+def build_results(state, tournament_summary, tournament_names, identity=None):
+    """Rank the merged team statistics; returns (output_data, ranking_index)"""
+    final_rankings = rank_teams(state, tournament_names)
+    
+    if identity is not None:
+        # Near-duplicate names are only proposed; accepted merges go into the alias table's "aliases"
+        proposals = identity.propose_merges(state.team_stats)
+        identity.save()
+        if proposals:
+            print(f"[v0] {len(proposals)} possible duplicate team names listed in {identity.path} for review")
     
-    # Sort each division by total points
-    for division in division_rankings:
-        division_rankings[division].sort(key=lambda x: x['total_points'], reverse=True)
+    # Ranked views overall and per division/region come from one index instead of re-sorting each list
+    with get_metrics().stage('ranking', rows=len(final_rankings)):
+        ranking_index = build_ranking_index(final_rankings)
+        division_rankings = generate_division_rankings(final_rankings, ranking_index)
+        regional_rankings = generate_regional_rankings(final_rankings, ranking_index)
     
-    return dict(division_rankings)
+    output_data = {
+        'tournaments': tournament_summary,
+        'teams': final_rankings,
+        'division_rankings': division_rankings,
+        'regional_rankings': regional_rankings,
+        'total_teams': len(final_rankings),
+        'total_tournaments': len(tournament_names)
+    }
+    return output_data, ranking_index
 
-def generate_regional_rankings(final_rankings):
-    """Generate rankings by region"""
-    regional_rankings = defaultdict(list)
+def print_summary(output_data, ranking_index):
+    print(f"\n[v0] Tournament Processing Complete!")
+    print(f"[v0] Total teams processed: {output_data['total_teams']}")
+    print(f"[v0] Total tournaments: {output_data['total_tournaments']}")
+    
+    # Print top 10 teams
+    print(f"\n[v0] Top 10 Teams:")
+    for i, team in enumerate(ranking_index.top(10), 1):
+        print(f"{i}. {team['team_name']} ({team['division']}) - {team['total_points']} points")
     
-    for team in final_rankings:
-        region = team['region']
-        if region:
-            regional_rankings[region].append(team)
+    # Print division summary
+    print(f"\n[v0] Division Rankings Summary:")
+    for division, teams in output_data['division_rankings'].items():
+        print(f"{division}: {len(teams)} teams")
+        if teams:
+            print(f"  1위: {teams[0]['team_name']} ({teams[0]['total_points']} points)")
     
-    # Sort each region by total points
-    for region in regional_rankings:
-        regional_rankings[region].sort(key=lambda x: x['total_points'], reverse=True)
+    # Print regional summary
+    print(f"\n[v0] Regional Rankings Summary:")
+    for region, teams in output_data['regional_rankings'].items():
+        print(f"{region}: {len(teams)} teams")
+        if teams:
+            print(f"  1위: {teams[0]['team_name']} ({teams[0]['total_points']} points)")
+
+def save_results(output_data, identity=None):
+    """Write tournament_results.json (swapped in atomically), the shards and the SQLite store"""
+    metrics = get_metrics()
+    with metrics.stage('serialization', rows=output_data['total_teams']) as span:
+        changed = write_json_atomic(RESULTS_FILE, team_references(output_data), indent=RESULTS_INDENT,
+                                    history=RESULTS_HISTORY)
+        span.add(nbytes=os.path.getsize(RESULTS_FILE))
+    
+    if changed:
+        print(f"\n[v0] Results saved to {RESULTS_FILE}")
+    else:
+        print(f"\n[v0] Results unchanged in {RESULTS_FILE}")
     
-    return dict(regional_rankings)
-
-division_rankings = generate_division_rankings(final_rankings)
-regional_rankings = generate_regional_rankings(final_rankings)
-
-# Print division summary
-print(f"\n[v0] Division Rankings Summary:")
-for division, teams in division_rankings.items():
-    print(f"{division}: {len(teams)} teams")
-    if teams:
-        print(f"  1위: {teams[0]['team_name']} ({teams[0]['total_points']} points)")
-
-# Print regional summary
-print(f"\n[v0] Regional Rankings Summary:")
-for region, teams in regional_rankings.items():
-    print(f"{region}: {len(teams)} teams")
-    if teams:
-        print(f"  1위: {teams[0]['team_name']} ({teams[0]['total_points']} points)")
-
-# Save results to JSON file
-output_data = {
-    'tournaments': tournament_summary,
-    'teams': final_rankings,
-    'division_rankings': division_rankings,
-    'regional_rankings': regional_rankings,
-    'total_teams': len(final_rankings),
-    'total_tournaments': len(tournaments)
-}
-
-with open('tournament_results.json', 'w', encoding='utf-8') as f:
-    json.dump(output_data, f, ensure_ascii=False, indent=2)
-
-print(f"\n[v0] Results saved to tournament_results.json")
+    if WRITE_SHARDED_OUTPUT:
+        with metrics.stage('serialization'):
+            manifest = write_sharded_output(output_data)
+        print(f"[v0] Wrote {len(manifest['divisions'])} division and {len(manifest['regions'])} region shards to {SHARD_DIR}/")
+    
+    if WRITE_SQLITE_STORE:
+        with metrics.stage('serialization'):
+            changes = write_sqlite_store(output_data, identity=identity)
+        print(f"[v0] Updated {DB_FILE}: {changes['inserted']} new, {changes['updated']} changed, "
+              f"{changes['reranked']} re-ranked, {changes['removed']} removed teams")
+
+def add_output_arguments(parser):
+    """Options for the outputs written besides the results file, defaulting to the settings above"""
+    parser.add_argument('--shards', action='store_true', default=WRITE_SHARDED_OUTPUT,
+                        help=f"also write per-division/per-region shards to {SHARD_DIR}/")
+    parser.add_argument('--sqlite', action='store_true', default=WRITE_SQLITE_STORE,
+                        help=f"also update the SQLite store {DB_FILE}")
+    parser.add_argument('--placings-log', action='store_true', default=WRITE_PLACINGS_LOG,
+                        help=f"also append new placings to {LOG_DIR}/ for windowed rankings")
+    parser.add_argument('--history', type=int, default=RESULTS_HISTORY, metavar='N',
+                        help='keep N previous versions of the JSON outputs under .history/ for rollback')
+    parser.add_argument('--resolve-identity', action='store_true', default=RESOLVE_TEAM_IDENTITY,
+                        help=f"merge spellings of the same team and list likely duplicates in {ALIAS_FILE}")
+
+def apply_output_arguments(args):
+    global WRITE_SHARDED_OUTPUT, WRITE_SQLITE_STORE, WRITE_PLACINGS_LOG, RESULTS_HISTORY, RESOLVE_TEAM_IDENTITY
+    WRITE_SHARDED_OUTPUT = args.shards
+    WRITE_SQLITE_STORE = args.sqlite
+    WRITE_PLACINGS_LOG = args.placings_log
+    RESULTS_HISTORY = args.history
+    RESOLVE_TEAM_IDENTITY = args.resolve_identity
+
+def add_run_arguments(parser):
+    """Options of a run, defaulting to the settings above; apply_run_arguments() sets them"""
+    add_output_arguments(parser)
+    parser.add_argument('--check-rebuild', action='store_true', default=CHECK_REBUILD,
+                        help='diff the incrementally updated rankings against a full rebuild, exit 1 if they differ')
+
+def apply_run_arguments(args):
+    global CHECK_REBUILD
+    apply_output_arguments(args)
+    CHECK_REBUILD = args.check_rebuild
+
+@instrumented('process_all_tournaments')
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch every tournament and rank the teams')
+    add_run_arguments(parser)
+    apply_run_arguments(parser.parse_args(argv))
+    
+    # Process all tournaments, re-parsing only those whose CSV changed since the last run
+    identity = TeamIdentity() if RESOLVE_TEAM_IDENTITY else None
+    state = TournamentState(identity=identity)
+    
+    print("[v0] Starting to process tournaments...")
+    tournament_summary, tournament_names = ingest_all(state, tournaments)
+    
+    state.prune(tournament_names)
+    with get_metrics().stage('serialization'):
+        state.save()
+    if WRITE_PLACINGS_LOG:
+        record_placings(state, tournament_names)
+    
+    output_data, ranking_index = build_results(state, tournament_summary, tournament_names, identity)
+    if CHECK_REBUILD and not check_rebuild(state, tournament_names, output_data['teams']):
+        raise SystemExit(1)
+    print_summary(output_data, ranking_index)
+    save_results(output_data, identity)
+    get_cache().report()
+
+if __name__ == "__main__":
+    main()
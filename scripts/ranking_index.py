@@ -0,0 +1,280 @@
+import heapq
+from bisect import bisect_left, insort
+
+BUCKET_LOAD = 256
+
+
+def medal_sort_key(team):
+    """Score, then wins, runner-ups and thirds, best first (the Google Sheets ordering)"""
+    return (-team['score'], -team['wins'], -team['runnerUp'], -team['third'])
+
+
+def points_sort_key(team):
+    """Total points, best first (the process_all_tournaments ordering)"""
+    return (-team['total_points'],)
+
+
+def top_k(items, k, key):
+    """The k best items by key without sorting the rest; equal keys keep input order"""
+    return heapq.nsmallest(k, items, key=key)
+
+
+class SortedKeyList:
+    """Sorted list of unique keys kept in bounded buckets.
+
+    A Fenwick tree over the bucket sizes gives O(log n) positional lookups;
+    inserts and removals touch one bucket of at most 2 * BUCKET_LOAD keys.
+    """
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + BUCKET_LOAD] for i in range(0, len(keys), BUCKET_LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+        self._tree = None  # rebuilt lazily after a bucket is split or dropped
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    def __contains__(self, key):
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return False
+        bucket = self._buckets[pos]
+        idx = bisect_left(bucket, key)
+        return idx < len(bucket) and bucket[idx] == key
+
+    def _build_tree(self):
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, pos, delta):
+        if self._tree is None:
+            return
+        i = pos + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _offset(self, pos):
+        """Number of keys in the buckets before bucket pos"""
+        if self._tree is None:
+            self._build_tree()
+        total, i = 0, pos
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        """(bucket, offset within it) for a position in the whole list"""
+        if self._tree is None:
+            self._build_tree()
+        pos, step = 0, 1 << len(self._tree).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] <= index:
+                index -= self._tree[nxt]
+                pos = nxt
+            step >>= 1
+        return pos, index
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._tree = None
+            self._len = 1
+            return
+
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._buckets[pos].append(key)
+            self._maxes[pos] = key
+        else:
+            insort(self._buckets[pos], key)
+        self._len += 1
+        self._tree_add(pos, 1)
+
+        bucket = self._buckets[pos]
+        if len(bucket) > 2 * BUCKET_LOAD:
+            self._buckets[pos:pos + 1] = [bucket[:BUCKET_LOAD], bucket[BUCKET_LOAD:]]
+            self._maxes.insert(pos, bucket[BUCKET_LOAD - 1])
+            self._tree = None
+
+    def remove(self, key):
+        pos = bisect_left(self._maxes, key)
+        bucket = self._buckets[pos] if pos < len(self._maxes) else []
+        idx = bisect_left(bucket, key)
+        if idx == len(bucket) or bucket[idx] != key:
+            raise ValueError(f"{key!r} not in list")
+
+        del bucket[idx]
+        self._len -= 1
+        if bucket:
+            self._maxes[pos] = bucket[-1]
+            self._tree_add(pos, -1)
+        else:
+            del self._buckets[pos]
+            del self._maxes[pos]
+            self._tree = None
+
+    def index(self, key):
+        """0-based position of key"""
+        pos = bisect_left(self._maxes, key)
+        bucket = self._buckets[pos] if pos < len(self._maxes) else []
+        idx = bisect_left(bucket, key)
+        if idx == len(bucket) or bucket[idx] != key:
+            raise ValueError(f"{key!r} not in list")
+        return self._offset(pos) + idx
+
+    def count_before(self, key):
+        """Number of keys strictly less than key"""
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._len
+        return self._offset(pos) + bisect_left(self._buckets[pos], key)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('list index out of range')
+        pos, idx = self._locate(index)
+        return self._buckets[pos][idx]
+
+    def islice(self, start=0, stop=None):
+        """Iterate keys in positions [start, stop)"""
+        stop = self._len if stop is None else min(stop, self._len)
+        if start >= stop:
+            return
+        pos, idx = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._buckets[pos][idx:idx + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            pos, idx = pos + 1, 0
+
+
+class RankingIndex:
+    """Items ordered by a sort key, globally and within each value of the group_by fields.
+
+    key(item) returns a tuple where smaller sorts first. Ties keep the order in
+    which items were first added, like a stable sort over the input, and an
+    item keeps its place among ties when it is updated. Items whose group field
+    is empty are left out of that field's groups.
+    """
+
+    def __init__(self, key, group_by=(), items=()):
+        self.key = key
+        self.group_by = tuple(group_by)
+        self._entries = {}  # ident -> (sort key, seq, item)
+        self._items = {}  # seq -> item
+        self._seq = 0
+
+        # Bulk load with one sort per list instead of len(items) inserts
+        grouped = {field: {} for field in self.group_by}
+        for ident, item in items:
+            if ident in self._entries:
+                raise ValueError(f"Duplicate ident {ident!r}")
+            entry = self._new_entry(ident, item)
+            for field in self.group_by:
+                value = item.get(field)
+                if value:
+                    grouped[field].setdefault(value, []).append(entry[:2])
+        self._global = SortedKeyList(entry[:2] for entry in self._entries.values())
+        self._groups = {
+            field: {value: SortedKeyList(keys) for value, keys in groups.items()}
+            for field, groups in grouped.items()
+        }
+
+    def _new_entry(self, ident, item, seq=None):
+        if seq is None:
+            seq = self._seq
+            self._seq += 1
+        entry = self._entries[ident] = (self.key(item), seq, item)
+        self._items[seq] = item
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, ident):
+        return ident in self._entries
+
+    def __iter__(self):
+        return self.items()
+
+    def _keys(self, field=None, value=None):
+        if field is None:
+            return self._global
+        return self._groups[field].get(value) or SortedKeyList()
+
+    def update(self, ident, item):
+        """Insert item, or move it to its new position after its score changed"""
+        previous = self._entries.get(ident)
+        seq = None
+        if previous is not None:
+            seq = previous[1]
+            self._discard(previous)
+        sort_key, seq, _ = self._new_entry(ident, item, seq)
+        self._global.add((sort_key, seq))
+        for field in self.group_by:
+            value = item.get(field)
+            if value:
+                self._groups[field].setdefault(value, SortedKeyList()).add((sort_key, seq))
+
+    def remove(self, ident):
+        self._discard(self._entries.pop(ident))
+
+    def _discard(self, entry):
+        sort_key, seq, item = entry
+        del self._items[seq]
+        self._global.remove((sort_key, seq))
+        for field in self.group_by:
+            value = item.get(field)
+            if value:
+                keys = self._groups[field][value]
+                keys.remove((sort_key, seq))
+                if not keys:
+                    del self._groups[field][value]
+
+    def get(self, ident):
+        entry = self._entries.get(ident)
+        return entry[2] if entry else None
+
+    def rank(self, ident, field=None):
+        """1-based position of ident overall, or within its group for field"""
+        sort_key, seq, item = self._entries[ident]
+        return self._keys(field, item.get(field) if field else None).index((sort_key, seq)) + 1
+
+    def competition_rank(self, ident, field=None):
+        """1 + the number of items with a strictly better key (ties share a rank)"""
+        sort_key, _, item = self._entries[ident]
+        return self._keys(field, item.get(field) if field else None).count_before((sort_key, -1)) + 1
+
+    def items(self, field=None, value=None, start=0, stop=None):
+        """Items in rank order, overall or within one group, optionally for positions [start, stop)"""
+        return (self._items[seq] for _, seq in self._keys(field, value).islice(start, stop))
+
+    def top(self, k, field=None, value=None):
+        return list(self.items(field, value, 0, k))
+
+    def group_size(self, field, value):
+        return len(self._keys(field, value))
+
+    def groups(self, field):
+        """{value: ranked items} for a group_by field, in order of each value's first appearance"""
+        groups = self._groups[field]
+        first_seen = sorted(groups, key=lambda value: min(seq for _, seq in groups[value]))
+        return {value: list(self.items(field, value)) for value in first_seen}
@@ -0,0 +1,313 @@
+"""Read-only HTTP API over tournament_results.json, so pages fetch one page of teams instead of the whole file.
+
+    python scripts/rankings_service.py [--data tournament_results.json] [--port 8000]
+    python -m scripts serve [--port 8000]
+
+Endpoints (JSON; list endpoints take ?page=1&per_page=50):
+
+    GET /api/rankings                  teams in overall rank order
+    GET /api/divisions                 division names with team counts
+    GET /api/divisions/<division>      rankings within one division
+    GET /api/regions                   region names with team counts
+    GET /api/regions/<region>          rankings within one region
+    GET /api/teams/<team name>         one team with its placings and ranks
+    GET /api/search?q=<text>           teams whose name contains text (spacing and case ignored)
+    GET /api/tournaments               tournaments with their team counts
+    GET /api/summary?by=<field>        placing, team, point and medal totals, overall or per value of field
+    GET /api/crosstab?rows=<field>&columns=<field>[&measure=gold]
+                                       e.g. a region x division medal table
+
+summary and crosstab are answered from a GroupingIndex, take a slice as
+?division=..&region=..&detailed_region=..&tournament=.. and default measure to
+placings (also teams, points, gold, silver, bronze).
+
+Sorted views are built once per version of the data file and rebuilt when
+its mtime changes. Responses are kept in an LRU cache and carry a strong
+ETag (SHA-256 of the body), so a matching If-None-Match gets a 304.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from grouping_index import DIMENSIONS, MEASURES, GroupingIndex, placing_facts
+from ranking_index import RankingIndex, points_sort_key
+from sharded_output import encode_compact
+from team_identity import normalize_team_name
+
+DATA_FILE = 'tournament_results.json'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+CACHE_SIZE = 1024
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def team_summary(team, rank):
+    """A team row for list pages: everything but its placings"""
+    summary = {field: value for field, value in team.items() if field != 'tournaments'}
+    summary['rank'] = rank
+    return summary
+
+
+class RankingData:
+    """One loaded version of the results file with its precomputed views"""
+
+    def __init__(self, path):
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        self.version = hashlib.sha256(raw).hexdigest()[:16]
+        data = json.loads(raw)
+
+        teams = data.get('teams', [])
+        self.tournaments = data.get('tournaments', {})
+        # teams is already in rank order, so ties keep their order in the index
+        self.index = RankingIndex(points_sort_key, group_by=('division', 'region'),
+                                  items=((team['team_name'], team) for team in teams))
+        self.search_keys = [(normalize_team_name(team['team_name']), team) for team in teams]
+        self.divisions = {division: len(teams) for division, teams in data.get('division_rankings', {}).items()}
+        self.regions = {region: len(teams) for region, teams in data.get('regional_rankings', {}).items()}
+        self.groups = GroupingIndex(placing_facts(teams))
+
+    def page(self, field, value, page, per_page):
+        total = len(self.index) if field is None else self.index.group_size(field, value)
+        start = (page - 1) * per_page
+        teams = self.index.items(field, value, start, start + per_page)
+        return {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': math.ceil(total / per_page),
+            'teams': [team_summary(team, rank) for rank, team in enumerate(teams, start + 1)]
+        }
+
+    def team(self, team_name):
+        team = self.index.get(team_name)
+        if team is None:
+            # Fall back to the identity key, so "서울a클럽" finds "서울 A클럽"
+            key = normalize_team_name(team_name)
+            team = next((candidate for candidate_key, candidate in self.search_keys if candidate_key == key), None)
+            if team is None:
+                return None
+        name = team['team_name']
+        return dict(team, rank=self.index.rank(name), division_rank=self.index.rank(name, 'division'),
+                    region_rank=self.index.rank(name, 'region'))
+
+    def search(self, query, page, per_page):
+        needle = normalize_team_name(query)
+        matches = [team for key, team in self.search_keys if needle in key]
+        start = (page - 1) * per_page
+        return {
+            'query': query,
+            'page': page,
+            'per_page': per_page,
+            'total': len(matches),
+            'pages': math.ceil(len(matches) / per_page),
+            'teams': [team_summary(team, self.index.rank(team['team_name'])) for team in matches[start:start + per_page]]
+        }
+
+
+class ResponseCache:
+    """Thread-safe LRU of encoded responses"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _field_param(params, name, choices, default=None):
+    value = (params.get(name) or [default])[0]
+    if value is not None and value not in choices:
+        raise RequestError(400, f"{name} must be one of: {', '.join(choices)}")
+    return value
+
+
+def _int_param(params, name, default, maximum=None):
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise RequestError(400, f"{name} must be an integer")
+    if value < 1:
+        raise RequestError(400, f"{name} must be at least 1")
+    return min(value, maximum) if maximum else value
+
+
+class RankingsService:
+    """Routes API paths to JSON bodies; independent of the HTTP server so it can be called directly"""
+
+    def __init__(self, path=DATA_FILE, cache_size=CACHE_SIZE):
+        self.path = path
+        self.cache = ResponseCache(cache_size)
+        self._data = None
+        self._lock = threading.Lock()
+
+    def data(self):
+        """The current RankingData, reloaded when the file's mtime or size changed"""
+        stat = os.stat(self.path)
+        data = self._data
+        if data is None or data.signature != (stat.st_mtime_ns, stat.st_size):
+            with self._lock:
+                if self._data is None or self._data.signature != (stat.st_mtime_ns, stat.st_size):
+                    self._data = RankingData(self.path)
+                    self.cache.clear()
+                data = self._data
+        return data
+
+    def route(self, data, path, params):
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if parts[:1] != ['api'] or len(parts) < 2:
+            raise RequestError(404, 'Not found')
+        resource, rest = parts[1], parts[2:]
+        page = _int_param(params, 'page', 1)
+        per_page = _int_param(params, 'per_page', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+
+        if resource == 'rankings' and not rest:
+            return data.page(None, None, page, per_page)
+        if resource in ('divisions', 'regions') and len(rest) <= 1:
+            field, groups = ('division', data.divisions) if resource == 'divisions' else ('region', data.regions)
+            if not rest:
+                return {resource: [{'name': name, 'teams': count} for name, count in groups.items()]}
+            if rest[0] not in groups:
+                raise RequestError(404, f"Unknown {field}: {rest[0]}")
+            return dict(data.page(field, rest[0], page, per_page), **{field: rest[0]})
+        if resource == 'teams' and len(rest) == 1:
+            team = data.team(rest[0])
+            if team is None:
+                raise RequestError(404, f"Unknown team: {rest[0]}")
+            return team
+        if resource == 'search' and not rest:
+            query = (params.get('q') or [''])[0]
+            if not normalize_team_name(query):
+                raise RequestError(400, 'q is required')
+            return data.search(query, page, per_page)
+        if resource == 'tournaments' and not rest:
+            return {'tournaments': [{'name': name, 'teams': count} for name, count in data.tournaments.items()]}
+        if resource in ('summary', 'crosstab') and not rest:
+            filters = {field: params[field][0] for field in DIMENSIONS if params.get(field)}
+            if resource == 'summary':
+                by = _field_param(params, 'by', [field for field in DIMENSIONS if field not in filters])
+                body = {'filters': filters, 'totals': data.groups.summary(**filters)}
+                if by:
+                    body['by'] = by
+                    body['groups'] = [dict(name=value, **bucket.as_dict())
+                                      for value, bucket in data.groups.breakdown(by, **filters).items()]
+                return body
+            free = [field for field in DIMENSIONS if field not in filters]
+            rows = _field_param(params, 'rows', free, 'region')
+            columns = _field_param(params, 'columns', [field for field in free if field != rows], 'division')
+            measure = _field_param(params, 'measure', MEASURES, 'placings')
+            return {'filters': filters, 'rows': rows, 'columns': columns, 'measure': measure,
+                    'table': data.groups.crosstab(rows, columns, measure, **filters)}
+        raise RequestError(404, 'Not found')
+
+    def handle(self, target, if_none_match=None):
+        """Return (status, etag, body) for a request target such as '/api/rankings?page=2'"""
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        data = self.data()
+        # Same resource, same data version -> same cache entry, whatever the parameter order
+        cache_key = (data.version, url.path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        entry = self.cache.get(cache_key)
+        if entry is None:
+            try:
+                status, body = 200, encode_compact(self.route(data, url.path, params))
+            except RequestError as e:
+                status, body = e.status, encode_compact({'error': str(e)})
+            entry = (status, f'"{hashlib.sha256(body).hexdigest()}"', body)
+            self.cache.put(cache_key, entry)
+        status, etag, body = entry
+        if status == 200 and if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, etag, b''
+        return entry
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            try:
+                status, etag, body = service.handle(self.path, self.headers.get('If-None-Match'))
+            except OSError as e:
+                status, etag, body = 503, None, encode_compact({'error': f"Results unavailable: {e}"})
+            self.send_response(status)
+            if etag:
+                self.send_header('ETag', etag)
+            # Clients may reuse a response but must revalidate it, which is a cheap 304 when unchanged
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            if status != 304:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve paginated rankings from tournament_results.json')
+    parser.add_argument('--data', default=DATA_FILE, help='results file written by process_all_tournaments.py')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    service = RankingsService(args.data)
+    service.data()
+    server = make_server(service, args.host, args.port)
+    print(f"[v0] Serving {args.data} on http://{args.host}:{server.server_address[1]}/api/rankings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
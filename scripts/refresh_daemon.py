@@ -0,0 +1,156 @@
+"""Long-running refresh of the tournament results and the Google Sheet.
+
+    python -m scripts watch [--interval 300] [--once] [--no-sheet] [--shards] [--sqlite] [--placings-log]
+                            [--resolve-identity]
+    python -m scripts watch --versions tournament_results.json
+    python -m scripts watch --rollback tournament_results.json [--steps 1]
+
+Each cycle revalidates every tournament CSV and the sheet through the fetch
+cache (If-None-Match / If-Modified-Since, so an unchanged source costs a 304),
+re-parses only tournaments whose bytes changed and rewrites the outputs only
+when something did. Outputs are swapped in atomically with the previous
+versions kept for rollback (--history, HISTORY_VERSIONS by default; see atomic_output).
+"""
+import argparse
+import hashlib
+import os
+import random
+import time
+
+import google_sheets_processor
+import process_all_tournaments
+from atomic_output import HISTORY_VERSIONS, list_versions, rollback, write_json_atomic
+from http_fetch import get_cache
+from team_identity import ALIAS_FILE, TeamIdentity
+from tournament_aggregation import TournamentState
+
+DEFAULT_INTERVAL = 300
+INTERVAL_JITTER = 0.1  # spread polls by up to +/-10% so several daemons don't hit the hosts in step
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class RefreshDaemon:
+    """Keeps the tournament state in memory between cycles and remembers what each source looked like"""
+
+    def __init__(self, sheet_id=google_sheets_processor.SHEET_ID, interval=DEFAULT_INTERVAL):
+        self.sheet_id = sheet_id
+        self.interval = interval
+        self.sheet_hash = None
+        self.cycles = 0
+        self._load_state()
+
+    def _load_state(self):
+        resolve = process_all_tournaments.RESOLVE_TEAM_IDENTITY
+        self.identity = TeamIdentity() if resolve else None
+        self.state = TournamentState(identity=self.identity)
+        self.alias_mtime = _mtime(ALIAS_FILE)
+
+    def refresh_tournaments(self):
+        """Poll every tournament (and re-read ARCHIVE_FILES); returns how many changed (the outputs are rewritten if any did)"""
+        # Merges accepted by editing the alias table take effect on the next cycle
+        if self.identity is not None and _mtime(ALIAS_FILE) != self.alias_mtime:
+            print(f"[v0] {ALIAS_FILE} changed, reloading team identities")
+            self._load_state()
+
+        pipeline = process_all_tournaments
+        before = {name: entry['hash'] for name, entry in self.state.tournaments.items()}
+        # The archives' tournaments are among the names kept, so pruning never drops them
+        tournament_summary, tournament_names = pipeline.ingest_all(self.state, pipeline.tournaments)
+        self.state.prune(tournament_names)
+        after = {name: entry['hash'] for name, entry in self.state.tournaments.items()}
+        changed = [name for name in before.keys() | after.keys() if before.get(name) != after.get(name)]
+
+        # The first cycle always writes, in case outputs are missing; identical files are left alone
+        if changed or not self.cycles:
+            self.state.save()
+            if pipeline.WRITE_PLACINGS_LOG:
+                pipeline.record_placings(self.state, tournament_names)
+            output_data, _ = pipeline.build_results(self.state, tournament_summary, tournament_names, self.identity)
+            pipeline.save_results(output_data, self.identity)
+            self.alias_mtime = _mtime(ALIAS_FILE)
+        return len(changed)
+
+    def refresh_sheet(self):
+        """Poll every tab of the Google Sheet; returns True if any changed and processed_teams.json was rewritten"""
+        tabs = google_sheets_processor.fetch_google_sheets_tabs(self.sheet_id)
+        csv_contents = [csv_content for _, csv_content in tabs if csv_content]
+        if not csv_contents:
+            print("[v0] Could not fetch Google Sheets data, keeping the previous processed teams")
+            return False
+        if len(csv_contents) < len(tabs) and self.sheet_hash is not None:
+            # Rewriting from some of the tabs would drop the teams on the others
+            print(f"[v0] Fetched {len(csv_contents)}/{len(tabs)} tabs, keeping the previous processed teams")
+            return False
+        digest = hashlib.sha256('\0'.join(csv_contents).encode('utf-8')).hexdigest()
+        if digest == self.sheet_hash:
+            return False
+        teams = google_sheets_processor.process_google_sheets_data(csv_contents)
+        write_json_atomic(google_sheets_processor.PROCESSED_TEAMS_FILE, teams,
+                          history=process_all_tournaments.RESULTS_HISTORY)
+        self.sheet_hash = digest
+        print(f"[v0] Processed {len(teams)} teams from Google Sheets")
+        return True
+
+    def run_cycle(self, sheet=True):
+        started = time.perf_counter()
+        changed = self.refresh_tournaments()
+        sheet_changed = self.refresh_sheet() if sheet else False
+        self.cycles += 1
+        print(f"[v0] Refresh {self.cycles}: {changed} tournaments changed, sheet "
+              f"{'changed' if sheet_changed else 'unchanged'} ({time.perf_counter() - started:.1f}s)")
+        get_cache().report()
+
+    def run(self, sheet=True, once=False):
+        while True:
+            started = time.monotonic()
+            try:
+                self.run_cycle(sheet)
+            except Exception as e:
+                # A bad cycle leaves the previous outputs in place; try again on the next one
+                print(f"[v0] Refresh failed: {e}")
+            if once:
+                return
+            delay = self.interval * (1 + random.uniform(-INTERVAL_JITTER, INTERVAL_JITTER))
+            time.sleep(max(0.0, started + delay - time.monotonic()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Poll the sources and refresh the outputs when they change')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='seconds between polls')
+    parser.add_argument('--once', action='store_true', help='run a single refresh cycle and exit')
+    parser.add_argument('--no-sheet', action='store_true', help='do not poll the Google Sheet')
+    parser.add_argument('--sheet-id', default=google_sheets_processor.SHEET_ID)
+    parser.add_argument('--versions', metavar='PATH', help='list the saved previous versions of an output')
+    parser.add_argument('--rollback', metavar='PATH', help='restore a previous version of an output')
+    parser.add_argument('--steps', type=int, default=1, help='how many versions back --rollback goes')
+    process_all_tournaments.add_output_arguments(parser)
+    # Unlike a one-off run, the daemon keeps previous versions by default so a bad refresh can be rolled back
+    parser.set_defaults(history=HISTORY_VERSIONS)
+    args = parser.parse_args(argv)
+    process_all_tournaments.apply_output_arguments(args)
+
+    if args.versions:
+        for steps, version in enumerate(list_versions(args.versions), 1):
+            print(f"{steps}: {version} ({os.path.getsize(version)} bytes)")
+        return
+    if args.rollback:
+        restored = rollback(args.rollback, args.steps)
+        print(f"[v0] Restored {args.rollback} from {restored}")
+        return
+
+    daemon = RefreshDaemon(args.sheet_id, args.interval)
+    print(f"[v0] Refreshing every {args.interval:g}s (Ctrl+C to stop)")
+    try:
+        daemon.run(sheet=not args.no_sheet, once=args.once)
+    except KeyboardInterrupt:
+        print("\n[v0] Stopped")
+
+
+if __name__ == "__main__":
+    main()
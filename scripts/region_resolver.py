@@ -0,0 +1,125 @@
+import functools
+import random
+import time
+
+DEFAULT_REGION = '기타'
+
+# Region gazetteer: city/county names plus province abbreviations used in team names
+REGION_KEYWORDS = {
+    '수도권': ['서울', '인천', '경기', '고양', '성남', '수원', '안산', '부천', '의정부', '안양', '평택', '시흥', '파주', '김포', '광명', '광주', '하남', '오산', '구리', '남양주', '용인', '화성', '안성', '의왕', '군포', '양주', '포천', '여주', '연천', '가평', '양평'],
+    '강원권': ['강원', '춘천', '원주', '강릉', '동해', '태백', '속초', '삼척', '홍천', '횡성', '영월', '평창', '정선', '철원', '화천', '양구', '인제', '고성', '양양'],
+    '충청권': ['충남', '충북', '대전', '세종', '청주', '충주', '제천', '보은', '옥천', '영동', '진천', '괴산', '음성', '단양', '증평', '천안', '공주', '보령', '아산', '서산', '논산', '계룡', '당진', '금산', '부여', '서천', '청양', '홍성', '예산', '태안'],
+    '전라권': ['전남', '전북', '광주', '전주', '군산', '익산', '정읍', '남원', '김제', '완주', '진안', '무주', '장수', '임실', '순창', '고창', '부안', '목포', '여수', '순천', '나주', '광양', '담양', '곡성', '구례', '고흥', '보성', '화순', '장흥', '강진', '해남', '영암', '무안', '함평', '영광', '장성', '완도', '진도', '신안'],
+    '경상권': ['경남', '경북', '부산', '대구', '울산', '창원', '마산', '진주', '통영', '사천', '김해', '밀양', '거제', '양산', '의령', '함안', '창녕', '고성', '남해', '하동', '산청', '함양', '거창', '합천', '포항', '경주', '김천', '안동', '구미', '영주', '영천', '상주', '문경', '경산', '군위', '의성', '청송', '영양', '영덕', '청도', '고령', '성주', '칠곡', '예천', '봉화', '울진', '울릉'],
+    '제주권': ['제주', '서귀포']
+}
+
+# Keywords listed under more than one region resolve to the region named here.
+# A more specific keyword earlier in the name still wins ("경기 광주" -> 수도권).
+AMBIGUOUS_KEYWORDS = {
+    '광주': '전라권',  # 광주광역시 over 경기도 광주시
+    '고성': '강원권',  # 강원 고성군 over 경남 고성군
+}
+
+
+class RegionMatcher:
+    """Multi-pattern keyword matcher compiled once from a region gazetteer.
+
+    Keywords are hashed and bucketed by length, so matching a name costs a few
+    dict lookups per character regardless of how many keywords there are. The
+    leftmost keyword in the name wins, then the longest one at that position.
+    """
+
+    def __init__(self, region_keywords, ambiguous=None, default=DEFAULT_REGION):
+        ambiguous = ambiguous or {}
+        self.default = default
+        self._keywords = {}
+        for region, keywords in region_keywords.items():
+            for keyword in keywords:
+                existing = self._keywords.get(keyword)
+                if existing is not None and existing != region:
+                    if keyword not in ambiguous:
+                        raise ValueError(f"Keyword '{keyword}' maps to both {existing} and {region}")
+                    self._keywords[keyword] = ambiguous[keyword]
+                elif existing is None:
+                    self._keywords[keyword] = region
+        self._lengths = sorted({len(keyword) for keyword in self._keywords}, reverse=True)
+
+    def __len__(self):
+        return len(self._keywords)
+
+    def match(self, text):
+        """Return (keyword, region) for the leftmost-longest keyword in text, or None"""
+        keywords = self._keywords
+        lengths = self._lengths
+        for start in range(len(text)):
+            for length in lengths:
+                keyword = text[start:start + length]
+                region = keywords.get(keyword)
+                if region is not None:
+                    return keyword, region
+        return None
+
+    def resolve(self, text):
+        """Return the region for text, or the default region"""
+        if not text:
+            return self.default
+        found = self.match(text)
+        return found[1] if found else self.default
+
+
+REGION_MATCHER = RegionMatcher(REGION_KEYWORDS, AMBIGUOUS_KEYWORDS)
+
+
+@functools.lru_cache(maxsize=65536)
+def resolve_region(team_name):
+    """Resolve a team name to its region, memoized per distinct name"""
+    return REGION_MATCHER.resolve(team_name)
+
+
+@functools.lru_cache(maxsize=65536)
+def resolve_locality(team_name):
+    """The city/province keyword that placed a team in its region (e.g. '부산'), or '' if none matched"""
+    found = REGION_MATCHER.match(team_name) if team_name else None
+    return found[0] if found else ''
+
+
+def _naive_resolve(region_keywords, team_name):
+    """The nested substring scan the matcher replaces, kept for benchmarking"""
+    for region, keywords in region_keywords.items():
+        for keyword in keywords:
+            if keyword in team_name:
+                return region
+    return DEFAULT_REGION
+
+
+def benchmark(gazetteer_sizes=(200, 2000, 20000), rows=20000, seed=7):
+    """Compare per-row cost of the naive scan and the compiled matcher as the gazetteer grows"""
+    rng = random.Random(seed)
+    syllables = [chr(code) for code in range(0xAC00, 0xAC00 + 2000)]
+    base = [keyword for keywords in REGION_KEYWORDS.values() for keyword in keywords]
+    names = [f"{rng.choice(base + ['연세', '한빛', '새봄'])} {rng.choice('ABCDEFGH')}클럽" for _ in range(rows)]
+
+    print(f"{'keywords':>10} {'naive ns/row':>14} {'matcher ns/row':>16}")
+    for size in gazetteer_sizes:
+        region_keywords = {region: list(keywords) for region, keywords in REGION_KEYWORDS.items()}
+        regions = list(region_keywords)
+        while sum(len(keywords) for keywords in region_keywords.values()) < size:
+            region_keywords[rng.choice(regions)].append(''.join(rng.choice(syllables) for _ in range(3)))
+        matcher = RegionMatcher(region_keywords, AMBIGUOUS_KEYWORDS)
+
+        start = time.perf_counter()
+        for name in names:
+            _naive_resolve(region_keywords, name)
+        naive = (time.perf_counter() - start) / rows * 1e9
+
+        start = time.perf_counter()
+        for name in names:
+            matcher.resolve(name)
+        compiled = (time.perf_counter() - start) / rows * 1e9
+
+        print(f"{len(matcher):>10} {naive:>14.0f} {compiled:>16.0f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import json
+import os
+
+from atomic_output import atomic_write
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped when brotli is not installed
+    brotli = None
+
+# Under Next.js' public/ (run from the repo root), so the front end loads /tournament_results/manifest.json and
+# then only the shards it renders
+SHARD_DIR = os.path.join('public', 'tournament_results')
+MANIFEST_FILE = 'manifest.json'
+SUMMARY_TOP_N = 10
+
+
+def encode_compact(data):
+    """Serialize data as minified UTF-8 JSON"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _write_file(path, data):
+    with atomic_write(path, 'wb', None) as f:
+        f.write(data)
+
+
+def write_shard(directory, kind, data):
+    """Write one content-hashed shard plus .gz/.br siblings; returns its manifest entry"""
+    body = encode_compact(data)
+    digest = hashlib.sha256(body).hexdigest()
+    filename = f"{kind}.{digest[:16]}.json"
+    path = os.path.join(directory, filename)
+    entry = {'file': filename, 'sha256': digest, 'bytes': len(body)}
+
+    # Content-hashed names never change meaning, so an existing file is already correct
+    if not os.path.exists(path):
+        _write_file(path, body)
+    if not os.path.exists(f"{path}.gz"):
+        _write_file(f"{path}.gz", gzip.compress(body, compresslevel=9, mtime=0))
+    entry['gzip_bytes'] = os.path.getsize(f"{path}.gz")
+
+    if brotli is not None:
+        if not os.path.exists(f"{path}.br"):
+            _write_file(f"{path}.br", brotli.compress(body, quality=11))
+        entry['br_bytes'] = os.path.getsize(f"{path}.br")
+    return entry
+
+
+def _manifest_files(manifest):
+    entries = [manifest.get('summary')] if manifest.get('summary') else []
+    for group in ('divisions', 'regions'):
+        entries.extend(manifest.get(group, {}).values())
+    return {entry['file'] for entry in entries}
+
+
+def _load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_sharded_output(output_data, directory=SHARD_DIR, top_n=SUMMARY_TOP_N):
+    """Write per-division and per-region shards, a top-N summary and a manifest.
+
+    The manifest is written last, so a reader never sees it point at a shard
+    that does not exist yet. Shards from the previous manifest are kept for
+    readers still holding it; anything older is removed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    previous_files = _manifest_files(_load_manifest(manifest_path))
+
+    division_rankings = output_data['division_rankings']
+    regional_rankings = output_data['regional_rankings']
+
+    summary = {
+        'tournaments': output_data['tournaments'],
+        'total_teams': output_data['total_teams'],
+        'total_tournaments': output_data['total_tournaments'],
+        'top_teams': output_data['teams'][:top_n],
+        'division_leaders': {division: teams[0] for division, teams in division_rankings.items() if teams},
+        'regional_leaders': {region: teams[0] for region, teams in regional_rankings.items() if teams}
+    }
+
+    manifest = {
+        'version': 1,
+        'summary': write_shard(directory, 'summary', summary),
+        'divisions': {},
+        'regions': {}
+    }
+    for division, teams in division_rankings.items():
+        entry = write_shard(directory, 'division', {'division': division, 'teams': teams})
+        entry['teams'] = len(teams)
+        manifest['divisions'][division] = entry
+    for region, teams in regional_rankings.items():
+        entry = write_shard(directory, 'region', {'region': region, 'teams': teams})
+        entry['teams'] = len(teams)
+        manifest['regions'][region] = entry
+
+    _write_file(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    keep = _manifest_files(manifest) | previous_files
+    for filename in os.listdir(directory):
+        base = filename
+        for suffix in ('.gz', '.br'):
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+        if filename != MANIFEST_FILE and base.endswith('.json') and base not in keep:
+            os.remove(os.path.join(directory, filename))
+
+    return manifest
@@ -0,0 +1,259 @@
+"""Indexed SQLite copy of the aggregated results.
+
+Consumers that need one division, region, team or tournament can query
+tournament_results.db instead of loading the whole tournament_results.json:
+
+    with RankingStore() as store:
+        store.rankings(division='남자클럽부', limit=20)
+        store.team('서울 A클럽')
+
+Writes are incremental: each team row carries a digest of its data, so a run
+only rewrites teams (and their placings) that changed, re-numbers ranks that
+moved and deletes teams that are gone, all in one transaction.
+"""
+import hashlib
+import json
+import sqlite3
+
+DB_FILE = 'tournament_results.db'
+SCHEMA_VERSION = 1
+PLACINGS_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tournaments (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    teams INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS teams (
+    team_name TEXT PRIMARY KEY,
+    overall_rank INTEGER NOT NULL,
+    division TEXT NOT NULL,
+    region TEXT NOT NULL,
+    total_points INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    second_places INTEGER NOT NULL,
+    third_places INTEGER NOT NULL,
+    total_tournaments INTEGER NOT NULL,
+    mvp_awards TEXT NOT NULL,
+    coaches TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_teams_rank ON teams (overall_rank);
+CREATE INDEX IF NOT EXISTS idx_teams_division ON teams (division, overall_rank);
+CREATE INDEX IF NOT EXISTS idx_teams_region ON teams (region, overall_rank);
+CREATE INDEX IF NOT EXISTS idx_teams_points ON teams (total_points);
+CREATE TABLE IF NOT EXISTS placings (
+    team_name TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    tournament TEXT NOT NULL,
+    ranking TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (team_name, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_placings_tournament ON placings (tournament, points);
+CREATE TABLE IF NOT EXISTS team_names (
+    key TEXT PRIMARY KEY,
+    display_name TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS team_aliases (
+    alias_key TEXT PRIMARY KEY,
+    canonical_key TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+TEAM_COLUMNS = ('team_name', 'overall_rank', 'division', 'region', 'total_points', 'wins', 'second_places',
+                'third_places', 'total_tournaments', 'mvp_awards', 'coaches', 'digest')
+
+_UPSERT_TEAM = (
+    f"INSERT INTO teams ({', '.join(TEAM_COLUMNS)}) VALUES ({', '.join('?' * len(TEAM_COLUMNS))}) "
+    f"ON CONFLICT (team_name) DO UPDATE SET "
+    + ', '.join(f"{column} = excluded.{column}" for column in TEAM_COLUMNS[1:])
+)
+
+
+def team_digest(team):
+    return hashlib.sha256(json.dumps(team, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _team_row(rank, team, digest):
+    return (team['team_name'], rank, team['division'], team['region'], team['total_points'], team['wins'],
+            team['second_places'], team['third_places'], team['total_tournaments'],
+            json.dumps(team['mvp_awards'], ensure_ascii=False), json.dumps(team['coaches'], ensure_ascii=False),
+            digest)
+
+
+def _team_from_row(row):
+    team = dict(row)
+    del team['digest']
+    team['mvp_awards'] = json.loads(team['mvp_awards'])
+    team['coaches'] = json.loads(team['coaches'])
+    return team
+
+
+class RankingStore:
+    """tournament_results.db: teams, placings, tournaments and the team alias table"""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets readers keep querying the previous snapshot while a run writes
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise RuntimeError(f"{path} has schema version {version}, expected {SCHEMA_VERSION}")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def write(self, output_data, identity=None):
+        """Bring the store up to date with process_all_tournaments output in one transaction.
+
+        identity (TeamIdentity) also copies its display names and accepted
+        merges. Returns counts of inserted, updated, re-ranked and removed teams.
+        """
+        conn = self.conn
+        existing = {row['team_name']: (row['overall_rank'], row['digest'])
+                    for row in conn.execute('SELECT team_name, overall_rank, digest FROM teams')}
+
+        changed, reranked = [], []
+        inserted = 0
+        for rank, team in enumerate(output_data['teams'], 1):
+            digest = team_digest(team)
+            previous = existing.pop(team['team_name'], None)
+            if previous is None or previous[1] != digest:
+                inserted += previous is None
+                changed.append((rank, team, digest))
+            elif previous[0] != rank:
+                reranked.append((rank, team['team_name']))
+        removed = [(team_name,) for team_name in existing]
+
+        with conn:
+            conn.executemany('DELETE FROM teams WHERE team_name = ?', removed)
+            conn.executemany('DELETE FROM placings WHERE team_name = ?',
+                             removed + [(team['team_name'],) for _, team, _ in changed])
+            conn.executemany(_UPSERT_TEAM, (_team_row(rank, team, digest) for rank, team, digest in changed))
+            conn.executemany(
+                'INSERT INTO placings (team_name, seq, tournament, ranking, points) VALUES (?, ?, ?, ?, ?)',
+                ((team['team_name'], seq, placing['name'], placing['ranking'], placing['points'])
+                 for _, team, _ in changed for seq, placing in enumerate(team['tournaments'])))
+            conn.executemany('UPDATE teams SET overall_rank = ? WHERE team_name = ?', reranked)
+
+            tournaments = output_data['tournaments']
+            conn.execute('DELETE FROM tournaments')
+            conn.executemany('INSERT INTO tournaments (name, position, teams) VALUES (?, ?, ?)',
+                             ((name, position, count) for position, (name, count) in enumerate(tournaments.items())))
+
+            if identity is not None:
+                conn.executemany(
+                    'INSERT INTO team_names (key, display_name) VALUES (?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET display_name = excluded.display_name '
+                    'WHERE display_name != excluded.display_name',
+                    ((identity.key(team['team_name']), team['team_name']) for team in output_data['teams']))
+                conn.execute('DELETE FROM team_aliases')
+                conn.executemany('INSERT INTO team_aliases (alias_key, canonical_key) VALUES (?, ?)',
+                                 identity.aliases.items())
+
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+                ('total_teams', str(output_data['total_teams'])),
+                ('total_tournaments', str(output_data['total_tournaments']))
+            ])
+
+        return {'inserted': inserted, 'updated': len(changed) - inserted, 'reranked': len(reranked),
+                'removed': len(removed)}
+
+    def rankings(self, division=None, region=None, limit=None, offset=0, placings=False):
+        """Teams in overall rank order, optionally within one division and/or region.
+
+        Reads only the index range of the requested page; placings=True adds
+        each team's 'tournaments' as in tournament_results.json.
+        """
+        conditions, params = [], []
+        if division is not None:
+            conditions.append('division = ?')
+            params.append(division)
+        if region is not None:
+            conditions.append('region = ?')
+            params.append(region)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        params += [-1 if limit is None else limit, offset]
+        teams = [_team_from_row(row) for row in self.conn.execute(
+            f"SELECT * FROM teams {where} ORDER BY overall_rank LIMIT ? OFFSET ?", params)]
+        if placings:
+            self._attach_placings(teams)
+        return teams
+
+    def count(self, division=None, region=None):
+        conditions, params = [], []
+        if division is not None:
+            conditions.append('division = ?')
+            params.append(division)
+        if region is not None:
+            conditions.append('region = ?')
+            params.append(region)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self.conn.execute(f"SELECT COUNT(*) FROM teams {where}", params).fetchone()[0]
+
+    def _attach_placings(self, teams):
+        by_name = {team['team_name']: team for team in teams}
+        for team in teams:
+            team['tournaments'] = []
+        names = list(by_name)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(names), PLACINGS_BATCH):
+            batch = names[start:start + PLACINGS_BATCH]
+            for row in self.conn.execute(
+                    f"SELECT team_name, tournament, ranking, points FROM placings "
+                    f"WHERE team_name IN ({', '.join('?' * len(batch))}) ORDER BY team_name, seq", batch):
+                by_name[row['team_name']]['tournaments'].append(
+                    {'name': row['tournament'], 'ranking': row['ranking'], 'points': row['points']})
+
+    def team(self, team_name):
+        """One team with its placings, looked up by display name or any spelling the alias table knows"""
+        row = self.conn.execute('SELECT * FROM teams WHERE team_name = ?', (team_name,)).fetchone()
+        if row is None:
+            from team_identity import normalize_team_name
+
+            row = self.conn.execute(
+                'SELECT teams.* FROM team_names JOIN teams ON teams.team_name = team_names.display_name '
+                'WHERE team_names.key = COALESCE((SELECT canonical_key FROM team_aliases WHERE alias_key = ?), ?)',
+                (normalize_team_name(team_name),) * 2).fetchone()
+        if row is None:
+            return None
+        team = _team_from_row(row)
+        self._attach_placings([team])
+        return team
+
+    def tournament(self, tournament_name):
+        """Placings in one tournament, best first"""
+        return [dict(row) for row in self.conn.execute(
+            'SELECT team_name, ranking, points FROM placings WHERE tournament = ? ORDER BY points DESC, team_name',
+            (tournament_name,))]
+
+    def divisions(self):
+        return [row[0] for row in self.conn.execute('SELECT DISTINCT division FROM teams ORDER BY division')]
+
+    def regions(self):
+        return [row[0] for row in self.conn.execute('SELECT DISTINCT region FROM teams ORDER BY region')]
+
+
+def write_sqlite_store(output_data, path=DB_FILE, identity=None):
+    """Write process_all_tournaments output to the SQLite store; returns the change counts"""
+    with RankingStore(path) as store:
+        return store.write(output_data, identity)
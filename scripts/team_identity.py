@@ -0,0 +1,231 @@
+"""Canonical team identities across tournaments.
+
+Tournament sheets spell the same club differently ("서울 A클럽", "서울A클럽",
+"서울 a 클럽"), so team names are reduced to a normalized key (NFKC, case-folded,
+letters and digits only) and team statistics are keyed on that. The alias
+table in ALIAS_FILE records, per key, the first spelling seen (used to label
+proposals; the output shows each team's most frequent spelling) plus
+reviewed merges:
+
+    {"version": 1,
+     "names": {"서울a클럽": "서울 A클럽", ...},
+     "aliases": {"서울에이클럽": "서울a클럽"},     # accepted merges: key -> canonical key
+     "distinct": [["서울a클럽", "서울b클럽"]],      # reviewed pairs that are different teams
+     "proposals": [{"keys": [...], "names": [...], "score": 0.91}, ...]}
+
+Near-duplicates that normalization cannot prove equal are only proposed:
+propose_merges() compares keys that share a rare n-gram of their jamo
+spelling (Hangul syllables decomposed into letters, so a one-letter typo
+costs two bigrams rather than a whole syllable) and never compares all pairs.
+To accept a proposal, move it to "aliases"; to dismiss it, add it to
+"distinct". The table is local to a checkout (it is not tracked by git) and is
+only rewritten when its content changes.
+"""
+import json
+import math
+import os
+import unicodedata
+
+from atomic_output import atomic_write
+
+ALIAS_FILE = 'team_aliases.json'
+ALIAS_VERSION = 1
+
+NGRAM_SIZE = 2
+MERGE_THRESHOLD = 0.8  # Dice similarity of jamo n-gram sets
+# Slack on the blocking bounds, so float rounding (0.8 * 3 / 1.2 > 2) never drops a pair that scores the threshold
+_BOUND_SLACK = 1e-9
+
+_HANGUL_BASE = 0xAC00
+_HANGUL_COUNT = 11172
+
+
+def normalize_team_name(name):
+    """Reduce a team name to its identity key: NFKC, case-folded, letters and digits only"""
+    return ''.join(ch for ch in unicodedata.normalize('NFKC', name).casefold() if ch.isalnum())
+
+
+def to_jamo(text):
+    """Decompose precomposed Hangul syllables into conjoining jamo; other characters pass through"""
+    letters = []
+    for ch in text:
+        offset = ord(ch) - _HANGUL_BASE
+        if 0 <= offset < _HANGUL_COUNT:
+            letters.append(chr(0x1100 + offset // 588))
+            letters.append(chr(0x1161 + offset % 588 // 28))
+            if offset % 28:
+                letters.append(chr(0x11A7 + offset % 28))
+        else:
+            letters.append(ch)
+    return ''.join(letters)
+
+
+def jamo_ngrams(key, size=NGRAM_SIZE):
+    """Set of jamo n-grams of a key, padded so short keys still have some"""
+    padded = f"^{to_jamo(key)}$"
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def find_similar_keys(keys, threshold=MERGE_THRESHOLD, probe=None):
+    """Yield (key, other, score), in keys order, for pairs whose n-gram (Dice) similarity reaches threshold.
+
+    Blocking uses prefix filtering: each key's n-grams are ordered rarest
+    first, and two keys can only reach the threshold if they share one of the
+    first few (the prefix, whose length follows from the threshold). Only the
+    prefixes go into the inverted index, so candidates come from small blocks
+    of rare n-grams and the work grows with those blocks, not with the number
+    of pairs. No pair that reaches the threshold is missed. With probe (a set
+    of keys), only pairs involving one of them are scored.
+    """
+    keys = list(keys)
+    grams_by_key = [jamo_ngrams(key) for key in keys]
+    frequency = {}
+    for grams in grams_by_key:
+        for gram in grams:
+            frequency[gram] = frequency.get(gram, 0) + 1
+
+    index = {}
+    prefixes = []
+    for position, grams in enumerate(grams_by_key):
+        # Dice >= t needs an overlap of at least t * size / (2 - t) with a key of any size
+        overlap = math.ceil(threshold * len(grams) / (2 - threshold) - _BOUND_SLACK)
+        prefix = sorted(grams, key=lambda gram: (frequency[gram], gram))[:len(grams) - overlap + 1]
+        for gram in prefix:
+            index.setdefault(gram, []).append(position)
+        prefixes.append(prefix)
+
+    if probe is None:
+        probed = range(len(keys))
+    else:
+        probed = [position for position, key in enumerate(keys) if key in probe]
+    probed_set = set(probed)
+    for position in probed:
+        grams = grams_by_key[position]
+        size = len(grams)
+        candidates = set()
+        for gram in prefixes[position]:
+            candidates.update(index[gram])
+        # ... and keys whose sizes differ that much can never get there
+        smallest = threshold * size / (2 - threshold) - _BOUND_SLACK
+        largest = (2 - threshold) * size / threshold + _BOUND_SLACK
+        for candidate in sorted(candidates):
+            # Pairs of two probed keys are scored once, from the later one
+            if candidate >= position and (candidate == position or candidate in probed_set):
+                continue
+            other_grams = grams_by_key[candidate]
+            other_size = len(other_grams)
+            if smallest <= other_size <= largest:
+                shared = len(grams & other_grams)
+                if 2 * shared >= threshold * (size + other_size):
+                    first, second = sorted((candidate, position))
+                    yield keys[first], keys[second], 2 * shared / (size + other_size)
+
+
+class TeamIdentity:
+    """Maps raw team names to canonical keys and display names, backed by the alias table"""
+
+    def __init__(self, path=ALIAS_FILE):
+        self.path = path
+        self.names = {}
+        self.aliases = {}
+        self.distinct = set()
+        self.proposals = []
+        self._keys = {}
+        self._new_keys = set()
+        self._saved = None
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[v0] Ignoring unreadable alias table {self.path}: {e}")
+            return
+        if data.get('version') != ALIAS_VERSION:
+            return
+        self.names = data.get('names', {})
+        self.aliases = {normalize_team_name(key): normalize_team_name(target)
+                        for key, target in data.get('aliases', {}).items()}
+        self.distinct = {tuple(sorted(pair)) for pair in data.get('distinct', [])}
+        self.proposals = data.get('proposals', [])
+        self._saved = self._serialize()
+
+    def _serialize(self):
+        return json.dumps({
+            'version': ALIAS_VERSION,
+            'names': self.names,
+            'aliases': self.aliases,
+            'distinct': sorted(list(pair) for pair in self.distinct),
+            'proposals': self.proposals
+        }, ensure_ascii=False, indent=2)
+
+    def save(self):
+        """Write the table if it differs from what was loaded or last saved; returns True if it was written"""
+        if not self.path:
+            return False
+        data = self._serialize()
+        if data == self._saved:
+            return False
+        with atomic_write(self.path) as f:
+            f.write(data)
+        self._saved = data
+        return True
+
+    def _canonical(self, key):
+        seen = set()
+        while key in self.aliases and key not in seen:
+            seen.add(key)
+            key = self.aliases[key]
+        return key
+
+    def key(self, team_name):
+        """Canonical key of a raw team name; the first spelling seen for a key is recorded in names"""
+        key = self._keys.get(team_name)
+        if key is None:
+            normalized = normalize_team_name(team_name) or team_name
+            if normalized not in self.names:
+                self.names[normalized] = team_name
+                self._new_keys.add(normalized)
+            key = self._keys[team_name] = self._canonical(normalized)
+            if key not in self.names:
+                self.names[key] = team_name
+                self._new_keys.add(key)
+        return key
+
+    def display_name(self, key):
+        return self.names.get(key, key)
+
+    def _is_open(self, key, other):
+        return key not in self.aliases and other not in self.aliases and tuple(sorted((key, other))) not in self.distinct
+
+    def propose_merges(self, keys=None, threshold=MERGE_THRESHOLD, rescan=False):
+        """Record likely duplicates among canonical keys (all known keys by default) as proposals.
+
+        Earlier proposals that are still unreviewed are kept, and only keys
+        first seen since the table was loaded are compared against the rest,
+        so a run costs in proportion to its new names; rescan=True compares
+        every pair again (e.g. after changing the threshold).
+        """
+        if keys is None:
+            keys = {self._canonical(key) for key in self.names}
+        if rescan:
+            proposals, probe = [], None
+        else:
+            proposals = [proposal for proposal in self.proposals if self._is_open(*proposal['keys'])]
+            probe = self._new_keys
+        for key, other, score in find_similar_keys(sorted(keys), threshold, probe):
+            if not self._is_open(key, other):
+                continue
+            proposals.append({
+                'keys': [key, other],
+                'names': [self.display_name(key), self.display_name(other)],
+                'score': round(score, 3)
+            })
+        proposals.sort(key=lambda proposal: -proposal['score'])
+        self.proposals = proposals
+        return proposals
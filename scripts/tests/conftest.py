@@ -0,0 +1,7 @@
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The scripts import each other by bare module name, as when run from scripts/
+sys.path[:0] = [SCRIPTS_DIR, os.path.join(SCRIPTS_DIR, 'benchmarks')]
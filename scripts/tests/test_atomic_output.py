@@ -0,0 +1,54 @@
+import json
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from atomic_output import atomic_write, rollback, write_json_atomic
+
+
+def write_many(path, writer, count=50):
+    for version in range(count):
+        with atomic_write(path) as f:
+            json.dump({'writer': writer, 'version': version, 'padding': 'x' * 4096}, f)
+
+
+def test_concurrent_writers_never_share_a_temp_file(tmp_path):
+    path = str(tmp_path / 'out.json')
+    threads = [threading.Thread(target=write_many, args=(path, f"thread{index}")) for index in range(4)]
+    processes = []
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=write_many, args=(path, f"process{index}")) for index in range(2)]
+    for worker in threads + processes:
+        worker.start()
+    for worker in threads + processes:
+        worker.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    # Whoever won, the file is one complete write and no temp file is left behind
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['version'] == 49
+    assert os.listdir(tmp_path) == ['out.json']
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / 'out.json')
+    write_json_atomic(path, {'version': 1})
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write('{"version": ')
+            raise RuntimeError('interrupted')
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == {'version': 1}
+    assert os.listdir(tmp_path) == ['out.json']
+
+
+def test_rollback_restores_the_previous_version(tmp_path):
+    path = str(tmp_path / 'out.json')
+    for version in range(3):
+        write_json_atomic(path, {'version': version}, history=5)
+    rollback(path)
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == {'version': 1}
@@ -0,0 +1,74 @@
+import re
+import threading
+
+import pytest
+
+import google_sheets_processor as sheets
+import http_fetch
+import synthetic_data
+from stub_server import StubServer, stand_in_session
+
+HEADER = '팀명,부별,지역,우승,준우승,3위,감독,최우수선수,참가대회수\n'
+TABS = {
+    '0': HEADER + '서울 스파이커스,남자클럽3부,,2,1,0,감독1,,3\n부산 썬더,여자클럽3부,,0,1,1,감독2,선수2,2\n',
+    '1234': HEADER + '서울 스파이커스,남자클럽3부,,1,0,2,,선수1,4\n서울 스파이커스,남자클럽2부,,0,0,1,감독3,,1\n',
+    # Both export endpoints answer with an empty body, so this tab fails to fetch
+    '5678': '',
+}
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    htmlview = synthetic_data.google_sheet_htmlview(list(TABS))
+
+    def body_for(path):
+        if path.endswith('/htmlview'):
+            return htmlview
+        return TABS[re.search(r'gid=(\d+)', path).group(1)].encode('utf-8')
+
+    server = StubServer(body_for).start()
+    monkeypatch.setattr(http_fetch, '_session', stand_in_session(server.base_url))
+    monkeypatch.setattr(http_fetch, '_cache', http_fetch.FetchCache(directory=str(tmp_path / 'cache')))
+    monkeypatch.setattr(sheets, 'HEDGE_DELAY', 0.05)
+    # The failed tab is retried; without the backoff sleeps
+    monkeypatch.setattr(http_fetch, 'backoff_delay', lambda attempt, base=None: 0)
+    yield server
+    server.stop()
+
+
+def test_discovers_every_tab_in_order(stub):
+    assert sheets.discover_sheet_tabs('workbook') == [
+        {'gid': '0', 'title': '부별1'}, {'gid': '1234', 'title': '부별2'}, {'gid': '5678', 'title': '부별3'}
+    ]
+
+
+def test_fetches_tabs_concurrently_and_reports_a_failed_tab(stub, monkeypatch):
+    # Every tab's fetch has to be in flight at once to get past the barrier
+    barrier = threading.Barrier(len(TABS), timeout=5)
+    fetch_sheet_tab = sheets.fetch_sheet_tab
+
+    def fetch_together(sheet_id, gid):
+        barrier.wait()
+        return fetch_sheet_tab(sheet_id, gid)
+
+    monkeypatch.setattr(sheets, 'fetch_sheet_tab', fetch_together)
+    fetched = sheets.fetch_google_sheets_tabs('workbook', max_workers=len(TABS))
+
+    assert [tab['gid'] for tab, _ in fetched] == list(TABS)
+    assert [content for _, content in fetched] == [TABS['0'], TABS['1234'], '']
+
+
+def test_merges_a_team_found_on_two_tabs_by_name_and_division(stub):
+    contents = [content for _, content in sheets.fetch_google_sheets_tabs('workbook') if content]
+    teams = {(team['name'], team['division']): team for team in sheets.process_google_sheets_data(contents)}
+
+    assert len(teams) == 3
+    merged = teams[('서울 스파이커스', '남자클럽3부')]
+    assert (merged['wins'], merged['runnerUp'], merged['third']) == (3, 1, 2)
+    assert (merged['tournaments'], merged['totalMedals'], merged['score']) == (7, 6, 13)
+    # The first non-empty coach and MVP across the tabs
+    assert (merged['coach'], merged['mvp']) == ('감독1', '선수1')
+    # Same name in another division is a different team
+    assert teams[('서울 스파이커스', '남자클럽2부')]['third'] == 1
+    assert [team['rank'] for team in sorted(teams.values(), key=lambda team: team['rank'])] == [1, 2, 3]
+    assert merged['rank'] == 1
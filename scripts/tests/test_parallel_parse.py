@@ -0,0 +1,50 @@
+import hashlib
+
+import pytest
+
+import synthetic_data
+from http_fetch import CachedResponse
+from parallel_parse import parse_in_pool, pool_available
+from process_all_tournaments import fold_tournaments, parse_tournament
+from tournament_aggregation import TournamentState, finalize_rankings
+
+pytestmark = pytest.mark.skipif(not pool_available(), reason='needs the fork start method')
+
+
+@pytest.fixture
+def fetched(tmp_path):
+    """(tournament, response) pairs whose bodies are synthetic CSVs in a stand-in fetch cache"""
+    pairs = []
+    for index in range(6):
+        body = synthetic_data.tournament_csv(300, seed=index)
+        body_path = tmp_path / f"body{index}"
+        body_path.write_bytes(body)
+        url = f"https://example.invalid/tournament{index}.csv"
+        response = CachedResponse(url, 200, {}, body_path=str(body_path),
+                                  content_hash=hashlib.sha256(body).hexdigest())
+        pairs.append(({'name': f"대회{index}", 'url': url}, response))
+    return pairs
+
+
+def test_pool_matches_serial_parse(fetched):
+    tournament_names = [tournament['name'] for tournament, _ in fetched]
+
+    serial = TournamentState(path=None)
+    serial_summary = fold_tournaments(serial, fetched, {})
+
+    pooled = TournamentState(path=None)
+    jobs = [(tournament['name'], response) for tournament, response in fetched]
+    with parse_in_pool(jobs, parse_tournament, 2) as pending:
+        pooled_summary = fold_tournaments(pooled, fetched, pending)
+        assert not pending
+
+    assert pooled_summary == serial_summary
+    expected = finalize_rankings(serial.team_stats, tournament_names)
+    # Compared whole, so tie order and each team's tournaments list must match too
+    assert finalize_rankings(pooled.team_stats, tournament_names) == expected
+
+    # The data has to exercise both: teams across several tournaments and tied totals
+    assert any(team['total_tournaments'] > 1 and len({entry['name'] for entry in team['tournaments']}) > 1
+               for team in expected)
+    totals = [team['total_points'] for team in expected]
+    assert len(set(totals)) < len(totals)
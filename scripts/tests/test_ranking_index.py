@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+import ranking_index
+from ranking_index import RankingIndex, points_sort_key
+
+
+@pytest.fixture(autouse=True)
+def small_buckets(monkeypatch):
+    # Small buckets so a few hundred items split and drop buckets many times
+    monkeypatch.setattr(ranking_index, 'BUCKET_LOAD', 4)
+
+
+class SortedModel:
+    """The reference: every item in a plain list, re-sorted on each query"""
+
+    def __init__(self):
+        self.items = {}  # ident -> (seq, item)
+        self.seq = 0
+
+    def update(self, ident, item):
+        if ident in self.items:
+            self.items[ident] = (self.items[ident][0], item)
+        else:
+            self.items[ident] = (self.seq, item)
+            self.seq += 1
+
+    def remove(self, ident):
+        del self.items[ident]
+
+    def ranked(self, field=None, value=None):
+        entries = [(points_sort_key(item), seq, ident) for ident, (seq, item) in self.items.items()
+                   if field is None or item.get(field) == value]
+        return [ident for _, _, ident in sorted(entries)]
+
+
+def check(index, model, rng):
+    ranked = model.ranked()
+    assert [item['ident'] for item in index.items()] == ranked
+    for position, ident in enumerate(ranked, 1):
+        assert index.rank(ident) == position
+    k = rng.randint(0, len(ranked) + 2)
+    assert [item['ident'] for item in index.top(k)] == ranked[:k]
+    for division in 'abc':
+        in_division = model.ranked('division', division)
+        assert [item['ident'] for item in index.items('division', division)] == in_division
+        assert index.group_size('division', division) == len(in_division)
+        for position, ident in enumerate(in_division, 1):
+            assert index.rank(ident, 'division') == position
+        assert [item['ident'] for item in index.top(3, 'division', division)] == in_division[:3]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_sorted_list_under_random_inserts_updates_and_deletes(seed):
+    rng = random.Random(seed)
+    initial = [(ident, {'ident': ident, 'total_points': rng.randint(0, 20), 'division': rng.choice('abc')})
+               for ident in range(rng.randint(0, 50))]
+    index = RankingIndex(points_sort_key, ('division',), initial)
+    model = SortedModel()
+    for ident, item in initial:
+        model.update(ident, item)
+    check(index, model, rng)
+
+    next_ident = len(initial)
+    for step in range(400):
+        action = rng.random()
+        if action < 0.2 and model.items:
+            ident = rng.choice(list(model.items))
+            index.remove(ident)
+            model.remove(ident)
+        else:
+            if action < 0.6 and model.items:
+                ident = rng.choice(list(model.items))
+            else:
+                ident, next_ident = next_ident, next_ident + 1
+            # Few distinct point totals, so most positions are decided by the tie order
+            item = {'ident': ident, 'total_points': rng.randint(0, 20), 'division': rng.choice('abc')}
+            index.update(ident, item)
+            model.update(ident, item)
+        assert len(index) == len(model.items)
+        if step % 20 == 0:
+            check(index, model, rng)
+    check(index, model, rng)
+
+
+def test_competition_rank_shares_a_rank_between_ties():
+    index = RankingIndex(points_sort_key, items=[
+        (name, {'total_points': points}) for name, points in [('a', 5), ('b', 9), ('c', 5), ('d', 1)]
+    ])
+    assert [index.competition_rank(name) for name in 'abcd'] == [2, 1, 2, 4]
+    assert [index.rank(name) for name in 'abcd'] == [2, 1, 3, 4]
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from team_identity import find_similar_keys, jamo_ngrams
+
+SYLLABLES = '서울부산가나다라마바클럽팀스타윙즈썬더강원대학'
+
+
+def random_keys(rng, count):
+    """Keys in families of near-spellings (a syllable swapped, added or dropped), so many pairs are close"""
+    keys = set()
+    while len(keys) < count:
+        base = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 7)))
+        keys.add(base)
+        for _ in range(rng.randint(0, 3)):
+            chars = list(base)
+            position = rng.randrange(len(chars) + 1)
+            edit = rng.random()
+            if edit < 0.4 and position < len(chars):
+                chars[position] = rng.choice(SYLLABLES)
+            elif edit < 0.7 or len(chars) < 2:
+                chars.insert(position, rng.choice(SYLLABLES + 'ab1'))
+            else:
+                del chars[min(position, len(chars) - 1)]
+            keys.add(''.join(chars))
+    return sorted(keys)[:count]
+
+
+def brute_force(keys, threshold, probe=None):
+    """Dice similarity of every pair of keys"""
+    grams = [jamo_ngrams(key) for key in keys]
+    pairs = []
+    for i in range(len(keys)):
+        for j in range(i + 1, len(keys)):
+            if probe is not None and keys[i] not in probe and keys[j] not in probe:
+                continue
+            shared = len(grams[i] & grams[j])
+            if 2 * shared >= threshold * (len(grams[i]) + len(grams[j])):
+                pairs.append((keys[i], keys[j], 2 * shared / (len(grams[i]) + len(grams[j]))))
+    return sorted(pairs)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('threshold', [0.5, 0.8, 0.9])
+def test_matches_brute_force_dice(seed, threshold):
+    rng = random.Random(seed)
+    keys = random_keys(rng, 300)
+    expected = brute_force(keys, threshold)
+    found = list(find_similar_keys(keys, threshold))
+    # Every qualifying pair exactly once
+    assert sorted(found) == expected
+    assert expected
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('threshold', [0.5, 0.8])
+def test_probe_matches_brute_force_dice(seed, threshold):
+    rng = random.Random(seed)
+    keys = random_keys(rng, 300)
+    probe = set(rng.sample(keys, 30))
+    expected = brute_force(keys, threshold, probe)
+    assert sorted(find_similar_keys(keys, threshold, probe)) == expected
+    assert expected
@@ -0,0 +1,127 @@
+"""Encoding detection and incremental decoding for fetched and archived CSVs.
+
+The sheets come from Google (UTF-8) and from Excel exports (often CP949 /
+EUC-KR, sometimes UTF-8 with a BOM), and the blob host rarely says which.
+sniff_encoding looks at the BOM and the first SNIFF_BYTES only: each candidate
+(declared charset, the encoding remembered for the source, then UTF-8 and
+CP949) is tried strictly on that head and the first that fits wins.
+StreamDecoder then decodes chunk by chunk; if the head was plain ASCII and a
+later chunk is not valid in the sniffed encoding, it switches to the next
+candidate, which is safe because nothing but ASCII has been emitted yet.
+"""
+import codecs
+
+SNIFF_BYTES = 8 * 1024
+CANDIDATE_ENCODINGS = ('utf-8', 'cp949')
+
+# Longest first, so the UTF-32 BOMs are not taken for UTF-16 ones
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def charset_from_content_type(content_type):
+    """The charset parameter of a Content-Type header, or None if it has none"""
+    for param in (content_type or '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
+
+
+def _canonical(encoding):
+    try:
+        return codecs.lookup(encoding).name
+    except (LookupError, TypeError):
+        return None
+
+
+def _fits(head, encoding):
+    """Whether head decodes strictly; a multibyte sequence cut off at the end of head is fine"""
+    try:
+        codecs.getincrementaldecoder(encoding)('strict').decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def candidate_encodings(*hints):
+    """hints (None skipped, unknown names dropped) followed by CANDIDATE_ENCODINGS, without repeats"""
+    seen, candidates = set(), []
+    for encoding in (*hints, *CANDIDATE_ENCODINGS):
+        name = _canonical(encoding)
+        if name and name not in seen:
+            seen.add(name)
+            candidates.append(name)
+    return candidates
+
+
+def sniff_encoding(head, *hints):
+    """Guess the encoding of a body from its first bytes.
+
+    A BOM decides outright; otherwise the first of hints + CANDIDATE_ENCODINGS
+    that decodes head strictly wins (CP949 accepts almost any bytes, so it
+    goes last). Falls back to the first candidate if none fits.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    candidates = candidate_encodings(*hints)
+    head = head[:SNIFF_BYTES]
+    return next((encoding for encoding in candidates if _fits(head, encoding)), candidates[0])
+
+
+class StreamDecoder:
+    """Incremental decoder that can still change its mind while everything decoded so far is ASCII.
+
+    With fallback=None it is a plain incremental decoder. Otherwise bytes are
+    decoded strictly; the first invalid sequence switches to fallback if only
+    ASCII has been produced (or to errors if not), and encoding reports the
+    encoding actually used.
+    """
+
+    def __init__(self, encoding, errors='replace', fallback=None):
+        self.encoding = encoding
+        self.errors = errors
+        self.fallback = fallback if fallback and _canonical(fallback) != _canonical(encoding) else None
+        self._decoder = codecs.getincrementaldecoder(encoding)('strict' if self.fallback else errors)
+        self._ascii = True
+
+    def decode(self, data, final=False):
+        if self.fallback is None:
+            return self._decoder.decode(data, final)
+        try:
+            text = self._decoder.decode(data, final)
+        except UnicodeDecodeError:
+            # The decoder keeps an incomplete trailing sequence buffered; hand it over with the new data
+            pending = self._decoder.getstate()[0] + data
+            if self._ascii:
+                self.encoding = self.fallback
+            self.fallback = None
+            self._decoder = codecs.getincrementaldecoder(self.encoding)(self.errors)
+            return self._decoder.decode(pending, final)
+        if self._ascii and not text.isascii():
+            self._ascii = False
+        return text
+
+
+def iter_lines(chunks, decoder, metrics=None):
+    """Yield the lines (with line endings) of byte chunks decoded by decoder; metrics times the decoding"""
+    pending = ''
+    for chunk in chunks:
+        if metrics is None:
+            pending += decoder.decode(chunk)
+        else:
+            with metrics.stage('decode', nbytes=len(chunk)):
+                pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
@@ -0,0 +1,292 @@
+import json
+import os
+from collections import Counter, namedtuple
+from sys import intern
+
+from atomic_output import atomic_write
+
+STATE_FILE = 'tournament_state.json'
+STATE_VERSION = 5  # bump when parsing, region resolution or the stored records change
+
+
+def medal_type(ranking):
+    """Return the medal counter a ranking string increments, or None"""
+    if '우승' in ranking or '1' in ranking:
+        return 'wins'
+    elif '준우승' in ranking or '2' in ranking:
+        return 'second_places'
+    elif '3위' in ranking or '3' in ranking:
+        return 'third_places'
+    return None
+
+
+# Categorical strings shared by many rows; interning keeps one copy of each per process
+INTERNED_FIELDS = ('team_name', 'division', 'region', 'tournament', 'ranking')
+
+# One team placing (one parsed row); a tuple is a fraction of the size of the equivalent dict. name is the
+# tournament and row the row's position in it; team_name is the spelling used there, which may differ from the
+# team's key when teams are keyed by identity
+Placing = namedtuple('Placing', ['name', 'ranking', 'points', 'division', 'region', 'row', 'team_name', 'mvp',
+                                 'coach'])
+
+
+def intern_row(team_data):
+    """Intern the categorical fields of a parsed row in place"""
+    for field in INTERNED_FIELDS:
+        value = team_data.get(field)
+        if isinstance(value, str):
+            team_data[field] = intern(value)
+    return team_data
+
+
+def to_placings(teams_data):
+    """Placings of one tournament's parsed rows (as yielded by iter_tournament_data), in row order"""
+    return [
+        Placing(team_data['tournament'], team_data['ranking'], team_data['points'], team_data['division'],
+                team_data['region'], row, team_data['team_name'], team_data['mvp'], team_data['coach'])
+        for row, team_data in enumerate(teams_data)
+    ]
+
+
+def _encode_placing(placing):
+    # The tournament and row are implied by where the placing is stored
+    return [placing.team_name, placing.division, placing.region, placing.ranking, placing.points, placing.mvp,
+            placing.coach]
+
+
+def _decode_placing(tournament_name, row, values):
+    team_name, division, region, ranking, points, mvp, coach = values
+    return Placing(tournament_name, intern(ranking), points, intern(division), intern(region), row,
+                   intern(team_name), mvp, coach)
+
+
+class TeamRecord:
+    """Running totals for one team; tournaments maps each tournament name to the team's placings in it.
+
+    Names, MVPs and coaches are read off the placings when rankings are built.
+    """
+
+    __slots__ = ('total_points', 'tournaments', 'wins', 'second_places', 'third_places', 'total_tournaments')
+
+    def __init__(self):
+        self.total_points = 0
+        self.tournaments = {}
+        self.wins = 0
+        self.second_places = 0
+        self.third_places = 0
+        self.total_tournaments = 0
+
+    def placings(self):
+        return [placing for placings in self.tournaments.values() for placing in placings]
+
+
+def new_team_record():
+    return TeamRecord()
+
+
+def apply_contribution(team_stats, placings, sign=1, team_key=None):
+    """Add (sign=1) or subtract (sign=-1) one tournament's placings (see to_placings) from team_stats.
+
+    team_key maps a placing's team name to the key its stats are kept under
+    (e.g. TeamIdentity.key); by default the raw name is the key. The team's
+    placings are indexed by tournament, so subtracting only looks through the
+    team's few placings in that tournament.
+    """
+    for placing in placings:
+        team_name = placing.team_name if team_key is None else team_key(placing.team_name)
+        stats = team_stats.get(team_name)
+        if sign > 0:
+            if stats is None:
+                stats = team_stats[team_name] = new_team_record()
+            stats.tournaments.setdefault(placing.name, []).append(placing)
+        else:
+            entries = stats.tournaments.get(placing.name) if stats is not None else None
+            if not entries or placing not in entries:
+                continue
+            entries.remove(placing)
+            if not entries:
+                del stats.tournaments[placing.name]
+
+        stats.total_points += sign * placing.points
+        stats.total_tournaments += sign
+
+        medal = medal_type(placing.ranking)
+        if medal:
+            setattr(stats, medal, getattr(stats, medal) + sign)
+
+        if stats.total_tournaments <= 0:
+            del team_stats[team_name]
+
+
+def merge_team_stats(team_stats, partial, team_key=None):
+    """Fold a partial team_stats map into team_stats.
+
+    Merging is associative, so partials built per tournament (in any process)
+    and merged in tournament order give the same records as applying every
+    row serially. partial's records are reused, not copied. team_key re-keys
+    a partial built on raw names, as in apply_contribution.
+    """
+    for team_name, record in partial.items():
+        if team_key is not None:
+            team_name = team_key(team_name)
+        stats = team_stats.get(team_name)
+        if stats is None:
+            team_stats[team_name] = record
+            continue
+        stats.total_points += record.total_points
+        stats.total_tournaments += record.total_tournaments
+        stats.wins += record.wins
+        stats.second_places += record.second_places
+        stats.third_places += record.third_places
+        for tournament_name, placings in record.tournaments.items():
+            stats.tournaments.setdefault(tournament_name, []).extend(placings)
+
+
+def preferred_spelling(spellings):
+    """The most frequent of a team's spellings; ties go to the one that comes first"""
+    return Counter(spellings).most_common(1)[0][0]
+
+
+def finalize_rankings(team_stats, tournament_names):
+    """Convert merged team_stats into final_rankings sorted by total points.
+
+    Everything is read off the placings in tournament-list order, so the result
+    does not depend on which tournaments were re-parsed in this run: a team's
+    division and region come from its last placing, its name is its
+    preferred_spelling, and MVPs and coaches are listed in order of first mention.
+    """
+    order = {name: index for index, name in enumerate(tournament_names)}
+    unknown = len(order)
+
+    def placing_key(entry):
+        return (order.get(entry.name, unknown), entry.row)
+
+    ranked = []
+    for team_name, stats in team_stats.items():
+        placings = sorted(stats.placings(), key=placing_key)
+        if not placings:
+            continue
+        last = placings[-1]
+        ranked.append((placing_key(placings[0]), {
+            'team_name': preferred_spelling(entry.team_name for entry in placings),
+            'total_points': stats.total_points,
+            'wins': stats.wins,
+            'second_places': stats.second_places,
+            'third_places': stats.third_places,
+            'total_tournaments': stats.total_tournaments,
+            'division': last.division,
+            'region': last.region,
+            'tournaments': [
+                {'name': entry.name, 'ranking': entry.ranking, 'points': entry.points}
+                for entry in placings
+            ],
+            'mvp_awards': list(dict.fromkeys(entry.mvp for entry in placings if entry.mvp)),
+            'coaches': list(dict.fromkeys(entry.coach for entry in placings if entry.coach))
+        }))
+
+    # Ties keep first-appearance order, matching a fresh aggregation
+    ranked.sort(key=lambda item: (-item[1]['total_points'], item[0]))
+    return [team for _, team in ranked]
+
+
+class TournamentState:
+    """Each tournament's placings keyed by the SHA-256 of its CSV bytes, plus the team_stats they add up to.
+
+    Only the placings (and a date, for tournaments dated by their own rows)
+    are saved; team_stats share the same Placing records and are rebuilt from
+    them on load. With an identity (TeamIdentity), team_stats are keyed by
+    canonical team key instead of raw name; placings keep the raw names, so a
+    change to the accepted merges takes effect on the next load without
+    re-parsing.
+    """
+
+    def __init__(self, path=STATE_FILE, identity=None):
+        self.path = path
+        self.identity = identity
+        self.team_key = identity.key if identity is not None else None
+        self.tournaments = {}
+        self.team_stats = {}
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[v0] Ignoring unreadable state file {self.path}: {e}")
+            return
+        if data.get('version') != STATE_VERSION:
+            return
+        for tournament_name, entry in data.get('tournaments', {}).items():
+            tournament_name = intern(tournament_name)
+            self.tournaments[tournament_name] = {
+                'hash': entry['hash'],
+                'placings': [_decode_placing(tournament_name, row, values)
+                             for row, values in enumerate(entry['placings'])],
+                'date': entry.get('date')
+            }
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute team_stats from the stored placings"""
+        self.team_stats = {}
+        for entry in self.tournaments.values():
+            apply_contribution(self.team_stats, entry['placings'], 1, self.team_key)
+
+    def save(self):
+        if not self.path:
+            return
+        with atomic_write(self.path) as f:
+            json.dump({
+                'version': STATE_VERSION,
+                'tournaments': {
+                    tournament_name: {'hash': entry['hash'], 'placings': list(map(_encode_placing, entry['placings'])),
+                                      'date': entry['date']}
+                    for tournament_name, entry in self.tournaments.items()
+                }
+            }, f, ensure_ascii=False, separators=(',', ':'))
+
+    def update(self, tournament_name, digest, parse, source):
+        """Re-parse a tournament only if the hash of its CSV bytes changed.
+
+        parse(source, tournament_name) is only called for new or changed
+        tournaments and returns parsed rows. Returns (placings, changed).
+        """
+        if self.is_current(tournament_name, digest):
+            return self.tournaments[tournament_name]['placings'], False
+        return self.replace(tournament_name, digest, to_placings(parse(source, tournament_name))), True
+
+    def is_current(self, tournament_name, digest):
+        previous = self.tournaments.get(tournament_name)
+        return bool(previous) and previous['hash'] == digest
+
+    def replace(self, tournament_name, digest, placings, partial=None, date=None):
+        """Swap in a tournament's newly parsed placings.
+
+        partial is the team-stats map of placings alone, when it was already
+        built elsewhere (e.g. in a worker process); it is merged instead of
+        re-applying the placings. date (ISO string) is kept for tournaments
+        dated by their own data, such as archive rows. Returns placings.
+        """
+        previous = self.tournaments.get(tournament_name)
+        if previous:
+            apply_contribution(self.team_stats, previous['placings'], -1, self.team_key)
+        if partial is None:
+            apply_contribution(self.team_stats, placings, 1, self.team_key)
+        else:
+            merge_team_stats(self.team_stats, partial, self.team_key)
+        self.tournaments[tournament_name] = {'hash': digest, 'placings': placings, 'date': date}
+        return placings
+
+    def previous_placings(self, tournament_name):
+        previous = self.tournaments.get(tournament_name)
+        return previous['placings'] if previous else None
+
+    def prune(self, tournament_names):
+        """Subtract tournaments that are no longer configured"""
+        keep = set(tournament_names)
+        for name in list(self.tournaments):
+            if name not in keep:
+                apply_contribution(self.team_stats, self.tournaments.pop(name)['placings'], -1, self.team_key)